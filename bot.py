@@ -2,66 +2,209 @@
 Discord 资源分发 Bot 核心类
 """
 
+import asyncio
+import contextlib
+import time
+import zlib
+from typing import AsyncIterator
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
 from config import Config
+from utils.command_sync import sync_if_changed
+from utils.deadline import DeadlineManager
+from utils.metrics import BotMetrics, InstrumentedCommandTree
+from utils.participants import ParticipantIndex
+from utils.relay import AttachmentRelay
+from utils.router import InteractionRouter
+from utils.runtime import build_intents, client_options, current_rss_kb
+from utils.snapshot import WarehouseSnapshot
+from utils.throttle import InteractionThrottle
+from utils.tracing import Tracer
+from utils.upload_queue import WarehouseWriteQueue
+from utils.warehouse import WarehouseStore
+from utils.work_index import WorkIndex
 
 
-class PersistentViewHandler(discord.ui.View):
-    """
-    持久化视图处理器
-    用于处理 Bot 重启后的按钮交互
-    通过监听所有以 "manage:" 开头的 custom_id
-    """
+class ResourceBot(commands.Bot):
+    """资源分发 Bot 核心类"""
 
-    def __init__(self):
-        super().__init__(timeout=None)
+    def __init__(self, warehouse_channel_ids: list[int], stateless: bool = False, worker: int = 0):
+        self._started_at = time.perf_counter()
+        self.startup_seconds: float | None = None
 
-    @discord.ui.button(custom_id="manage:delete:placeholder", style=discord.ButtonStyle.danger)
-    async def placeholder_delete(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """占位符按钮，实际回调由 on_interaction 处理"""
-        pass
+        # 按运行配置档设置 intents 和缓存
+        self.profile = Config.RUNTIME_PROFILE
+        super().__init__(
+            command_prefix="!",  # 传统命令前缀（主要使用斜杠命令）
+            intents=build_intents(self.profile),
+            tree_cls=InstrumentedCommandTree,
+            **client_options(self.profile, Config.MAX_MESSAGES),
+        )
 
-    @discord.ui.button(custom_id="manage:pin:placeholder", style=discord.ButtonStyle.secondary)
-    async def placeholder_pin(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """占位符按钮，实际回调由 on_interaction 处理"""
-        pass
+        # HTTP 交互模式下不连接网关，频道缓存为空
+        self.stateless = stateless
+        # HTTP 工作进程序号（命令同步只由 0 号进程执行）
+        self.worker = worker
 
-    @discord.ui.button(custom_id="manage:update:placeholder", style=discord.ButtonStyle.primary)
-    async def placeholder_update(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """占位符按钮，实际回调由 on_interaction 处理"""
-        pass
+        # 仓库频道池（分片），第 0 个为默认仓库频道
+        self.warehouse_channel_ids = warehouse_channel_ids
+        self.warehouse_channel_id = warehouse_channel_ids[0]
+        self._warehouse_channels: dict[int, discord.TextChannel] = {}
 
+        # 本地快照（可选）
+        self.snapshot = WarehouseSnapshot(Config.SNAPSHOT_PATH) if Config.SNAPSHOT_PATH else None
+        self._snapshot_task: asyncio.Task | None = None
 
-class ResourceBot(commands.Bot):
-    """资源分发 Bot 核心类"""
+        # 帖子 → 作品索引
+        # HTTP 模式下作品可能由其他工作进程发布，不记住「帖子中没有作品」
+        self.work_index = WorkIndex(
+            snapshot=self.snapshot, negative_cache=not stateless, scan_limit=Config.WORK_SCAN_LIMIT
+        )
 
-    def __init__(self, warehouse_channel_id: int):
-        # 设置 intents
-        intents = discord.Intents.default()
-        intents.message_content = True
-        intents.reactions = True
-        intents.members = True
+        # 仓库记录缓存
+        self.warehouse_store = WarehouseStore(
+            self,
+            max_entries=Config.WAREHOUSE_CACHE_SIZE,
+            # HTTP 模式下作品可能由其他工作进程修改，缩短缓存时间
+            ttl=min(Config.WAREHOUSE_CACHE_TTL, Config.HTTP_CACHE_TTL) if stateless else Config.WAREHOUSE_CACHE_TTL,
+            refresh_margin=Config.CDN_REFRESH_MARGIN,
+            snapshot=self.snapshot,
+        )
 
-        super().__init__(
-            command_prefix="!",  # 传统命令前缀（主要使用斜杠命令）
-            intents=intents,
+        # 帖子参与者索引
+        # HTTP 模式收不到消息 / 回应事件，未命中时增量回溯
+        self.participant_index = ParticipantIndex(
+            max_threads=Config.PARTICIPANT_INDEX_SIZE, refresh_on_miss=stateless
+        )
+
+        # 附件中转管线
+        self.attachment_relay = AttachmentRelay(
+            spool_max_size=Config.RELAY_SPOOL_MAX_SIZE,
+            memory_budget=Config.RELAY_MEMORY_BUDGET,
+            max_concurrency=Config.RELAY_CONCURRENCY,
+            file_timeout=Config.RELAY_FILE_TIMEOUT,
         )
 
-        self.warehouse_channel_id = warehouse_channel_id
-        self._warehouse_channel: discord.TextChannel | None = None
+        # 运行指标（多个 HTTP 工作进程时各自使用不同端口）
+        self.metrics = BotMetrics(self)
+        self.metrics_port = Config.METRICS_PORT
+
+        # 交互追踪（按采样率写入 JSONL）
+        self.tracer = Tracer(
+            Config.TRACE_PATH,
+            sample_rate=Config.TRACE_SAMPLE_RATE,
+            slow_ms=Config.TRACE_SLOW_MS,
+            max_bytes=Config.TRACE_MAX_BYTES,
+            backups=Config.TRACE_BACKUPS,
+        )
+
+        # 交互应答期限（临近 3 秒仍未应答时自动延迟应答）
+        self.response_deadlines = DeadlineManager(
+            min_margin=Config.DEFER_MARGIN,
+            near_miss=Config.DEADLINE_NEAR_MISS,
+        )
+
+        # 下载 / 获取 / 提取码提交的限流
+        self.throttle = InteractionThrottle(
+            user=(Config.THROTTLE_USER_LIMIT, Config.THROTTLE_USER_PERIOD),
+            work=(Config.THROTTLE_WORK_LIMIT, Config.THROTTLE_WORK_PERIOD),
+            global_=(Config.THROTTLE_GLOBAL_LIMIT, Config.THROTTLE_GLOBAL_PERIOD),
+            max_failures=Config.PASSCODE_MAX_FAILURES,
+            lockout=Config.PASSCODE_LOCKOUT,
+            # 多个 HTTP 工作进程各自计数，按进程数分摊限额
+            shares=Config.HTTP_WORKERS if stateless else 1,
+        )
+
+        # 组件交互路由表（由各模块加载时注册）
+        self.router = InteractionRouter(track=self.instrument, deadlines=self.response_deadlines)
+
+        # 仓库写入队列
+        self.write_queue = WarehouseWriteQueue(
+            workers=Config.WRITE_QUEUE_WORKERS,
+            rate=Config.WRITE_RATE_LIMIT,
+            period=Config.WRITE_RATE_PERIOD,
+        )
 
     @property
     def warehouse_channel(self) -> discord.TextChannel | None:
-        """获取仓库频道"""
-        if self._warehouse_channel is None:
-            self._warehouse_channel = self.get_channel(self.warehouse_channel_id)
-        return self._warehouse_channel
+        """获取默认仓库频道（分片 0）"""
+        return self.get_warehouse_channel(0)
+
+    def get_warehouse_channel(self, shard: int) -> discord.TextChannel | None:
+        """
+        获取指定分片的仓库频道，分片不存在时返回 None
+
+        HTTP 交互模式下没有频道缓存，返回只支持收发消息的 PartialMessageable
+        """
+        channel = self._warehouse_channels.get(shard)
+        if channel is None:
+            if not 0 <= shard < len(self.warehouse_channel_ids):
+                return None
+            channel_id = self.warehouse_channel_ids[shard]
+            if self.stateless:
+                channel = self.get_partial_messageable(channel_id)
+            else:
+                channel = self.get_channel(channel_id)
+            if channel is not None:
+                self._warehouse_channels[shard] = channel
+        return channel
+
+    def pick_warehouse_shard(self, thread_id: int) -> int:
+        """
+        为新作品选择仓库分片
+
+        按帖子 ID 的稳定哈希分配，同一帖子的作品总是落在同一分片
+        """
+        return zlib.crc32(str(thread_id).encode()) % len(self.warehouse_channel_ids)
+
+    @contextlib.asynccontextmanager
+    async def instrument(
+        self, kind: str, name: str, interaction: discord.Interaction
+    ) -> AsyncIterator[None]:
+        """记录一次交互处理的指标和追踪（以交互 ID 关联，追踪记录附带按路由的 REST 调用次数）"""
+        async with self.metrics.track(kind, name) as calls:
+            with self.tracer.trace(interaction.id, kind, name, rest=calls):
+                yield
 
     async def setup_hook(self) -> None:
         """Bot 启动时的钩子函数"""
+        # 启动仓库写入队列
+        self.write_queue.start()
+
+        # 启动运行指标
+        self.metrics.install()
+        self.metrics.add_collector(
+            "jiuwo_warehouse_cache", "仓库记录缓存统计", self.warehouse_store.stats
+        )
+        self.metrics.add_collector("jiuwo_write_queue", "仓库写入队列统计", self.write_queue.stats)
+        self.metrics.add_collector("jiuwo_relay", "附件中转统计", self.attachment_relay.stats)
+        self.metrics.add_collector(
+            "jiuwo_response_deadline", "交互应答期限统计", self.response_deadlines.stats
+        )
+        self.metrics.add_collector("jiuwo_throttle", "交互限流统计", self.throttle.stats)
+        self.metrics.add_collector("jiuwo_button_routes", "按钮路由调用统计（耗时单位为秒）", self.router.stats)
+        self.metrics.add_collector(
+            "jiuwo_work_index", "帖子索引条目数", lambda: {"threads": len(self.work_index)}
+        )
+        if self.snapshot is not None:
+            self.metrics.add_collector("jiuwo_snapshot", "本地快照统计", self.snapshot.stats)
+        if self.tracer.enabled:
+            self.metrics.add_collector("jiuwo_traces", "交互追踪写入统计", self.tracer.stats)
+        await self.metrics.start(Config.METRICS_HOST, self.metrics_port)
+
+        # 从本地快照恢复索引，并在后台增量扫描仓库频道
+        if self.snapshot is not None:
+            started = time.perf_counter()
+            count = self.work_index.load()
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"✅ 已从快照恢复 {count} 个帖子索引 ({elapsed:.1f} ms)")
+            # HTTP 交互模式下由网关模式的实例负责扫描
+            if not self.stateless:
+                self._snapshot_task = asyncio.create_task(self._catch_up_snapshot())
+
         # 加载所有 Cogs
         cogs = [
             "cogs.publish",
@@ -76,9 +219,50 @@ class ResourceBot(commands.Bot):
             except Exception as e:
                 print(f"❌ 加载模块失败 {cog}: {e}")
 
-        # 同步斜杠命令
-        await self.tree.sync()
-        print("✅ 斜杠命令已同步")
+        # 同步斜杠命令（命令树未变化时跳过）
+        guild = None
+        if Config.SYNC_GUILD_ID:
+            guild = discord.Object(id=Config.SYNC_GUILD_ID)
+            self.tree.copy_global_to(guild=guild)
+        scope = f"服务器 {Config.SYNC_GUILD_ID}" if guild else "全局"
+        if self.worker != 0:
+            print(f"✅ 斜杠命令由 0 号工作进程同步（{scope}）")
+        elif await sync_if_changed(self.tree, Config.COMMAND_SYNC_STATE, guild=guild):
+            print(f"✅ 斜杠命令已同步（{scope}）")
+        else:
+            print(f"✅ 斜杠命令未变化，跳过同步（{scope}）")
+
+    async def _catch_up_snapshot(self) -> None:
+        """从上次位置增量扫描所有仓库分片，补全快照"""
+        await self.wait_until_ready()
+        for shard in range(len(self.warehouse_channel_ids)):
+            channel = self.get_warehouse_channel(shard)
+            if channel is None:
+                continue
+            try:
+                count = await self.snapshot.catch_up(channel, shard, self.user.id)
+                print(f"✅ 快照已同步分片 {shard}：新增 {count} 条仓库消息")
+            except Exception as e:
+                print(f"⚠️ 快照同步分片 {shard} 失败: {e}")
+
+    async def close(self) -> None:
+        """关闭 Bot 时停止写入队列、快照同步、指标端点并释放附件中转的 HTTP 会话"""
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+        await self.metrics.stop()
+        self.tracer.close()
+        await self.write_queue.stop()
+        await self.attachment_relay.close()
+        if self.snapshot is not None:
+            self.snapshot.close()
+        await super().close()
+
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        """仓库消息被删除时从缓存和快照中移除；帖内的作品公开消息被删除时移除帖子索引"""
+        if payload.channel_id in self.warehouse_channel_ids:
+            self.warehouse_store.discard(payload.message_id)
+        else:
+            self.work_index.remove(payload.channel_id, payload.message_id)
 
     async def on_ready(self) -> None:
         """Bot 就绪事件"""
@@ -88,16 +272,25 @@ class ResourceBot(commands.Bot):
         print("=" * 50)
         print()
 
+        # 首次就绪时记录启动耗时（断线重连也会触发 on_ready）
+        if self.startup_seconds is None:
+            self.startup_seconds = time.perf_counter() - self._started_at
+
         # Bot 基本信息
         print(f"🤖 Bot 名称: {self.user.name}")
         print(f"🆔 Bot ID: {self.user.id}")
-        print(f"📦 仓库频道 ID: {self.warehouse_channel_id}")
-
+        print(
+            f"⚙️  运行配置档: {self.profile}，启动耗时 {self.startup_seconds:.2f} 秒，"
+            f"内存 {current_rss_kb() / 1024:.1f} MB"
+        )
         # 验证仓库频道
-        if self.warehouse_channel is None:
-            print("⚠️  警告: 无法找到仓库频道，请检查 WAREHOUSE_CHANNEL_ID 配置")
-        else:
-            print(f"📦 仓库频道: #{self.warehouse_channel.name}")
+        print(f"📦 仓库频道 ({len(self.warehouse_channel_ids)} 个分片):")
+        for shard, channel_id in enumerate(self.warehouse_channel_ids):
+            channel = self.get_warehouse_channel(shard)
+            if channel is None:
+                print(f"   ⚠️  分片 {shard}: 无法找到频道 (ID: {channel_id})，请检查仓库频道配置")
+            else:
+                print(f"   • 分片 {shard}: #{channel.name} (ID: {channel_id})")
 
         print()
 
@@ -130,62 +323,10 @@ class ResourceBot(commands.Bot):
     async def on_interaction(self, interaction: discord.Interaction) -> None:
         """
         处理所有交互事件
-        用于处理持久化按钮的回调
+        持久化按钮（custom_id 中带有作品信息）交给路由表分发
         """
         # 只处理组件交互（按钮、选择菜单等）
         if interaction.type != discord.InteractionType.component:
             return
 
-        custom_id = interaction.data.get("custom_id", "")
-
-        # 处理管理按钮
-        if custom_id.startswith("manage:"):
-            await self._handle_manage_button(interaction, custom_id)
-
-    async def _handle_manage_button(self, interaction: discord.Interaction, custom_id: str) -> None:
-        """处理管理按钮交互"""
-        try:
-            parts = custom_id.split(":")
-            if len(parts) < 4:
-                return
-
-            action = parts[1]
-            warehouse_id = int(parts[2])
-            uploader_id = int(parts[3])
-
-            # 下载按钮：所有用户可用，无需权限检查
-            if action == "download":
-                from cogs.download import handle_download_button
-                await handle_download_button(interaction, warehouse_id)
-                return
-
-            # 管理按钮：仅发布者可用，需要权限检查
-            if interaction.user.id != uploader_id:
-                from utils.embed_builder import build_error_embed
-                await interaction.response.send_message(
-                    embed=build_error_embed("只有发布者才能执行此操作"),
-                    ephemeral=True,
-                )
-                return
-
-            # 根据动作类型分发
-            if action == "delete":
-                from cogs.manage import handle_delete_work
-                await handle_delete_work(interaction, warehouse_id)
-            elif action == "pin":
-                from cogs.manage import handle_toggle_pin
-                await handle_toggle_pin(interaction)
-            elif action == "update":
-                from cogs.manage import handle_update_work
-                await handle_update_work(interaction, warehouse_id)
-
-        except Exception as e:
-            print(f"❌ 处理管理按钮失败: {e}")
-            try:
-                if not interaction.response.is_done():
-                    await interaction.response.send_message(
-                        f"操作失败: {str(e)}",
-                        ephemeral=True,
-                    )
-            except Exception:
-                pass
+        await self.router.dispatch(interaction)
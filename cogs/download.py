@@ -3,16 +3,65 @@
 实现 /获取作品 斜杠命令
 """
 
+import math
+
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
+
+from config import Config
+from utils.custom_id import ButtonId
+from utils.deadline import ResponseDeadline
+from utils.tracing import span
+from utils.warehouse import AttachmentInfo
+from utils.work_index import WorkEntry
+from utils.embed_builder import (
+    build_error_embed,
+    build_files_download_embeds,
+)
+
+# 提取码弹窗的等待时间（秒），超时后不再保留弹窗对象
+PASSCODE_MODAL_TIMEOUT = 90
+
+
+async def send_download_links(
+    interaction: discord.Interaction,
+    title: str,
+    attachments: list[AttachmentInfo],
+    deadline: ResponseDeadline | None = None,
+):
+    """发送下载链接（分卷较多时拆分为多条消息；传入 deadline 时经由它应答）"""
+    for embed in build_files_download_embeds(title, attachments):
+        with span("send_links"):
+            if deadline is not None:
+                await deadline.send(embed=embed)
+            elif interaction.response.is_done():
+                await interaction.followup.send(embed=embed, ephemeral=True)
+            else:
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+
 
-from utils.metadata import parse_metadata
-from utils.embed_builder import build_download_embed, build_error_embed
+async def reject_if_throttled(interaction: discord.Interaction, deadline: ResponseDeadline) -> bool:
+    """
+    超出限流时直接回复稍后再试（只有一次应答回调，不读取仓库、不回溯帖子）
+
+    Returns:
+        是否已拒绝
+    """
+    wait = interaction.client.throttle.acquire(interaction.user.id, interaction.channel_id)
+    if wait <= 0:
+        return False
+    await deadline.send(embed=build_error_embed(f"操作太频繁，请 {math.ceil(wait)} 秒后再试"))
+    return True
 
 
 class PasscodeModal(discord.ui.Modal, title="输入提取码"):
-    """提取码输入弹窗"""
+    """
+    提取码输入弹窗
+
+    只保存仓库消息 ID 和分片，提交时再读取仓库记录（通常已缓存），
+    校验提取码后发送所有附件（含分卷）的下载链接
+    """
 
     passcode_input = discord.ui.TextInput(
         label="提取码",
@@ -21,353 +70,264 @@ class PasscodeModal(discord.ui.Modal, title="输入提取码"):
         max_length=50,
     )
 
-    def __init__(self, expected_code: str, attachment_url: str, title: str):
-        super().__init__()
-        self.expected_code = expected_code
-        self.attachment_url = attachment_url
-        self.resource_title = title
+    def __init__(self, warehouse_id: int, shard: int = 0):
+        super().__init__(timeout=PASSCODE_MODAL_TIMEOUT)
+        self.warehouse_id = warehouse_id
+        self.shard = shard
 
     async def on_submit(self, interaction: discord.Interaction):
         """提交时验证提取码"""
-        if self.passcode_input.value == self.expected_code:
-            embed = build_download_embed(self.resource_title, self.attachment_url)
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-        else:
-            await interaction.response.send_message(
-                embed=build_error_embed("提取码错误，请重试"),
-                ephemeral=True,
-            )
-
-
-class DownloadCog(commands.Cog):
-    """获取作品模块"""
-
-    def __init__(self, bot: commands.Bot):
-        self.bot = bot
-
-    async def find_warehouse_id_in_thread(
-        self, channel: discord.TextChannel | discord.Thread
-    ) -> int | None:
-        """
-        在当前 Thread 中查找包含 WarehouseID 的 Embed
-
-        Returns:
-            仓库消息 ID，未找到返回 None
-        """
-        async for message in channel.history(limit=100):
-            if message.embeds:
-                for embed in message.embeds:
-                    if embed.footer and embed.footer.text:
-                        footer_text = embed.footer.text
-                        # 支持多种 footer 格式
-                        if footer_text.startswith("WarehouseID:"):
-                            try:
-                                warehouse_id = int(
-                                    footer_text.replace("WarehouseID:", "").strip()
-                                )
-                                return warehouse_id
-                            except ValueError:
-                                continue
-                        elif footer_text.startswith("作品ID:") or footer_text.startswith("ID:"):
-                            try:
-                                warehouse_id = int(footer_text.split(":")[-1].strip())
-                                return warehouse_id
-                            except ValueError:
-                                continue
-        return None
-
-    async def check_user_interaction(
-        self,
-        user: discord.User | discord.Member,
-        thread: discord.Thread,
-    ) -> bool:
-        """
-        检查用户是否对帖子有互动（Reaction 或回复）
-
-        Args:
-            user: 用户
-            thread: 帖子 Thread
-
-        Returns:
-            是否有互动
-        """
-        # 获取首楼消息（Thread 的 starter_message）
-        try:
-            starter_message = await thread.parent.fetch_message(thread.id)
-
-            # 检查是否有 Reaction
-            for reaction in starter_message.reactions:
-                async for reactor in reaction.users():
-                    if reactor.id == user.id:
-                        return True
-        except Exception:
-            pass
-
-        # 检查是否在 Thread 中有回复
-        async for message in thread.history(limit=200):
-            if message.author.id == user.id:
-                return True
-
-        return False
-
-    @app_commands.command(name="获取作品", description="获取当前帖子的资源下载链接")
-    async def get_work(self, interaction: discord.Interaction):
-        """获取作品命令"""
-        await interaction.response.defer(ephemeral=True)
-
-        # 获取当前频道
-        channel = interaction.channel
-
-        # 查找 WarehouseID
-        warehouse_id = await self.find_warehouse_id_in_thread(channel)
-
-        if warehouse_id is None:
-            await interaction.followup.send(
-                embed=build_error_embed("当前帖子中未找到已发布的作品"),
-                ephemeral=True,
-            )
-            return
-
-        # 获取仓库频道
-        warehouse_channel = self.bot.warehouse_channel
-        if warehouse_channel is None:
-            await interaction.followup.send(
-                embed=build_error_embed("仓库频道配置错误，请联系管理员"),
-                ephemeral=True,
-            )
-            return
-
-        try:
-            # 读取仓库消息
-            warehouse_message = await warehouse_channel.fetch_message(warehouse_id)
-
-            # 解析元数据
-            metadata = parse_metadata(warehouse_message.content)
-            if metadata is None:
-                await interaction.followup.send(
-                    embed=build_error_embed("资源元数据解析失败"),
-                    ephemeral=True,
-                )
-                return
-
-            # 获取附件 URL
-            if not warehouse_message.attachments:
-                await interaction.followup.send(
-                    embed=build_error_embed("资源文件不存在"),
-                    ephemeral=True,
-                )
-                return
-
-            attachment_url = warehouse_message.attachments[0].url
-            attachments = warehouse_message.attachments  # 所有附件
-
-            # 构建多文件下载 Embed 的辅助函数
-            def build_multi_file_embed(title: str, attachments: list) -> discord.Embed:
-                if len(attachments) == 1:
-                    return build_download_embed(title, attachments[0].url)
+        bot = interaction.client
+        user_id, work_key = interaction.user.id, interaction.channel_id
+        async with bot.instrument("action", "passcode", interaction):
+            async with bot.response_deadlines.watch(interaction) as deadline:
+                locked = bot.throttle.locked_for(user_id, work_key)
+                if locked > 0:
+                    await deadline.send(
+                        embed=build_error_embed(f"提取码错误次数过多，请 {math.ceil(locked)} 秒后再试")
+                    )
+                    return
+                if await reject_if_throttled(interaction, deadline):
+                    return
+
+                try:
+                    with span("warehouse.get"):
+                        record = await bot.warehouse_store.get(self.warehouse_id, self.shard)
+                except discord.NotFound:
+                    await deadline.send(embed=build_error_embed("资源已被删除或不存在"))
+                    return
+
+                metadata = record.metadata
+                if metadata is None or not record.attachments:
+                    await deadline.send(embed=build_error_embed("资源文件不存在"))
+                elif metadata.req.get("type") != "提取码":
+                    # 弹窗打开后发布者改了下载门槛，按当前门槛处理
+                    await deliver_work(interaction, deadline, self.warehouse_id, self.shard)
+                elif bot.throttle.check_passcode(
+                    user_id, work_key, self.passcode_input.value, metadata.req.get("code") or ""
+                ):
+                    await send_download_links(interaction, metadata.title, record.attachments, deadline)
                 else:
-                    links = "\n".join([f"📎 [{att.filename}]({att.url})" for att in attachments])
-                    embed = discord.Embed(
-                        title="📥 下载就绪",
-                        description=f"**{title}**\n\n{links}\n\n⏰ 链接有效期约 24 小时",
-                        color=0x3BA55C,
+                    locked = bot.throttle.locked_for(user_id, work_key, count=False)
+                    message = (
+                        f"提取码错误次数过多，请 {math.ceil(locked)} 秒后再试"
+                        if locked > 0
+                        else "提取码错误，请重试"
                     )
-                    embed.set_footer(text="请遵守版权规则")
-                    return embed
+                    await deadline.send(embed=build_error_embed(message))
 
-            # 根据下载要求进行鉴权
-            dl_req_type = metadata.req.get("type", "自由下载")
 
-            if dl_req_type == "自由下载":
-                # 直接发送下载链接
-                embed = build_multi_file_embed(metadata.title, attachments)
-                await interaction.followup.send(embed=embed, ephemeral=True)
+class PasscodeEntryView(discord.ui.View):
+    """
+    「输入提取码」按钮（无法直接弹窗时的退路）
 
-            elif dl_req_type == "互动":
-                # 检查用户是否有互动
-                if isinstance(channel, discord.Thread):
-                    has_interaction = await self.check_user_interaction(
-                        interaction.user, channel
-                    )
-                    if has_interaction:
-                        embed = build_multi_file_embed(metadata.title, attachments)
-                        await interaction.followup.send(embed=embed, ephemeral=True)
-                    else:
-                        await interaction.followup.send(
-                            embed=build_error_embed(
-                                "需要先对帖子进行回应（Reaction）或回复才能下载"
-                            ),
-                            ephemeral=True,
-                        )
-                else:
-                    await interaction.followup.send(
-                        embed=build_error_embed("此命令只能在帖子（Thread）中使用"),
-                        ephemeral=True,
-                    )
+    custom_id 中编码了作品信息，点击由 bot.router 路由表处理，
+    视图本身不保存任何状态，发送后立即停止，不在视图存储中驻留
+    """
 
-            elif dl_req_type == "提取码":
-                # 弹出提取码验证 Modal
-                expected_code = metadata.req.get("code", "")
-                # 多文件时，传递所有附件 URL
-                all_urls = "\n".join([att.url for att in attachments])
-                await interaction.followup.send(
-                    content="请点击下方按钮输入提取码：",
-                    view=PasscodeButtonView(
-                        expected_code=expected_code,
-                        attachment_url=all_urls,
-                        title=metadata.title,
-                    ),
-                    ephemeral=True,
-                )
-
-        except discord.NotFound:
-            await interaction.followup.send(
-                embed=build_error_embed("资源已被删除或不存在"),
-                ephemeral=True,
+    def __init__(self, warehouse_id: int, uploader_id: int, shard: int = 0):
+        super().__init__(timeout=None)
+        self.add_item(
+            discord.ui.Button(
+                label="输入提取码",
+                emoji="🔐",
+                style=discord.ButtonStyle.primary,
+                custom_id=ButtonId(
+                    prefix="manage",
+                    action="passcode",
+                    warehouse_id=warehouse_id,
+                    uploader_id=uploader_id,
+                    shard=shard,
+                ).encode(),
             )
-        except Exception as e:
-            await interaction.followup.send(
-                embed=build_error_embed(f"获取失败: {str(e)}"),
-                ephemeral=True,
-            )
-
-
-class PasscodeButtonView(discord.ui.View):
-    """提取码按钮视图"""
-
-    def __init__(self, expected_code: str, attachment_url: str, title: str):
-        super().__init__(timeout=300)  # 5分钟超时
-        self.expected_code = expected_code
-        self.attachment_url = attachment_url
-        self.resource_title = title
-
-    @discord.ui.button(label="输入提取码", emoji="🔐", style=discord.ButtonStyle.primary)
-    async def enter_passcode(
-        self, interaction: discord.Interaction, button: discord.ui.Button
-    ):
-        """点击按钮弹出提取码 Modal"""
-        modal = PasscodeModal(
-            expected_code=self.expected_code,
-            attachment_url=self.attachment_url,
-            title=self.resource_title,
         )
-        await interaction.response.send_modal(modal)
 
-async def handle_download_button(interaction: discord.Interaction, warehouse_id: int):
+
+async def deliver_work(
+    interaction: discord.Interaction,
+    deadline: ResponseDeadline,
+    warehouse_id: int,
+    shard: int = 0,
+):
     """
-    处理下载按钮点击
-    由 bot.py 的 on_interaction 调用
+    按下载门槛发送作品（下载按钮和 /获取作品 共用）
+
+    - 仓库记录已缓存时直接内联回复，提取码作品直接弹出提取码弹窗
+    - 读取仓库或回溯帖子较慢时由 deadline 在临近 3 秒时自动延迟应答，
+      此时提取码作品改为回复「输入提取码」按钮
     """
     bot = interaction.client
     channel = interaction.channel
 
     # 获取仓库频道
-    warehouse_channel = bot.warehouse_channel
+    warehouse_channel = bot.get_warehouse_channel(shard)
     if warehouse_channel is None:
-        await interaction.response.send_message(
-            embed=build_error_embed("仓库频道配置错误，请联系管理员"),
-            ephemeral=True,
-        )
+        await deadline.send(embed=build_error_embed("仓库频道配置错误，请联系管理员"))
         return
 
     try:
-        # 读取仓库消息
-        warehouse_message = await warehouse_channel.fetch_message(warehouse_id)
+        # 读取仓库记录（优先缓存）
+        with span("warehouse.get"):
+            record = await bot.warehouse_store.get(warehouse_id, shard)
 
         # 解析元数据
-        metadata = parse_metadata(warehouse_message.content)
+        metadata = record.metadata
         if metadata is None:
-            await interaction.response.send_message(
-                embed=build_error_embed("资源元数据解析失败"),
-                ephemeral=True,
-            )
+            await deadline.send(embed=build_error_embed("资源元数据解析失败"))
             return
 
         # 获取附件 URL
-        if not warehouse_message.attachments:
-            await interaction.response.send_message(
-                embed=build_error_embed("资源文件不存在"),
-                ephemeral=True,
-            )
+        if not record.attachments:
+            await deadline.send(embed=build_error_embed("资源文件不存在"))
             return
 
         # 多文件支持：构建所有附件的下载信息
-        attachments = warehouse_message.attachments
+        attachments = record.attachments
 
         # 根据下载要求进行鉴权
         dl_req_type = metadata.req.get("type", "自由下载")
 
         if dl_req_type == "自由下载":
             # 直接发送下载链接
-            if len(attachments) == 1:
-                embed = build_download_embed(metadata.title, attachments[0].url)
-            else:
-                # 多文件
-                links = "\n".join([f"📎 [{att.filename}]({att.url})" for att in attachments])
-                embed = discord.Embed(
-                    title="📥 下载就绪",
-                    description=f"**{metadata.title}**\n\n{links}\n\n⏰ 链接有效期约 24 小时",
-                    color=0x3BA55C,
-                )
-                embed.set_footer(text="请遵守版权规则")
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await send_download_links(interaction, metadata.title, attachments, deadline)
 
         elif dl_req_type == "互动":
             # 检查用户是否有互动
             if isinstance(channel, discord.Thread):
-                # 简化检查：检查用户是否在当前 Thread 有消息
-                has_interaction = False
-                async for message in channel.history(limit=200):
-                    if message.author.id == interaction.user.id:
-                        has_interaction = True
-                        break
+                with span("participants.check"):
+                    has_interaction = await bot.participant_index.has_participated(
+                        channel, interaction.user.id
+                    )
 
                 if has_interaction:
-                    if len(attachments) == 1:
-                        embed = build_download_embed(metadata.title, attachments[0].url)
-                    else:
-                        links = "\n".join([f"📎 [{att.filename}]({att.url})" for att in attachments])
-                        embed = discord.Embed(
-                            title="📥 下载就绪",
-                            description=f"**{metadata.title}**\n\n{links}\n\n⏰ 链接有效期约 24 小时",
-                            color=0x3BA55C,
-                        )
-                        embed.set_footer(text="请遵守版权规则")
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
+                    await send_download_links(interaction, metadata.title, attachments, deadline)
                 else:
-                    await interaction.response.send_message(
-                        embed=build_error_embed("需要先对帖子进行回应或回复才能下载"),
-                        ephemeral=True,
+                    await deadline.send(
+                        embed=build_error_embed("需要先对帖子进行回应（Reaction）或回复才能下载")
                     )
             else:
-                await interaction.response.send_message(
-                    embed=build_error_embed("此功能只能在帖子中使用"),
-                    ephemeral=True,
-                )
+                await deadline.send(embed=build_error_embed("此功能只能在帖子（Thread）中使用"))
 
         elif dl_req_type == "提取码":
-            # 弹出提取码验证 Modal
-            expected_code = metadata.req.get("code", "")
-            # 多文件时，使用第一个附件的 URL（或者可以在 Modal 中处理）
-            modal = PasscodeModal(
-                expected_code=expected_code,
-                attachment_url=attachments[0].url,
-                title=metadata.title,
-            )
-            await interaction.response.send_modal(modal)
+            # 弹出提取码验证 Modal（提交时再读取所有附件）
+            with span("send_modal"):
+                shown = await deadline.send_modal(PasscodeModal(warehouse_id, shard))
+            if not shown:
+                # 已延迟应答，无法再弹窗：改为回复按钮，由用户点击后弹窗
+                view = PasscodeEntryView(warehouse_id, metadata.uploader, shard)
+                with span("send_passcode_button"):
+                    await deadline.send(content="请点击下方按钮输入提取码：", view=view)
+                view.stop()
 
     except discord.NotFound:
-        await interaction.response.send_message(
-            embed=build_error_embed("资源已被删除或不存在"),
-            ephemeral=True,
-        )
+        await deadline.send(embed=build_error_embed("资源已被删除或不存在"))
     except Exception as e:
-        await interaction.response.send_message(
-            embed=build_error_embed(f"获取失败: {str(e)}"),
-            ephemeral=True,
-        )
+        await deadline.send(embed=build_error_embed(f"获取失败: {str(e)}"))
+
+
+class DownloadCog(commands.Cog):
+    """获取作品模块"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        """启动后台链接刷新任务"""
+        self.refresh_cdn_urls.change_interval(seconds=Config.CDN_REFRESH_INTERVAL)
+        self.refresh_cdn_urls.start()
+
+    async def cog_unload(self):
+        """停止后台链接刷新任务"""
+        self.refresh_cdn_urls.cancel()
+
+    @tasks.loop(seconds=600)
+    async def refresh_cdn_urls(self):
+        """定期批量刷新缓存中热门作品即将过期的附件链接"""
+        try:
+            await self.bot.warehouse_store.refresh_expiring(Config.CDN_REFRESH_AHEAD)
+        except Exception as e:
+            print(f"⚠️ 刷新附件链接失败: {e}")
+
+    async def find_work_in_thread(
+        self, channel: discord.TextChannel | discord.Thread
+    ) -> WorkEntry | None:
+        """
+        查找当前 Thread 中已发布的作品
+        优先查内存索引，未命中时回溯帖子历史并回填索引
+
+        Returns:
+            作品信息（含仓库消息 ID 和分片），未找到返回 None
+        """
+        return await self.bot.work_index.resolve(channel, self.bot.user.id)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        """记录帖内回复（只按频道 ID 查索引，不依赖频道缓存，未跟踪的频道直接忽略）"""
+        self.bot.participant_index.record_message(message.channel.id, message.author.id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        """记录对帖子首楼的回应（首楼消息 ID 与帖子 ID 相同）"""
+        if payload.message_id == payload.channel_id:
+            self.bot.participant_index.record_reaction_add(payload.channel_id, payload.user_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        """记录取消对帖子首楼的回应"""
+        if payload.message_id == payload.channel_id:
+            self.bot.participant_index.record_reaction_remove(payload.channel_id, payload.user_id)
+
+    @commands.Cog.listener()
+    async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent):
+        """帖子删除时清理记录"""
+        self.bot.participant_index.forget(payload.thread_id)
+        self.bot.work_index.remove(payload.thread_id)
+
+    @app_commands.command(name="获取作品", description="获取当前帖子的资源下载链接")
+    async def get_work(self, interaction: discord.Interaction):
+        """
+        获取作品命令
+        帖子索引和仓库记录已缓存时直接回复（提取码作品直接弹窗），较慢时自动延迟应答
+        """
+        async with self.bot.response_deadlines.watch(interaction) as deadline:
+            if await reject_if_throttled(interaction, deadline):
+                return
+
+            # 查找 WarehouseID
+            with span("work_index.resolve"):
+                entry = await self.find_work_in_thread(interaction.channel)
+
+            if entry is None:
+                await deadline.send(embed=build_error_embed("当前帖子中未找到已发布的作品"))
+                return
+
+            await deliver_work(interaction, deadline, entry.warehouse_id, entry.shard)
+
+
+async def handle_download_button(
+    interaction: discord.Interaction, button_id: ButtonId, deadline: ResponseDeadline
+):
+    """
+    处理下载按钮点击
+    由路由表分发，所有用户可用
+    """
+    if await reject_if_throttled(interaction, deadline):
+        return
+    await deliver_work(interaction, deadline, button_id.warehouse_id, button_id.shard)
+
+
+async def handle_passcode_button(
+    interaction: discord.Interaction, button_id: ButtonId, deadline: ResponseDeadline
+):
+    """处理「输入提取码」按钮：弹出提取码弹窗"""
+    with span("send_modal"):
+        shown = await deadline.send_modal(PasscodeModal(button_id.warehouse_id, button_id.shard))
+    if not shown:
+        await deadline.send(embed=build_error_embed("响应超时，请重新点击「输入提取码」"))
 
 
 async def setup(bot: commands.Bot):
-    """加载 Cog"""
+    """加载 Cog 并注册下载按钮路由"""
     await bot.add_cog(DownloadCog(bot))
+    bot.router.register("manage", "download", handle_download_button)
+    bot.router.register("manage", "passcode", handle_passcode_button)
@@ -3,13 +3,29 @@
 实现删除、更新和标注功能
 """
 
+import dataclasses
+
 import discord
 from discord.ext import commands
 
-from utils.metadata import create_metadata, parse_metadata
+from config import Config
+from utils.chunking import (
+    build_manifest,
+    check_content_length,
+    delete_parts,
+    get_part_size,
+    plan_upload,
+    upload_chunked,
+)
+from utils.metadata import parse_metadata
+from utils.custom_id import ButtonId
+from utils.deadline import ResponseDeadline
+from utils.tracing import span
+from utils.work_index import WorkEntry
 from utils.embed_builder import (
     build_publish_embed,
     build_error_embed,
+    build_progress_embed,
     build_success_embed,
 )
 
@@ -52,15 +68,28 @@ class UpdateWorkModal(discord.ui.Modal, title="更新作品信息"):
         max_length=50,
     )
 
-    def __init__(self, warehouse_message_id: int, bot: commands.Bot, original_message: discord.Message):
+    def __init__(
+        self,
+        warehouse_message_id: int,
+        bot: commands.Bot,
+        original_message: discord.Message,
+        shard: int = 0,
+    ):
         super().__init__()
         self.warehouse_message_id = warehouse_message_id
+        self.shard = shard
         self.bot = bot
         self.original_message = original_message
 
     async def on_submit(self, interaction: discord.Interaction):
         """提交更新"""
-        await interaction.response.defer(ephemeral=True)
+        async with self.bot.instrument("action", "update_info", interaction):
+            await self._do_update(interaction)
+
+    async def _do_update(self, interaction: discord.Interaction):
+        """执行更新操作"""
+        with span("defer"):
+            await interaction.response.defer(ephemeral=True)
 
         # 解析输入
         new_title = self.title_input.value
@@ -78,17 +107,9 @@ class UpdateWorkModal(discord.ui.Modal, title="更新作品信息"):
             )
             return
 
-        # 验证提取码
-        if dl_req == "提取码" and not passcode:
-            await interaction.followup.send(
-                embed=build_error_embed("提取码模式需要填写提取码"),
-                ephemeral=True,
-            )
-            return
-
         try:
             # 获取仓库频道
-            warehouse_channel = self.bot.warehouse_channel
+            warehouse_channel = self.bot.get_warehouse_channel(self.shard)
             if warehouse_channel is None:
                 await interaction.followup.send(
                     embed=build_error_embed("仓库频道配置错误"),
@@ -96,62 +117,66 @@ class UpdateWorkModal(discord.ui.Modal, title="更新作品信息"):
                 )
                 return
 
-            # 获取旧的仓库消息
-            old_warehouse_message = await warehouse_channel.fetch_message(
-                self.warehouse_message_id
-            )
-
-            # 下载旧附件到内存
-            if not old_warehouse_message.attachments:
+            # 读取原元数据（优先缓存）
+            with span("warehouse.get"):
+                old_record = await self.bot.warehouse_store.get(self.warehouse_message_id, self.shard)
+            old_metadata = old_record.metadata
+            if old_metadata is None:
                 await interaction.followup.send(
-                    embed=build_error_embed("原资源文件不存在"),
+                    embed=build_error_embed("原作品元数据解析失败"),
                     ephemeral=True,
                 )
                 return
 
-            file_data = await old_warehouse_message.attachments[0].to_file()
+            # 提取码留空表示沿用原提取码
+            if passcode is None and dl_req == "提取码":
+                passcode = old_metadata.req.get("code")
 
-            # 构造新的元数据
-            new_metadata = create_metadata(
-                uploader_id=interaction.user.id,
+            # 验证提取码
+            if dl_req == "提取码" and not passcode:
+                await interaction.followup.send(
+                    embed=build_error_embed("提取码模式需要填写提取码"),
+                    ephemeral=True,
+                )
+                return
+
+            # 构造新的元数据（保留上传者等其余字段）
+            new_metadata = dataclasses.replace(
+                old_metadata,
                 title=new_title,
-                rule_repost=rule_repost,
-                rule_modify=rule_modify,
-                dl_req_type=dl_req,
-                passcode=passcode,
+                rules={"repost": rule_repost, "modify": rule_modify},
+                req={"type": dl_req, "code": passcode},
             )
 
-            # 删除旧的仓库消息
-            await old_warehouse_message.delete()
-
-            # 发送新的仓库消息
-            new_warehouse_message = await warehouse_channel.send(
-                content=new_metadata.to_json(),
-                file=file_data,
-            )
+            # 仅改写仓库消息内容，附件和仓库消息 ID 保持不变（经写入队列限速）
+            partial_message = warehouse_channel.get_partial_message(self.warehouse_message_id)
+            with span("warehouse.edit"):
+                warehouse_message = await self.bot.write_queue.run(
+                    ("edit", warehouse_channel.id),
+                    lambda: partial_message.edit(content=new_metadata.to_json()),
+                )
+            self.bot.warehouse_store.invalidate(self.warehouse_message_id)
+            self.bot.warehouse_store.put(warehouse_message)
 
-            # 更新公开 Embed
+            # 更新公开 Embed（按钮中的仓库消息 ID 未变，无需重建视图）
             new_embed = build_publish_embed(
                 metadata=new_metadata,
-                warehouse_message_id=new_warehouse_message.id,
-            )
-
-            # 创建新的管理按钮视图
-            from cogs.publish import PersistentManageView
-
-            new_view = PersistentManageView(
-                warehouse_message_id=new_warehouse_message.id,
-                uploader_id=interaction.user.id,
+                warehouse_message_id=self.warehouse_message_id,
+                file_count=len(new_metadata.files) or len(warehouse_message.attachments),
             )
-
-            # 编辑原公开消息
-            await self.original_message.edit(embed=new_embed, view=new_view)
+            with span("edit_public"):
+                await self.original_message.edit(embed=new_embed)
 
             await interaction.followup.send(
                 embed=build_success_embed("作品信息已更新"),
                 ephemeral=True,
             )
 
+        except discord.NotFound:
+            await interaction.followup.send(
+                embed=build_error_embed("原作品已被删除或不存在"),
+                ephemeral=True,
+            )
         except Exception as e:
             await interaction.followup.send(
                 embed=build_error_embed(f"更新失败: {str(e)}"),
@@ -160,14 +185,17 @@ class UpdateWorkModal(discord.ui.Modal, title="更新作品信息"):
 
 
 async def handle_delete_work(
-    interaction: discord.Interaction, warehouse_message_id: int
+    interaction: discord.Interaction, button_id: ButtonId, deadline: ResponseDeadline
 ):
     """处理删除作品"""
-    await interaction.response.defer(ephemeral=True)
+    with span("defer"):
+        await deadline.defer()
+    warehouse_message_id = button_id.warehouse_id
+    shard = button_id.shard
 
     try:
         # 获取仓库频道
-        warehouse_channel = interaction.client.warehouse_channel
+        warehouse_channel = interaction.client.get_warehouse_channel(shard)
         if warehouse_channel is None:
             await interaction.followup.send(
                 embed=build_error_embed("仓库频道配置错误"),
@@ -175,15 +203,29 @@ async def handle_delete_work(
             )
             return
 
-        # 删除仓库消息
+        # 读取分卷消息 ID（优先缓存），删除仓库消息后无法再获取
         try:
-            warehouse_message = await warehouse_channel.fetch_message(warehouse_message_id)
-            await warehouse_message.delete()
+            with span("warehouse.get"):
+                record = await interaction.client.warehouse_store.get(warehouse_message_id, shard)
+            part_ids = record.part_ids
         except discord.NotFound:
-            pass  # 仓库消息可能已被删除
+            part_ids = []  # 仓库消息可能已被删除
+
+        # 删除仓库消息及其分卷
+        with span("warehouse.delete"):
+            try:
+                await warehouse_channel.get_partial_message(warehouse_message_id).delete()
+            except discord.NotFound:
+                pass  # 仓库消息可能已被删除
+            await delete_parts(warehouse_channel, part_ids)
+        interaction.client.warehouse_store.discard(warehouse_message_id, part_ids)
 
         # 删除公开 Embed 消息
-        await interaction.message.delete()
+        with span("delete_public"):
+            await interaction.message.delete()
+
+        # 从帖子 → 作品索引中移除
+        interaction.client.work_index.remove(interaction.channel_id, interaction.message.id)
 
         await interaction.followup.send(
             embed=build_success_embed("作品已删除"),
@@ -197,21 +239,26 @@ async def handle_delete_work(
         )
 
 
-async def handle_toggle_pin(interaction: discord.Interaction):
+async def handle_toggle_pin(
+    interaction: discord.Interaction, button_id: ButtonId, deadline: ResponseDeadline
+):
     """处理标注/取消标注"""
-    await interaction.response.defer(ephemeral=True)
+    with span("defer"):
+        await deadline.defer()
 
     try:
         message = interaction.message
 
         if message.pinned:
-            await message.unpin()
+            with span("unpin"):
+                await message.unpin()
             await interaction.followup.send(
                 embed=build_success_embed("已取消标注"),
                 ephemeral=True,
             )
         else:
-            await message.pin()
+            with span("pin"):
+                await message.pin()
             await interaction.followup.send(
                 embed=build_success_embed("已标注消息"),
                 ephemeral=True,
@@ -230,15 +277,19 @@ async def handle_toggle_pin(interaction: discord.Interaction):
 
 
 async def handle_update_work(
-    interaction: discord.Interaction, warehouse_message_id: int
+    interaction: discord.Interaction, button_id: ButtonId, deadline: ResponseDeadline
 ):
     """处理更新作品"""
     modal = UpdateWorkModal(
-        warehouse_message_id=warehouse_message_id,
+        warehouse_message_id=button_id.warehouse_id,
         bot=interaction.client,
         original_message=interaction.message,
+        shard=button_id.shard,
     )
-    await interaction.response.send_modal(modal)
+    with span("send_modal"):
+        shown = await deadline.send_modal(modal)
+    if not shown:
+        await deadline.send(embed=build_error_embed("响应超时，请重新点击「更新」"))
 
 
 class ManageCog(commands.Cog):
@@ -249,63 +300,32 @@ class ManageCog(commands.Cog):
 
     async def find_user_embed_in_thread(
         self, channel: discord.TextChannel | discord.Thread, user_id: int
-    ) -> tuple[discord.Message, int] | None:
+    ) -> tuple[discord.PartialMessage, WorkEntry] | None:
         """
         在当前 Thread 中查找用户发布的作品 Embed
+        优先查内存索引，未命中时回溯帖子历史并回填索引
 
         Returns:
-            (消息对象, warehouse_id) 或 None
+            (消息对象, 作品信息) 或 None
         """
-        async for message in channel.history(limit=100):
-            # 检查是否是 Bot 发送的消息
-            if message.author.id != self.bot.user.id:
-                continue
-
-            # 检查是否有 Embed
-            if not message.embeds:
-                continue
-
-            embed = message.embeds[0]
-
-            # 检查 footer 是否包含作品ID
-            if not embed.footer or not embed.footer.text:
-                continue
-
-            footer_text = embed.footer.text
-            
-            # 支持多种 footer 格式
-            warehouse_id = None
-            if footer_text.startswith("WarehouseID:"):
-                try:
-                    warehouse_id = int(footer_text.replace("WarehouseID:", "").strip())
-                except ValueError:
-                    continue
-            elif footer_text.startswith("作品ID:") or footer_text.startswith("ID:"):
-                try:
-                    warehouse_id = int(footer_text.split(":")[-1].strip())
-                except ValueError:
-                    continue
-            else:
-                continue
-            
-            if warehouse_id is None:
-                continue
-
-            # 获取仓库消息验证上传者
-            try:
-                warehouse_channel = self.bot.warehouse_channel
-                if warehouse_channel is None:
-                    continue
+        entry = await self.bot.work_index.resolve(channel, self.bot.user.id)
+        if entry is None:
+            return None
 
-                warehouse_message = await warehouse_channel.fetch_message(warehouse_id)
-                metadata = parse_metadata(warehouse_message.content)
+        # 旧消息无法从按钮解析上传者时，读取仓库元数据补全
+        if entry.uploader is None:
+            try:
+                record = await self.bot.warehouse_store.get(entry.warehouse_id, entry.shard)
+            except (discord.HTTPException, RuntimeError):
+                return None
+            if record.metadata is None:
+                return None
+            entry.uploader = record.metadata.uploader
 
-                if metadata and metadata.uploader == user_id:
-                    return (message, warehouse_id)
-            except Exception:
-                continue
+        if entry.uploader != user_id:
+            return None
 
-        return None
+        return (channel.get_partial_message(entry.public_message_id), entry)
 
     @discord.app_commands.command(name="更新作品", description="更新当前帖子中你发布的作品文件")
     @discord.app_commands.describe(
@@ -325,7 +345,8 @@ class ManageCog(commands.Cog):
         file5: discord.Attachment = None,
     ):
         """更新作品命令"""
-        await interaction.response.defer(ephemeral=True)
+        with span("defer"):
+            await interaction.response.defer(ephemeral=True)
 
         channel = interaction.channel
 
@@ -333,7 +354,8 @@ class ManageCog(commands.Cog):
         files = [f for f in [file1, file2, file3, file4, file5] if f is not None]
 
         # 查找用户在当前帖子发布的作品
-        result = await self.find_user_embed_in_thread(channel, interaction.user.id)
+        with span("work_index.resolve"):
+            result = await self.find_user_embed_in_thread(channel, interaction.user.id)
 
         if result is None:
             await interaction.followup.send(
@@ -342,11 +364,12 @@ class ManageCog(commands.Cog):
             )
             return
 
-        original_message, old_warehouse_id = result
+        original_message, entry = result
+        old_warehouse_id = entry.warehouse_id
 
         try:
             # 获取仓库频道
-            warehouse_channel = self.bot.warehouse_channel
+            warehouse_channel = self.bot.get_warehouse_channel(entry.shard)
             if warehouse_channel is None:
                 await interaction.followup.send(
                     embed=build_error_embed("仓库频道配置错误"),
@@ -354,8 +377,11 @@ class ManageCog(commands.Cog):
                 )
                 return
 
-            # 获取旧的仓库消息和元数据
-            old_warehouse_message = await warehouse_channel.fetch_message(old_warehouse_id)
+            # 获取旧的仓库消息（需要原附件对象以便保留未变化的文件）
+            with span("warehouse.fetch_message"):
+                old_warehouse_message = await self.bot.warehouse_store.fetch_message(
+                    old_warehouse_id, entry.shard
+                )
             old_metadata = parse_metadata(old_warehouse_message.content)
 
             if old_metadata is None:
@@ -365,56 +391,117 @@ class ManageCog(commands.Cog):
                 )
                 return
 
-            # 下载新文件到内存
-            files_data = []
-            for f in files:
-                file_data = await f.to_file()
-                files_data.append(file_data)
-
-            # 构造新的元数据（保留原有设置）
-            new_metadata = create_metadata(
-                uploader_id=interaction.user.id,
-                title=old_metadata.title,
-                rule_repost=old_metadata.rules.get("repost", False),
-                rule_modify=old_metadata.rules.get("modify", True),
-                dl_req_type=old_metadata.req.get("type", "自由下载"),
-                passcode=old_metadata.req.get("code"),
-            )
+            # 原文件按 (SHA-256, 文件名) 建索引
+            # 直接存储的文件与附件顺序一致，分卷文件只需保留其清单条目
+            inline_entries = [e for e in old_metadata.files if not e.get("parts")]
+            existing: dict[tuple[str, str], tuple[dict, discord.Attachment | None]] = {}
+            if len(inline_entries) == len(old_warehouse_message.attachments):
+                for file_entry, attachment in zip(inline_entries, old_warehouse_message.attachments):
+                    if file_entry.get("sha256"):
+                        key = (file_entry["sha256"], file_entry.get("name", ""))
+                        existing[key] = (file_entry, attachment)
+            for file_entry in old_metadata.files:
+                if file_entry.get("parts") and file_entry.get("sha256"):
+                    key = (file_entry["sha256"], file_entry.get("name", ""))
+                    existing[key] = (file_entry, None)
+
+            # 流式中转新文件并计算哈希，只上传内容有变化的文件
+            async with self.bot.attachment_relay.open(files) as relayed:
+                kept: list[discord.Attachment] = []
+                kept_manifest: list[dict] = []
+                uploads = []
+                for f in relayed:
+                    found = existing.pop((f.sha256, f.filename), None)
+                    if found is None:
+                        uploads.append(f)
+                        continue
+                    file_entry, attachment = found
+                    kept_manifest.append(file_entry)
+                    if attachment is not None:
+                        kept.append(attachment)
+
+                if not uploads and not existing:
+                    await interaction.followup.send(
+                        embed=build_success_embed("文件内容未变化，无需更新"),
+                        ephemeral=True,
+                    )
+                    return
+
+                # 新文件中超过上传上限的拆分为分卷
+                part_size = get_part_size(warehouse_channel, Config.CHUNK_SIZE)
+                inline, chunked = plan_upload(
+                    uploads, part_size, reserved=sum(att.size for att in kept)
+                )
 
-            # 删除旧的仓库消息
-            await old_warehouse_message.delete()
+                # 提示已进入上传队列
+                with span("edit_progress"):
+                    await interaction.edit_original_response(
+                        embed=build_progress_embed(
+                            f"已加入上传队列（前方 {self.bot.write_queue.depth} 个任务）"
+                        ),
+                    )
 
-            # 发送新的仓库消息（包含新文件）
-            new_warehouse_message = await warehouse_channel.send(
-                content=new_metadata.to_json(),
-                files=files_data,
-            )
+                async def _on_start():
+                    await interaction.edit_original_response(
+                        embed=build_progress_embed(f"正在上传 {len(uploads)} 个文件...")
+                    )
+
+                with span("upload_parts"):
+                    parts = await upload_chunked(self.bot, warehouse_channel, chunked, part_size)
+                part_ids = [m.id for messages in parts for m in messages]
 
-            # 更新公开 Embed
+                try:
+                    # 构造新的元数据（保留原有设置，附件顺序为保留的文件在前）
+                    new_metadata = dataclasses.replace(
+                        old_metadata,
+                        files=kept_manifest + build_manifest(uploads, chunked, parts),
+                    )
+                    content = new_metadata.to_json()
+                    check_content_length(content)
+
+                    # 原地编辑仓库消息，仓库消息 ID 保持不变
+                    with span("warehouse.edit"):
+                        new_warehouse_message = await self.bot.write_queue.run(
+                            ("edit", warehouse_channel.id),
+                            lambda: old_warehouse_message.edit(
+                                content=content,
+                                attachments=kept + [f.to_file() for f in inline],
+                            ),
+                            on_start=_on_start,
+                        )
+                except BaseException:
+                    # 编辑失败时清理本次上传的分卷
+                    await delete_parts(warehouse_channel, part_ids)
+                    raise
+
+            # 清理已被替换的旧分卷
+            removed_parts = [
+                part_id
+                for file_entry, _ in existing.values()
+                for part_id in file_entry.get("parts", [])
+            ]
+            with span("delete_parts"):
+                await delete_parts(warehouse_channel, removed_parts)
+
+            # 分卷消息由下次读取时重新获取
+            self.bot.warehouse_store.invalidate(old_warehouse_id)
+            self.bot.warehouse_store.put(new_warehouse_message)
+
+            # 更新公开 Embed（按钮中的仓库消息 ID 未变，无需重建视图）
             new_embed = build_publish_embed(
                 metadata=new_metadata,
-                warehouse_message_id=new_warehouse_message.id,
-            )
-
-            # 添加文件数量信息
-            if len(files) > 1:
-                new_embed.add_field(name="📎 文件数量", value=f"{len(files)} 个", inline=True)
-
-            # 创建新的管理按钮视图
-            from cogs.publish import PersistentManageView
-
-            new_view = PersistentManageView(
-                warehouse_message_id=new_warehouse_message.id,
-                uploader_id=interaction.user.id,
-            )
-
-            # 编辑原公开消息
-            await original_message.edit(embed=new_embed, view=new_view)
-
-            await interaction.followup.send(
-                embed=build_success_embed(f"作品文件已更新（共 {len(files)} 个文件）"),
-                ephemeral=True,
+                warehouse_message_id=old_warehouse_id,
+                file_count=len(files),
             )
+            with span("edit_public"):
+                await original_message.edit(embed=new_embed)
+
+            with span("edit_progress"):
+                await interaction.edit_original_response(
+                    embed=build_success_embed(
+                        f"作品文件已更新（共 {len(files)} 个文件，上传 {len(uploads)} 个）"
+                    ),
+                )
 
         except Exception as e:
             await interaction.followup.send(
@@ -424,5 +511,8 @@ class ManageCog(commands.Cog):
 
 
 async def setup(bot: commands.Bot):
-    """加载 Cog"""
+    """加载 Cog 并注册管理按钮路由（仅发布者可用）"""
     await bot.add_cog(ManageCog(bot))
+    bot.router.register("manage", "delete", handle_delete_work, owner_only=True)
+    bot.router.register("manage", "pin", handle_toggle_pin, owner_only=True)
+    bot.router.register("manage", "update", handle_update_work, owner_only=True)
@@ -9,29 +9,56 @@ from discord import app_commands
 from discord.ext import commands
 
 from config import Config
+from utils.chunking import (
+    build_manifest,
+    check_content_length,
+    delete_parts,
+    get_part_size,
+    plan_upload,
+    upload_chunked,
+)
 from utils.metadata import create_metadata
-from utils.embed_builder import build_publish_embed, build_error_embed, build_success_embed
+from utils.custom_id import ButtonId
+from utils.tracing import span
+from utils.work_index import WorkEntry
+from utils.embed_builder import (
+    build_publish_embed,
+    build_error_embed,
+    build_progress_embed,
+    build_success_embed,
+)
 
 
 class PersistentManageView(discord.ui.View):
     """
     持久化的发布者管理按钮视图
-    将 warehouse_message_id 和 uploader_id 编码到 custom_id 中
+    将 warehouse_message_id、uploader_id 和仓库分片编码到 custom_id 中
     这样 Bot 重启后仍能处理按钮交互
     
-    注意：按钮回调由 bot.py 的 on_interaction 统一处理，
+    注意：按钮回调由 bot.router 路由表统一处理（下载 / 管理模块加载时注册），
     这里只负责创建带有正确 custom_id 的按钮
     """
 
-    def __init__(self, warehouse_message_id: int = 0, uploader_id: int = 0):
+    def __init__(self, warehouse_message_id: int = 0, uploader_id: int = 0, shard: int = 0):
         super().__init__(timeout=None)
         self.warehouse_message_id = warehouse_message_id
         self.uploader_id = uploader_id
+        self.shard = shard
 
         # 动态创建带有元数据的按钮（不设置回调，由 on_interaction 处理）
         if warehouse_message_id and uploader_id:
             self._create_buttons()
 
+    def _custom_id(self, action: str) -> str:
+        """编码按钮 custom_id（格式见 ButtonId）"""
+        return ButtonId(
+            prefix="manage",
+            action=action,
+            warehouse_id=self.warehouse_message_id,
+            uploader_id=self.uploader_id,
+            shard=self.shard,
+        ).encode()
+
     def _create_buttons(self):
         """创建带有编码 ID 的按钮"""
         # 清除默认按钮
@@ -42,19 +69,18 @@ class PersistentManageView(discord.ui.View):
             label="下载作品",
             emoji="📥",
             style=discord.ButtonStyle.success,
-            custom_id=f"manage:download:{self.warehouse_message_id}:{self.uploader_id}",
+            custom_id=self._custom_id("download"),
             row=0,
         )
         self.add_item(download_btn)
 
         # ===== 第二行：仅发布者可用的管理按钮 =====
-        # 格式: manage:action:warehouse_id:uploader_id
-        # 注意：不设置 callback，由 bot.py 的 on_interaction 统一处理
+        # 注意：不设置 callback，由路由表统一处理
         delete_btn = discord.ui.Button(
             label="删除",
             emoji="🗑️",
             style=discord.ButtonStyle.danger,
-            custom_id=f"manage:delete:{self.warehouse_message_id}:{self.uploader_id}",
+            custom_id=self._custom_id("delete"),
             row=1,
         )
         self.add_item(delete_btn)
@@ -63,7 +89,7 @@ class PersistentManageView(discord.ui.View):
             label="标注",
             emoji="📌",
             style=discord.ButtonStyle.secondary,
-            custom_id=f"manage:pin:{self.warehouse_message_id}:{self.uploader_id}",
+            custom_id=self._custom_id("pin"),
             row=1,
         )
         self.add_item(pin_btn)
@@ -72,7 +98,7 @@ class PersistentManageView(discord.ui.View):
             label="更新",
             emoji="📝",
             style=discord.ButtonStyle.primary,
-            custom_id=f"manage:update:{self.warehouse_message_id}:{self.uploader_id}",
+            custom_id=self._custom_id("update"),
             row=1,
         )
         self.add_item(update_btn)
@@ -246,8 +272,10 @@ class DownloadReqSelectView(discord.ui.View):
             )
             return
 
-        await interaction.response.defer(ephemeral=True)
-        await self._do_publish(interaction)
+        async with self.bot.instrument("action", "publish", interaction):
+            with span("defer"):
+                await interaction.response.defer(ephemeral=True)
+            await self._do_publish(interaction)
 
     @discord.ui.button(label="取消", emoji="❌", style=discord.ButtonStyle.danger, row=1)
     async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -259,7 +287,9 @@ class DownloadReqSelectView(discord.ui.View):
 
     async def _do_publish(self, interaction: discord.Interaction):
         """执行发布操作"""
-        warehouse_channel = self.bot.warehouse_channel
+        # 按帖子选择仓库分片
+        shard = self.bot.pick_warehouse_shard(self.channel.id)
+        warehouse_channel = self.bot.get_warehouse_channel(shard)
         if warehouse_channel is None:
             await interaction.followup.send(
                 embed=build_error_embed("仓库频道配置错误，请联系管理员"),
@@ -268,52 +298,102 @@ class DownloadReqSelectView(discord.ui.View):
             return
 
         try:
-            # 构造元数据
-            metadata = create_metadata(
-                uploader_id=self.session.user_id,
-                title=self.session.title,
-                rule_repost=self.session.rule_repost,
-                rule_modify=self.session.rule_modify,
-                dl_req_type=self.session.dl_req,
-                passcode=self.session.passcode,
-            )
-
-            # 下载所有文件到内存
-            files_data = []
-            for attachment in self.session.files:
-                file_data = await attachment.to_file()
-                files_data.append(file_data)
-
-            # 入库：将文件和元数据发送到仓库频道
-            warehouse_message = await warehouse_channel.send(
-                content=metadata.to_json(),
-                files=files_data,
-            )
+            # 提示正在中转文件
+            with span("edit_progress"):
+                await interaction.edit_original_response(
+                    embed=build_progress_embed(f"正在准备作品「{self.session.title}」的文件..."),
+                    view=None,
+                )
+
+            # 流式中转所有文件，入库：将文件和元数据发送到仓库频道
+            async with self.bot.attachment_relay.open(self.session.files) as relayed:
+                # 超过上传上限的文件拆分为分卷，各分卷单独入库
+                part_size = get_part_size(warehouse_channel, Config.CHUNK_SIZE)
+                inline, chunked = plan_upload(relayed, part_size)
+
+                # 提示已进入上传队列
+                with span("edit_progress"):
+                    await interaction.edit_original_response(
+                        embed=build_progress_embed(
+                            f"作品「{self.session.title}」已加入上传队列"
+                            f"（前方 {self.bot.write_queue.depth} 个任务）"
+                        ),
+                    )
+
+                async def _on_start():
+                    await interaction.edit_original_response(
+                        embed=build_progress_embed(f"正在上传作品「{self.session.title}」的文件...")
+                    )
+
+                with span("upload_parts"):
+                    parts = await upload_chunked(self.bot, warehouse_channel, chunked, part_size)
+                part_messages = {m.id: m for messages in parts for m in messages}
+
+                try:
+                    # 构造元数据（附带文件清单）
+                    metadata = create_metadata(
+                        uploader_id=self.session.user_id,
+                        title=self.session.title,
+                        rule_repost=self.session.rule_repost,
+                        rule_modify=self.session.rule_modify,
+                        dl_req_type=self.session.dl_req,
+                        passcode=self.session.passcode,
+                        files=build_manifest(relayed, chunked, parts),
+                    )
+                    content = metadata.to_json()
+                    check_content_length(content)
+
+                    with span("warehouse.send"):
+                        warehouse_message = await self.bot.write_queue.run(
+                            ("send", warehouse_channel.id),
+                            lambda: warehouse_channel.send(
+                                content=content,
+                                files=[f.to_file() for f in inline],
+                            ),
+                            on_start=_on_start,
+                        )
+                except BaseException:
+                    # 主消息发送失败时清理已上传的分卷
+                    await delete_parts(warehouse_channel, list(part_messages))
+                    raise
+
+            metadata = self.bot.warehouse_store.put(warehouse_message, part_messages).metadata
 
             # 构建公开 Embed
             embed = build_publish_embed(
                 metadata=metadata,
                 warehouse_message_id=warehouse_message.id,
+                file_count=len(self.session.files),
             )
 
-            # 添加文件数量信息
-            if len(self.session.files) > 1:
-                embed.add_field(name="📎 文件数量", value=f"{len(self.session.files)} 个", inline=True)
-
             # 创建管理按钮视图
             view = PersistentManageView(
                 warehouse_message_id=warehouse_message.id,
                 uploader_id=self.session.user_id,
+                shard=shard,
             )
 
             # 发送公开 Embed
-            public_message = await self.channel.send(embed=embed, view=view)
+            with span("send_public"):
+                public_message = await self.channel.send(embed=embed, view=view)
+
+            # 记录帖子 → 作品索引
+            self.bot.work_index.set(
+                self.channel.id,
+                WorkEntry(
+                    public_message_id=public_message.id,
+                    warehouse_id=warehouse_message.id,
+                    uploader=self.session.user_id,
+                    shard=shard,
+                ),
+            )
 
             # 更新原消息
-            await interaction.edit_original_response(
-                embed=build_success_embed(f"作品「{self.session.title}」发布成功！"),
-                view=None,
-            )
+            with span("edit_progress"):
+                await interaction.edit_original_response(
+                    embed=build_success_embed(f"作品「{self.session.title}」发布成功！"),
+                    view=None,
+                )
 
         except Exception as e:
             await interaction.followup.send(
@@ -397,6 +477,13 @@ class PublishCog(commands.Cog):
 
         # 2. 检查是否是论坛频道的帖子
         parent = channel.parent
+        if parent is None and channel.parent_id:
+            # HTTP 交互模式没有频道缓存，按 parent_id 读取父频道
+            try:
+                with span("fetch_parent"):
+                    parent = await self.bot.fetch_channel(channel.parent_id)
+            except discord.HTTPException:
+                parent = None
         if not isinstance(parent, discord.ForumChannel):
             await interaction.response.send_message(
                 embed=build_error_embed("此命令只能在论坛类型的频道中使用"),
@@ -405,7 +492,7 @@ class PublishCog(commands.Cog):
             return
 
         # 3. 检查频道是否在白名单中
-        if not Config.is_channel_allowed(parent.id):
+        if not Config.is_channel_allowed(channel.parent_id):
             await interaction.response.send_message(
                 embed=build_error_embed("此频道未被授权使用发布命令"),
                 ephemeral=True,
@@ -7,6 +7,8 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from utils.runtime import PROFILES
+
 # 加载 .env 文件
 load_dotenv()
 
@@ -24,6 +26,98 @@ class Config:
     # 仓库频道 ID（用于存储文件）
     WAREHOUSE_CHANNEL_ID: int = int(os.getenv("WAREHOUSE_CHANNEL_ID", "0"))
 
+    # 仓库频道池（逗号分隔，按分片顺序排列，只能在末尾追加）
+    # 未配置时仅使用 WAREHOUSE_CHANNEL_ID
+    WAREHOUSE_CHANNEL_IDS: list[int] = [
+        int(channel_id)
+        for channel_id in os.getenv("WAREHOUSE_CHANNEL_IDS", "").split(",")
+        if channel_id.strip()
+    ] or ([WAREHOUSE_CHANNEL_ID] if WAREHOUSE_CHANNEL_ID else [])
+
+    # 仓库记录缓存：过期时间（秒）和最大条目数
+    WAREHOUSE_CACHE_TTL: float = float(os.getenv("WAREHOUSE_CACHE_TTL", "21600"))
+    WAREHOUSE_CACHE_SIZE: int = int(os.getenv("WAREHOUSE_CACHE_SIZE", "1024"))
+
+    # CDN 附件链接：读取时剩余有效期低于该值（秒）即刷新
+    CDN_REFRESH_MARGIN: float = float(os.getenv("CDN_REFRESH_MARGIN", "600"))
+    # 后台主动刷新的检查间隔与提前量（秒）
+    CDN_REFRESH_INTERVAL: float = float(os.getenv("CDN_REFRESH_INTERVAL", "600"))
+    CDN_REFRESH_AHEAD: float = float(os.getenv("CDN_REFRESH_AHEAD", "3600"))
+
+    # 附件中转：单个文件在内存中缓冲的上限、所有中转文件共享的内存预算（字节）
+    RELAY_SPOOL_MAX_SIZE: int = int(os.getenv("RELAY_SPOOL_MAX_SIZE", str(8 * 1024 * 1024)))
+    RELAY_MEMORY_BUDGET: int = int(os.getenv("RELAY_MEMORY_BUDGET", str(64 * 1024 * 1024)))
+
+    # 附件中转：所有发布 / 更新共享的并行下载数、单个文件下载超时（秒）
+    RELAY_CONCURRENCY: int = int(os.getenv("RELAY_CONCURRENCY", "4"))
+    RELAY_FILE_TIMEOUT: float = float(os.getenv("RELAY_FILE_TIMEOUT", "120"))
+
+    # 仓库写入队列：工作协程数量、每个频道每种写操作在 WRITE_RATE_PERIOD 秒内的最大次数
+    WRITE_QUEUE_WORKERS: int = int(os.getenv("WRITE_QUEUE_WORKERS", "4"))
+    WRITE_RATE_LIMIT: int = int(os.getenv("WRITE_RATE_LIMIT", "5"))
+    WRITE_RATE_PERIOD: float = float(os.getenv("WRITE_RATE_PERIOD", "5"))
+
+    # 分卷大小（字节）：超过该大小的文件拆分为多个分卷存储，0 表示使用服务器上传上限
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "0"))
+
+    # 本地快照（SQLite）路径，留空则不启用；重启后从快照恢复索引和仓库记录
+    SNAPSHOT_PATH: str = os.getenv("SNAPSHOT_PATH", "")
+
+    # 斜杠命令同步状态文件：命令树哈希未变化时启动不再调用同步接口
+    COMMAND_SYNC_STATE: str = os.getenv("COMMAND_SYNC_STATE", "data/command_sync.json")
+    # 测试用：只同步到指定服务器（立即生效），0 表示全局同步
+    SYNC_GUILD_ID: int = int(os.getenv("SYNC_GUILD_ID", "0"))
+
+    # 交互入口：gateway（网关连接）或 http（Interactions Endpoint URL，可多进程）
+    INGRESS_MODE: str = os.getenv("INGRESS_MODE", "gateway").lower()
+    # HTTP 模式：应用公钥（开发者后台 General Information 页面）、监听地址、工作进程数
+    DISCORD_PUBLIC_KEY: str = os.getenv("DISCORD_PUBLIC_KEY", "")
+    HTTP_HOST: str = os.getenv("HTTP_HOST", "0.0.0.0")
+    HTTP_PORT: int = int(os.getenv("HTTP_PORT", "8080"))
+    HTTP_PATH: str = os.getenv("HTTP_PATH", "/interactions")
+    HTTP_WORKERS: int = int(os.getenv("HTTP_WORKERS", "1"))
+    # HTTP 模式下仓库记录的缓存时间（秒）：其他工作进程修改作品后，本进程最多在这段时间内读到旧记录
+    HTTP_CACHE_TTL: float = float(os.getenv("HTTP_CACHE_TTL", "60"))
+
+    # 帖子索引未命中时从帖子开头读取的消息数量（公开消息在发布时发送，通常位于帖子开头）
+    WORK_SCAN_LIMIT: int = int(os.getenv("WORK_SCAN_LIMIT", "100"))
+
+    # 参与者索引最多跟踪的帖子数量（「互动」下载门槛使用）
+    PARTICIPANT_INDEX_SIZE: int = int(os.getenv("PARTICIPANT_INDEX_SIZE", "2048"))
+
+    # 运行配置档：default（旧版本行为）或 lean（最少 Intents、关闭成员缓存，适合大服务器）
+    RUNTIME_PROFILE: str = os.getenv("RUNTIME_PROFILE", "default").lower()
+    # 消息缓存上限，留空使用配置档默认值（default 为 1000，lean 为关闭），0 表示关闭
+    MAX_MESSAGES: int | None = int(os.getenv("MAX_MESSAGES")) if os.getenv("MAX_MESSAGES") else None
+
+    # 指标端点：Prometheus 文本格式，端口为 0 时不启动（多个 HTTP 工作进程依次使用 端口+序号）
+    METRICS_HOST: str = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "0"))
+
+    # 交互追踪：JSONL 文件路径（留空不启用）、采样率、慢交互阈值（毫秒，超过时不论采样都记录，0 表示关闭）
+    TRACE_PATH: str = os.getenv("TRACE_PATH", "")
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+    TRACE_SLOW_MS: float = float(os.getenv("TRACE_SLOW_MS", "0"))
+    # 追踪文件滚动大小和保留份数
+    TRACE_MAX_BYTES: int = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+    TRACE_BACKUPS: int = int(os.getenv("TRACE_BACKUPS", "3"))
+
+    # 交互应答期限：距离 3 秒期限至少提前多少秒自动延迟应答（接口变慢时自动加大），首次应答晚于多少秒记为险些超时
+    DEFER_MARGIN: float = float(os.getenv("DEFER_MARGIN", "1.0"))
+    DEADLINE_NEAR_MISS: float = float(os.getenv("DEADLINE_NEAR_MISS", "2.5"))
+
+    # 交互限流：下载按钮、/获取作品 和提取码提交在 PERIOD 秒内的最大次数（按用户 / 按作品 / 全局，0 表示不限）
+    # 热门作品被大量成员同时点击是正常情况，按作品和全局限流默认关闭，需要时参考 scripts/bench.py stampede 的结果设置
+    THROTTLE_USER_LIMIT: int = int(os.getenv("THROTTLE_USER_LIMIT", "10"))
+    THROTTLE_USER_PERIOD: float = float(os.getenv("THROTTLE_USER_PERIOD", "60"))
+    THROTTLE_WORK_LIMIT: int = int(os.getenv("THROTTLE_WORK_LIMIT", "0"))
+    THROTTLE_WORK_PERIOD: float = float(os.getenv("THROTTLE_WORK_PERIOD", "60"))
+    THROTTLE_GLOBAL_LIMIT: int = int(os.getenv("THROTTLE_GLOBAL_LIMIT", "0"))
+    THROTTLE_GLOBAL_PERIOD: float = float(os.getenv("THROTTLE_GLOBAL_PERIOD", "60"))
+    # 提取码连续错误多少次后锁定，首次锁定秒数（之后每次翻倍，上限 1 小时）
+    PASSCODE_MAX_FAILURES: int = int(os.getenv("PASSCODE_MAX_FAILURES", "5"))
+    PASSCODE_LOCKOUT: float = float(os.getenv("PASSCODE_LOCKOUT", "60"))
+
     # 允许使用 Bot 命令的论坛频道 ID 列表
     ALLOWED_FORUM_CHANNELS: list[int] = []
 
@@ -56,8 +150,14 @@ class Config:
         """验证配置是否完整"""
         if not cls.BOT_TOKEN:
             raise ValueError("BOT_TOKEN 未配置，请在 .env 文件中设置")
-        if cls.WAREHOUSE_CHANNEL_ID == 0:
+        if not cls.WAREHOUSE_CHANNEL_IDS:
             raise ValueError("WAREHOUSE_CHANNEL_ID 未配置，请在 .env 文件中设置")
+        if cls.RUNTIME_PROFILE not in PROFILES:
+            raise ValueError(f"RUNTIME_PROFILE 只能是 {' 或 '.join(PROFILES)}")
+        if cls.INGRESS_MODE not in ("gateway", "http"):
+            raise ValueError("INGRESS_MODE 只能是 gateway 或 http")
+        if cls.INGRESS_MODE == "http" and not cls.DISCORD_PUBLIC_KEY:
+            raise ValueError("HTTP 交互模式需要配置 DISCORD_PUBLIC_KEY")
 
         # 加载频道白名单
         cls.ALLOWED_FORUM_CHANNELS = cls._load_channels_from_file()
@@ -3,18 +3,81 @@ Discord 资源分发 Bot
 程序入口
 """
 
+import asyncio
+import multiprocessing
+
 from config import Config
 from bot import ResourceBot
 
 
+def run_gateway():
+    """网关模式：单进程通过网关连接接收事件和交互"""
+    bot = ResourceBot(warehouse_channel_ids=Config.WAREHOUSE_CHANNEL_IDS)
+    bot.run(Config.BOT_TOKEN)
+
+
+async def serve_http(worker: int = 0):
+    """HTTP 交互模式：只登录 REST 接口，由 HTTP 服务接收交互"""
+    from utils.ingress import InteractionServer
+
+    bot = ResourceBot(warehouse_channel_ids=Config.WAREHOUSE_CHANNEL_IDS, stateless=True, worker=worker)
+    if Config.METRICS_PORT:
+        bot.metrics_port = Config.METRICS_PORT + worker
+    server = InteractionServer(
+        bot,
+        public_key=Config.DISCORD_PUBLIC_KEY,
+        host=Config.HTTP_HOST,
+        port=Config.HTTP_PORT,
+        path=Config.HTTP_PATH,
+    )
+    bot.metrics.add_collector("jiuwo_ingress", "HTTP 交互入口统计", server.stats)
+    async with bot:
+        await bot.login(Config.BOT_TOKEN)
+        await server.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+
+def _http_worker(worker: int = 0):
+    """HTTP 工作进程入口"""
+    try:
+        asyncio.run(serve_http(worker))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_http():
+    """启动 HTTP 交互模式（多个工作进程共用同一端口）"""
+    if Config.HTTP_WORKERS <= 1:
+        _http_worker()
+        return
+
+    workers = [
+        multiprocessing.Process(target=_http_worker, args=(i,), name=f"http-worker-{i}")
+        for i in range(Config.HTTP_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.join()
+
+
 def main():
     """主函数"""
     # 验证配置
     Config.validate()
 
     # 创建并运行 Bot
-    bot = ResourceBot(warehouse_channel_id=Config.WAREHOUSE_CHANNEL_ID)
-    bot.run(Config.BOT_TOKEN)
+    if Config.INGRESS_MODE == "http":
+        run_http()
+    else:
+        run_gateway()
 
 
 if __name__ == "__main__":
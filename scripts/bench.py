@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+压力测试工具
+在本地 Discord 模拟后端上运行 Bot，按并发度模拟下载按钮蜂拥、/获取作品、发布和更新，
+输出吞吐量、首次应答耗时 p50 / p95 / p99、REST 调用次数和内存峰值，结果保存为 JSON 便于对比
+
+场景：
+  download  大量成员同时点击热门作品的「下载作品」按钮（handle_download_button）
+  stampede  同 download，但保留当前配置的交互限流（THROTTLE_*），报告被限流拒绝的次数
+  get_work  大量成员同时在帖子中使用 /获取作品（DownloadCog.get_work）
+  publish   多名上传者同时在各自帖子中走完发布流程，计时「确认发布」（_do_publish）
+  update    上传者同时用 /更新作品 替换作品文件（update_work_command）
+
+使用方法：
+  python scripts/bench.py download --requests 1000 --concurrency 100
+  python scripts/bench.py stampede --requests 1000 --concurrency 100 --members 500
+  python scripts/bench.py publish --requests 20 --concurrency 5 --latency-ms 50 --rate-limit 0.02
+  保存并与上次对比: python scripts/bench.py download --out data/bench/download.json --baseline data/bench/last.json
+
+注意：模拟后端与 Bot 运行在同一进程和事件循环中，耗时和内存都包含模拟后端自身的开销，
+适合对比同一台机器上不同版本的结果，不代表线上的绝对值
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.fake_discord import FakeDiscord, Faults
+from scripts.run_offline import offline_bot, publish_work, reply_summary, settle
+from scripts.trace_summary import percentile
+from utils.runtime import current_rss_kb
+
+SCENARIOS = ("download", "stampede", "get_work", "publish", "update")
+
+
+class Workload:
+    """压测数据：若干帖子（各有上传者）和一批普通成员，需在 Bot 连接前创建"""
+
+    def __init__(self, fake: FakeDiscord, threads: int, members: int, file_size: int, timeout: float):
+        self.fake = fake
+        self.file_size = file_size
+        self.timeout = timeout
+        self.uploaders: list[int] = []
+        self.threads: list[int] = []
+        for index in range(threads):
+            uploader = fake.add_user(f"uploader-{index}")
+            self.uploaders.append(uploader)
+            self.threads.append(fake.add_thread(uploader, f"压测帖子 {index}"))
+        self.members = [fake.add_user(f"member-{index}") for index in range(members)]
+        # 帖子 → 公开消息（已发布的作品）
+        self.public: dict[int, int] = {}
+
+    async def publish(self, index: int, timed: list | None = None) -> None:
+        """在第 index 个帖子中走完发布流程（timed 不为 None 时记录「确认发布」的耗时）"""
+        thread_id = self.threads[index]
+        confirm, public = await publish_work(
+            self.fake,
+            thread_id,
+            self.uploaders[index],
+            f"压测作品 {index}",
+            {"file1": (f"work-{index}.bin", os.urandom(self.file_size))},
+            timeout=self.timeout,
+        )
+        if public is not None:
+            self.public[thread_id] = public
+        if timed is not None:
+            timed.append((confirm.ack_latency, time.perf_counter() - confirm.created, public is not None))
+        elif public is None:
+            raise RuntimeError(f"准备阶段发布失败: 帖子 {thread_id}")
+
+
+async def _run_ops(
+    count: int, concurrency: int, timeout: float, op
+) -> tuple[list[tuple[float, float, bool]], float]:
+    """以给定并发度执行 count 次操作，返回每次的 (首次应答, 完成耗时, 是否成功) 和总耗时（超时按失败计）"""
+    semaphore = asyncio.Semaphore(concurrency)
+    results: list[tuple[float, float, bool]] = []
+
+    async def _one(index: int):
+        async with semaphore:
+            try:
+                await op(index, results)
+            except Exception:
+                results.append((timeout, timeout, False))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_one(i) for i in range(count)))
+    return results, time.perf_counter() - started
+
+
+async def _interaction_op(fake: FakeDiscord, start_interaction, results: list, timeout: float) -> None:
+    """发出一次交互并等待处理完成（回复不再是 ⏳ 进度提示），回复以 ❌ 开头视为失败"""
+    interaction = await start_interaction()
+    await settle(fake, interaction, timeout)
+    await fake.wait_for(lambda: not reply_summary(fake, interaction).startswith("⏳"), timeout)
+    ok = not reply_summary(fake, interaction).startswith("❌")
+    results.append((interaction.ack_latency, time.perf_counter() - interaction.created, ok))
+
+
+def _summary(values: list[float]) -> dict[str, float]:
+    """毫秒统计（最近秩百分位）"""
+    values = sorted(v * 1000 for v in values)
+    return {
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(values[-1], 2) if values else 0.0,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    faults = Faults(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        rate_limit_ratio=args.rate_limit,
+        retry_after=args.retry_after,
+    )
+    fake = FakeDiscord(seed=args.seed)
+    for _ in range(args.shards - 1):
+        fake.add_warehouse_channel()
+    threads = args.requests if args.scenario == "publish" else args.works
+    workload = Workload(fake, threads, args.members, args.file_size, args.timeout)
+    members = itertools.cycle(workload.members)
+
+    async with offline_bot(fake) as bot:
+        # 准备阶段不注入故障：先发布好被测作品
+        if args.scenario != "publish":
+            for index in range(args.works):
+                await workload.publish(index)
+        fake.faults = faults
+        fake.reset_counts()
+        rss_before = current_rss_kb()
+
+        if args.scenario in ("download", "stampede"):
+            async def op(index, results):
+                thread_id = workload.threads[index % args.works]
+                await _interaction_op(
+                    fake,
+                    lambda: fake.click(workload.public[thread_id], "下载作品", next(members)),
+                    results,
+                    args.timeout,
+                )
+        elif args.scenario == "get_work":
+            async def op(index, results):
+                thread_id = workload.threads[index % args.works]
+                await _interaction_op(
+                    fake, lambda: fake.command("获取作品", thread_id, next(members)), results, args.timeout
+                )
+        elif args.scenario == "update":
+            async def op(index, results):
+                work = index % args.works
+                files = {"file1": (f"work-{work}.bin", os.urandom(args.file_size))}
+                await _interaction_op(
+                    fake,
+                    lambda: fake.command(
+                        "更新作品", workload.threads[work], workload.uploaders[work], files=files
+                    ),
+                    results,
+                    args.timeout,
+                )
+        else:
+            async def op(index, results):
+                await workload.publish(index, results)
+
+        results, elapsed = await _run_ops(args.requests, args.concurrency, args.timeout, op)
+        rss_after = current_rss_kb()
+        metrics = bot.metrics.render()
+        throttle = bot.throttle.stats()
+
+    stats = fake.stats()
+    completed = [r for r in results if r[2]]
+    return {
+        "scenario": args.scenario,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "works": threads,
+            "members": args.members,
+            "throttle": _keeps_throttle(args),
+            "file_size": args.file_size,
+            "shards": args.shards,
+            "seed": args.seed,
+            "faults": stats["faults"],
+        },
+        "duration_s": round(elapsed, 3),
+        "throughput_per_s": round(len(completed) / elapsed, 2) if elapsed else 0.0,
+        "ok": len(completed),
+        "errors": len(results) - len(completed),
+        "time_to_first_response_ms": _summary([r[0] for r in results if r[0] is not None]),
+        "time_to_complete_ms": _summary([r[1] for r in results]),
+        "rest": {
+            "total": stats["requests"],
+            "per_request": round(stats["requests"] / max(len(results), 1), 2),
+            "rate_limited": stats["rate_limited"],
+            "routes": dict(sorted(stats["routes"].items(), key=lambda item: -item[1])),
+        },
+        "memory_kb": {
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+            "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        # Bot 侧指标：收到的 429 次数和帖子历史分页读取次数
+        "bot": {
+            "rate_limited": _metric_value(metrics, "jiuwo_rest_rate_limited_total"),
+            "history_pages": _metric_value(metrics, "jiuwo_history_pages_total"),
+        },
+        # 交互限流：放行和按用户 / 作品 / 全局拒绝的次数
+        "throttle": {key: throttle[key] for key in ("allowed", "shed_user", "shed_work", "shed_global")},
+    }
+
+
+def _keeps_throttle(args: argparse.Namespace) -> bool:
+    """是否保留交互限流（stampede 场景总是保留）"""
+    return args.throttle or args.scenario == "stampede"
+
+
+def _metric_value(text: str, name: str) -> float:
+    """从 Prometheus 文本中累加某个指标的所有样本"""
+    total = 0.0
+    for line in text.splitlines():
+        if line.startswith((name + " ", name + "{")):
+            try:
+                total += float(line.rsplit(" ", 1)[1])
+            except ValueError:
+                continue
+    return total
+
+
+def print_report(result: dict, baseline: dict | None) -> None:
+    """输出结果，给定基线时附带变化"""
+
+    def _delta(value: float, old: float | None) -> str:
+        if old is None or old == 0:
+            return ""
+        return f"  ({(value - old) / old * 100:+.1f}%)"
+
+    def _get(path: tuple[str, ...]) -> float | None:
+        node = baseline
+        for key in path:
+            if not isinstance(node, dict) or key not in node:
+                return None
+            node = node[key]
+        return node
+
+    config = result["config"]
+    print(
+        f"\n场景 {result['scenario']}：{config['requests']} 次，并发 {config['concurrency']}，"
+        f"耗时 {result['duration_s']:.2f} 秒，成功 {result['ok']}，失败 {result['errors']}"
+    )
+    print(f"  吞吐量        {result['throughput_per_s']:>10.2f} 次/秒{_delta(result['throughput_per_s'], _get(('throughput_per_s',)))}")
+    for key, label in (("time_to_first_response_ms", "首次应答"), ("time_to_complete_ms", "完成耗时")):
+        for q in ("p50", "p95", "p99"):
+            value = result[key][q]
+            print(f"  {label} {q:<4}  {value:>10.1f} ms{_delta(value, _get((key, q)))}")
+    rest = result["rest"]
+    print(
+        f"  REST 调用     {rest['total']:>10} 次（每次 {rest['per_request']}，注入 429 {rest['rate_limited']} 次）"
+        f"{_delta(rest['per_request'], _get(('rest', 'per_request')))}"
+    )
+    peak = result["memory_kb"]["peak_rss"]
+    print(f"  内存峰值      {peak / 1024:>10.1f} MB{_delta(peak, _get(('memory_kb', 'peak_rss')))}")
+    if config["throttle"]:
+        throttle = result["throttle"]
+        print(
+            f"  交互限流      放行 {throttle['allowed']}，拒绝 用户 {throttle['shed_user']} / "
+            f"作品 {throttle['shed_work']} / 全局 {throttle['shed_global']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在本地模拟后端上压测 Bot 的下载、获取、发布和更新流程")
+    parser.add_argument("scenario", choices=SCENARIOS, help="压测场景")
+    parser.add_argument("--requests", type=int, default=200, help="交互总次数（publish 为发布次数）")
+    parser.add_argument("--concurrency", type=int, default=50, help="同时进行的交互数")
+    parser.add_argument("--works", type=int, default=1, help="预先发布的作品数，请求轮流落在这些作品上")
+    parser.add_argument("--members", type=int, default=100, help="发起下载 / 获取的成员数")
+    parser.add_argument("--file-size", type=int, default=256 * 1024, help="发布 / 更新的文件大小（字节）")
+    parser.add_argument("--shards", type=int, default=1, help="仓库频道分片数")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每个 REST 请求的固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="额外随机延迟上限（毫秒）")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="REST 请求返回 429 的概率")
+    parser.add_argument("--retry-after", type=float, default=0.05, help="429 响应中的 retry_after（秒）")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单次交互的等待上限（秒），超时计为失败")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子（延迟抖动和 429 注入）")
+    parser.add_argument("--throttle", action="store_true", help="保留交互限流（默认压测时关闭，stampede 场景总是保留）")
+    parser.add_argument("--out", help="结果 JSON 保存路径")
+    parser.add_argument("--baseline", help="用于对比的上次结果 JSON")
+    args = parser.parse_args()
+
+    # 在导入配置前关闭限流
+    if not _keeps_throttle(args):
+        for name in ("THROTTLE_USER_LIMIT", "THROTTLE_WORK_LIMIT", "THROTTLE_GLOBAL_LIMIT"):
+            os.environ[name] = "0"
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    result = asyncio.run(run(args))
+    print_report(result, baseline)
+
+    if args.out:
+        directory = os.path.dirname(args.out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 结果已保存: {args.out}")
+    else:
+        print()
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
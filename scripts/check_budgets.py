@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+REST 调用预算检查
+在本地 Discord 模拟后端上跑一遍各条命令路径，统计每条路径发起的 Discord REST 调用，
+超过 scripts/fixtures/rest_budgets.json 中的预算时以非零状态退出，用于发现新增的往返
+
+检查方式：
+  1. 第一个 Bot 实例发布各条路径要用到的作品，再往帖子里写入大量回复和首楼回应（模拟大帖子）
+  2. 重启一个缓存为空的 Bot 实例，依次执行各条路径，按路由统计模拟后端收到的请求
+     （帖子历史回溯、首楼回应分页等隐藏在异步迭代器里的调用都会被计入）
+
+使用方法：
+  检查:           python scripts/check_budgets.py
+  只看部分路径:   python scripts/check_budgets.py --only download_interact get_work_interact
+  有意改变后更新: python scripts/check_budgets.py --update
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import Counter
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.fake_discord import FakeDiscord, FakeInteraction
+from scripts.run_offline import offline_bot, publish_work, reply_summary, settle
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "rest_budgets.json")
+
+PASSCODE = "2468"
+
+# 路径 → 所需作品的下载门槛（None 表示不需要预先发布作品）
+FLOWS: dict[str, str | None] = {
+    "download_free": "自由下载",
+    "download_interact": "互动",
+    "download_passcode": "提取码",
+    "get_work_free": "自由下载",
+    "get_work_interact": "互动",
+    "get_work_passcode": "提取码",
+    "publish": None,
+    "update_info": "自由下载",
+    "update_files": "自由下载",
+    "pin": "自由下载",
+    "delete": "自由下载",
+}
+
+
+class BudgetRun:
+    """一次预算检查：每条路径使用单独的帖子，互不共享缓存"""
+
+    def __init__(self, fake: FakeDiscord, settings: dict):
+        self.fake = fake
+        self.settings = settings
+        self.uploader = fake.add_user("uploader")
+        self.member = fake.add_user("member")
+        self.crowd = [fake.add_user(f"crowd-{i}") for i in range(settings["reactors"])]
+        self.threads = {name: fake.add_thread(self.uploader, f"预算检查 {name}") for name in FLOWS}
+        # 帖子 → 公开消息
+        self.public: dict[str, int] = {}
+
+    def _files(self, count: int, tag: str) -> dict[str, tuple[str, bytes]]:
+        size = self.settings["file_size"]
+        return {f"file{i + 1}": (f"{tag}-{i}.bin", os.urandom(size)) for i in range(count)}
+
+    async def prepare(self) -> None:
+        """发布作品并把帖子填充为大帖子（不发送网关事件，新的 Bot 实例只能回溯历史）"""
+        fake = self.fake
+        for name, dl_req in FLOWS.items():
+            if dl_req is None:
+                continue
+            _, public = await publish_work(
+                fake,
+                self.threads[name],
+                self.uploader,
+                f"预算检查 {name}",
+                self._files(1, name),
+                dl_req=dl_req,
+                passcode=PASSCODE,
+            )
+            if public is None:
+                raise RuntimeError(f"准备阶段发布失败: {name}")
+            self.public[name] = public
+
+        for name, thread_id in self.threads.items():
+            fake.seed_reactions(thread_id, self.crowd + [self.member])
+            fake.seed_messages(thread_id, self.crowd, self.settings["thread_size"])
+
+    async def _finish(self, interaction: FakeInteraction) -> bool:
+        """等待交互处理完成，返回最终回复是否成功"""
+        await settle(self.fake, interaction)
+        await self.fake.wait_for(lambda: not reply_summary(self.fake, interaction).startswith("⏳"))
+        return not reply_summary(self.fake, interaction).startswith("❌")
+
+    async def _submit_passcode(self, interaction: FakeInteraction) -> bool:
+        """提交提取码弹窗（自动延迟应答后回复的是按钮时先点击按钮）"""
+        fake = self.fake
+        await settle(fake, interaction)
+        if interaction.modal is None:
+            button_message = interaction.followups[-1] if interaction.followups else interaction.original_id
+            interaction = await fake.click(button_message, "输入提取码", self.member)
+            await settle(fake, interaction)
+        return await self._finish(await fake.submit_modal(interaction, {"提取码": PASSCODE}))
+
+    async def run_flow(self, name: str) -> bool:
+        """执行一条路径，返回是否成功"""
+        fake = self.fake
+        thread_id = self.threads[name]
+        if name.startswith("download_"):
+            interaction = await fake.click(self.public[name], "下载作品", self.member)
+            if name == "download_passcode":
+                return await self._submit_passcode(interaction)
+            return await self._finish(interaction)
+        if name.startswith("get_work_"):
+            interaction = await fake.command("获取作品", thread_id, self.member)
+            if name == "get_work_passcode":
+                return await self._submit_passcode(interaction)
+            return await self._finish(interaction)
+        if name == "publish":
+            _, public = await publish_work(
+                fake,
+                thread_id,
+                self.uploader,
+                "预算检查 publish",
+                self._files(self.settings["publish_files"], name),
+            )
+            return public is not None
+        if name == "update_info":
+            interaction = await fake.click(self.public[name], "更新", self.uploader)
+            await settle(fake, interaction)
+            values = {
+                "标题": "预算检查 更新后",
+                "允许二传 (输入 是 或 否)": "否",
+                "允许二改 (输入 是 或 否)": "是",
+                "下载要求 (自由下载/互动/提取码)": "自由下载",
+            }
+            return await self._finish(await fake.submit_modal(interaction, values))
+        if name == "update_files":
+            files = self._files(self.settings["update_files"], name)
+            return await self._finish(await fake.command("更新作品", thread_id, self.uploader, files=files))
+        if name == "pin":
+            return await self._finish(await fake.click(self.public[name], "标注", self.uploader))
+        if name == "delete":
+            return await self._finish(await fake.click(self.public[name], "删除", self.uploader))
+        raise ValueError(f"未知路径: {name}")
+
+
+async def wait_quiet(fake: FakeDiscord, idle: float = 0.3) -> None:
+    """等待模拟后端在 idle 秒内不再收到请求（后台写入、清理等也计入本路径）"""
+    last = -1
+    while True:
+        total = sum(fake.requests.values())
+        if total == last:
+            return
+        last = total
+        await asyncio.sleep(idle)
+
+
+async def measure(settings: dict, flows: list[str]) -> dict[str, dict]:
+    """准备数据并逐条执行路径，返回每条路径的成功与否和按路由的调用次数"""
+    fake = FakeDiscord(seed=1)
+    run = BudgetRun(fake, settings)
+    results: dict[str, dict] = {}
+
+    await fake.start()
+    try:
+        async with offline_bot(fake):
+            await run.prepare()
+
+        # 新的 Bot 实例：所有缓存和索引为空
+        async with offline_bot(fake):
+            for name in flows:
+                await wait_quiet(fake)
+                before = Counter(fake.requests)
+                ok = await run.run_flow(name)
+                await wait_quiet(fake)
+                routes = fake.requests - before
+                results[name] = {"ok": ok, "total": sum(routes.values()), "routes": dict(routes)}
+    finally:
+        await fake.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查各条命令路径的 Discord REST 调用次数是否超出预算")
+    parser.add_argument("--only", nargs="+", choices=list(FLOWS), help="只检查指定路径")
+    parser.add_argument("--budgets", default=BUDGET_FILE, help="预算文件路径")
+    parser.add_argument("--update", action="store_true", help="用本次结果覆盖预算文件")
+    parser.add_argument("--verbose", action="store_true", help="输出每条路径按路由的调用次数")
+    args = parser.parse_args()
+
+    # 关闭交互限流，各条路径都由同一成员执行，不应因限流而改变调用次数
+    for name in ("THROTTLE_USER_LIMIT", "THROTTLE_WORK_LIMIT", "THROTTLE_GLOBAL_LIMIT"):
+        os.environ[name] = "0"
+
+    with open(args.budgets, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    budgets: dict[str, int] = config["budgets"]
+    flows = args.only or list(FLOWS)
+
+    results = asyncio.run(measure(config["settings"], flows))
+
+    failed = False
+    print(f"\n{'路径':<22} {'调用':>6} {'预算':>6}  结果")
+    for name in flows:
+        result = results[name]
+        budget = budgets.get(name)
+        if not result["ok"]:
+            status, failed = "❌ 流程失败", True
+        elif budget is None:
+            status = "⚠️ 无预算"
+        elif result["total"] > budget:
+            status, failed = f"❌ 超出 {result['total'] - budget} 次", True
+        elif result["total"] < budget:
+            status = f"✅ 比预算少 {budget - result['total']} 次，可收紧"
+        else:
+            status = "✅"
+        print(f"{name:<24} {result['total']:>6} {budget if budget is not None else '-':>6}  {status}")
+        if args.verbose or status.startswith("❌"):
+            for route, count in sorted(result["routes"].items(), key=lambda item: -item[1]):
+                print(f"{'':<8}{count:>5}  {route}")
+
+    if args.update:
+        if any(not results[name]["ok"] for name in flows):
+            print("\n❌ 有流程失败，未更新预算")
+            sys.exit(1)
+        budgets.update({name: results[name]["total"] for name in flows})
+        with open(args.budgets, "w", encoding="utf-8") as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"\n✅ 预算已更新: {args.budgets}")
+        return
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
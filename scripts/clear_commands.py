@@ -3,11 +3,16 @@
 Discord Bot 命令清除工具
 用于清除所有已注册的斜杠命令
 
+默认先查询各范围已注册的命令，已为空的范围跳过清除请求；
+清除后更新命令同步状态，Bot 下次启动时会重新同步命令
+
 使用方法：
   本地运行: python scripts/clear_commands.py
+  强制清除: python scripts/clear_commands.py --force
   Docker 运行: docker-compose run --rm discord-bot python scripts/clear_commands.py
 """
 
+import argparse
 import discord
 import asyncio
 import os
@@ -18,6 +23,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from dotenv import load_dotenv
 
+from config import Config
+from utils.command_sync import mark_cleared
+
 # 加载环境变量
 load_dotenv()
 
@@ -29,12 +37,27 @@ if not TOKEN:
     sys.exit(1)
 
 
-async def clear_commands():
+async def clear_commands(force: bool = False):
     """清除所有斜杠命令"""
     intents = discord.Intents.default()
     bot = discord.Client(intents=intents)
     tree = discord.app_commands.CommandTree(bot)
 
+    async def clear_scope(guild: discord.Guild | None, name: str):
+        """清除一个范围的命令（非强制模式下已为空则跳过）"""
+        if not force:
+            registered = await tree.fetch_commands(guild=guild)
+            if not registered:
+                print(f"⏭️  {name}没有已注册的命令，跳过")
+                mark_cleared(Config.COMMAND_SYNC_STATE, guild)
+                return
+
+        print(f"🔄 正在清除{name}的命令...")
+        tree.clear_commands(guild=guild)
+        await tree.sync(guild=guild)
+        mark_cleared(Config.COMMAND_SYNC_STATE, guild)
+        print(f"✅ {name}的命令已清除")
+
     @bot.event
     async def on_ready():
         print(f"🤖 已登录为: {bot.user}")
@@ -43,17 +66,11 @@ async def clear_commands():
 
         try:
             # 清除全局命令
-            print("🔄 正在清除全局命令...")
-            tree.clear_commands(guild=None)
-            await tree.sync()
-            print("✅ 全局命令已清除")
+            await clear_scope(None, "全局")
 
             # 清除所有服务器的 Guild 命令
             for guild in bot.guilds:
-                print(f"🔄 正在清除服务器 [{guild.name}] 的命令...")
-                tree.clear_commands(guild=guild)
-                await tree.sync(guild=guild)
-                print(f"✅ 服务器 [{guild.name}] 的命令已清除")
+                await clear_scope(guild, f"服务器 [{guild.name}] ")
 
             print()
             print("=" * 50)
@@ -77,4 +94,7 @@ async def clear_commands():
 
 
 if __name__ == "__main__":
-    asyncio.run(clear_commands())
+    parser = argparse.ArgumentParser(description="清除所有已注册的斜杠命令")
+    parser.add_argument("--force", action="store_true", help="不查询已注册命令，直接清除所有范围")
+    args = parser.parse_args()
+    asyncio.run(clear_commands(force=args.force))
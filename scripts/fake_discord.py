@@ -0,0 +1,1131 @@
+"""
+本地 Discord 模拟后端
+在本机实现 Bot 用到的 REST 接口和网关，用于离线运行 ResourceBot 做性能测试
+
+- REST：频道消息（含附件上传）、历史分页、回应、标注、交互回调 / 后续消息、CDN 链接刷新
+- 网关：HELLO / IDENTIFY / READY / GUILD_CREATE / 心跳，以及脚本化的消息、回应和交互事件
+- CDN：托管上传的附件，链接带有与真实 CDN 相同的 ex 过期参数
+- 故障注入：每个 REST 请求的固定延迟和抖动，按概率返回 429（可限定路由）
+- 请求记录：按路由模板（与 discord.py Route.path 相同）统计调用次数
+
+只依赖 aiohttp；让 discord.py 连接到这里见 point_discord_at()
+"""
+
+import asyncio
+import dataclasses
+import datetime
+import itertools
+import json
+import random
+import secrets
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from urllib.parse import quote, unquote
+
+from aiohttp import WSMsgType, web
+
+API_PREFIX = "/api/v10"
+
+# Discord 纪元（2015-01-01）毫秒时间戳
+DISCORD_EPOCH = 1420070400000
+
+# 消息标志
+EPHEMERAL = 1 << 6
+LOADING = 1 << 7
+
+# 频道类型
+TEXT_CHANNEL = 0
+PUBLIC_THREAD = 11
+FORUM_CHANNEL = 15
+
+# 交互类型
+APPLICATION_COMMAND = 2
+MESSAGE_COMPONENT = 3
+MODAL_SUBMIT = 5
+
+# 交互回调类型
+CHANNEL_MESSAGE = 4
+DEFERRED_CHANNEL_MESSAGE = 5
+DEFERRED_UPDATE_MESSAGE = 6
+UPDATE_MESSAGE = 7
+MODAL = 9
+
+# 服务器未加成时的上传上限
+DEFAULT_UPLOAD_LIMIT = 10 * 1024 * 1024
+# 附件链接有效期（秒）
+CDN_TTL = 24 * 3600
+# 交互首次应答期限（秒），超时后回调返回 Unknown interaction
+INTERACTION_DEADLINE = 3.0
+
+
+def _json(data: Any, status: int = 200, headers: dict | None = None) -> web.Response:
+    """JSON 响应（discord.py 要求 Content-Type 恰好为 application/json，不能带 charset）"""
+    return web.Response(
+        body=json.dumps(data, ensure_ascii=False).encode(),
+        status=status,
+        headers={**(headers or {}), "Content-Type": "application/json"},
+    )
+
+
+def _not_found(data: dict) -> web.HTTPNotFound:
+    """404 异常（在路由处理中直接抛出）"""
+    return web.HTTPNotFound(
+        body=json.dumps(data, ensure_ascii=False).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+
+
+def point_discord_at(base_url: str) -> None:
+    """让当前进程中的 discord.py 连接到模拟后端（REST 和网关）"""
+    import yarl
+    from discord.gateway import DiscordWebSocket
+    from discord.http import Route
+
+    Route.BASE = base_url + API_PREFIX
+    DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(base_url.replace("http", "ws", 1) + "/gateway")
+
+
+@dataclass
+class Faults:
+    """故障注入配置"""
+
+    latency: float = 0.0  # 每个 REST 请求的固定延迟（秒）
+    jitter: float = 0.0  # 额外的随机延迟上限（秒）
+    rate_limit_ratio: float = 0.0  # 返回 429 的概率
+    retry_after: float = 0.05  # 429 响应中的 retry_after（秒）
+    global_rate_limit: bool = False  # 429 是否标记为全局限速
+    routes: tuple[str, ...] = ()  # 只对这些路由注入（如 "GET /channels/{channel_id}/messages"），空表示全部
+
+    def applies_to(self, route: str) -> bool:
+        return not self.routes or route in self.routes
+
+
+@dataclass
+class FakeInteraction:
+    """模拟后端发出的一次交互及 Bot 的应答"""
+
+    id: int
+    token: str
+    type: int
+    channel_id: int
+    user_id: int
+    message_id: int | None = None  # 组件 / 弹窗所在的消息
+    callbacks: list[dict] = field(default_factory=list)  # Bot 提交的回调载荷
+    original_id: int | None = None  # 原始回复消息
+    followups: list[int] = field(default_factory=list)  # 后续消息
+    modal: dict | None = None  # Bot 弹出的弹窗
+    created: float = field(default_factory=time.perf_counter)
+    acknowledged: float | None = None  # 首次回调的时间
+
+    @property
+    def ack_latency(self) -> float | None:
+        """从发出交互到 Bot 首次回调的耗时（秒）"""
+        return None if self.acknowledged is None else self.acknowledged - self.created
+
+
+class FakeDiscord:
+    """
+    本地 Discord 模拟后端
+
+    用法:
+        fake = FakeDiscord(faults=Faults(latency=0.05))
+        await fake.start()
+        point_discord_at(fake.base_url)
+        ...  # 启动 Bot，用 command() / click() / submit_modal() 驱动交互
+        await fake.stop()
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        faults: Faults | None = None,
+        upload_limit: int = DEFAULT_UPLOAD_LIMIT,
+        seed: int | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.faults = faults or Faults()
+        self.upload_limit = upload_limit
+        self._random = random.Random(seed)
+        self._sequence = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+
+        # 请求统计
+        self.requests: Counter[str] = Counter()
+        self.rate_limited: Counter[str] = Counter()
+        self.expired = 0  # 超过应答期限的交互回调
+
+        # 状态
+        self.users: dict[int, dict] = {}
+        self.channels: dict[int, dict] = {}
+        self.messages: dict[int, dict] = {}
+        self.channel_messages: dict[int, list[int]] = defaultdict(list)
+        self.reactions: dict[int, dict[str, list[int]]] = defaultdict(dict)
+        self.blobs: dict[int, bytes] = {}
+        self.commands: dict[str, dict] = {}
+        self.interactions: dict[int, FakeInteraction] = {}
+        self._tokens: dict[str, FakeInteraction] = {}
+
+        # 网关
+        self._sockets: list[web.WebSocketResponse] = []
+        self._gateway_seq = 0
+        self._changed = asyncio.Condition()
+        self.ready = asyncio.Event()
+
+        # 默认场景：Bot、一个服务器、一个论坛频道、一个仓库频道
+        self.bot_id = self.add_user("jiuwo-bot", bot=True)
+        self.guild_id = self.snowflake()
+        self.forum_id = self._add_channel(FORUM_CHANNEL, "作品发布")
+        self.warehouse_ids = [self._add_channel(TEXT_CHANNEL, "仓库")]
+
+    # ========== 基础工具 ==========
+
+    def snowflake(self) -> int:
+        """生成按时间递增的雪花 ID"""
+        return ((int(time.time() * 1000) - DISCORD_EPOCH) << 22) | (next(self._sequence) & 0x3FFFFF)
+
+    @staticmethod
+    def _timestamp(snowflake: int) -> str:
+        ms = (snowflake >> 22) + DISCORD_EPOCH
+        return datetime.datetime.fromtimestamp(ms / 1000, datetime.timezone.utc).isoformat()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def wait_for(self, predicate: Callable[[], Any], timeout: float = 10.0) -> Any:
+        """等待状态满足条件（每次 Bot 调用接口后重新检查）"""
+
+        async def _wait():
+            async with self._changed:
+                return await self._changed.wait_for(predicate)
+
+        return await asyncio.wait_for(_wait(), timeout)
+
+    def route_counts(self) -> dict[str, int]:
+        """按路由模板统计的请求次数"""
+        return dict(self.requests)
+
+    def reset_counts(self) -> None:
+        """清空请求统计"""
+        self.requests.clear()
+        self.rate_limited.clear()
+        self.expired = 0
+
+    # ========== 场景数据 ==========
+
+    def add_user(self, name: str, bot: bool = False) -> int:
+        """添加用户（同时成为服务器成员）"""
+        user_id = self.snowflake()
+        self.users[user_id] = {
+            "id": str(user_id),
+            "username": name,
+            "global_name": name,
+            "discriminator": "0",
+            "avatar": None,
+            "bot": bot,
+        }
+        return user_id
+
+    def _add_channel(self, channel_type: int, name: str) -> int:
+        channel_id = self.snowflake()
+        channel = {
+            "id": str(channel_id),
+            "type": channel_type,
+            "guild_id": str(self.guild_id),
+            "name": name,
+            "position": len(self.channels),
+            "permission_overwrites": [],
+            "nsfw": False,
+            "parent_id": None,
+            "topic": None,
+            "rate_limit_per_user": 0,
+            "flags": 0,
+        }
+        if channel_type == FORUM_CHANNEL:
+            channel.update({"available_tags": [], "default_reaction_emoji": None})
+        self.channels[channel_id] = channel
+        return channel_id
+
+    def add_warehouse_channel(self) -> int:
+        """追加一个仓库频道（分片）"""
+        channel_id = self._add_channel(TEXT_CHANNEL, f"仓库-{len(self.warehouse_ids)}")
+        self.warehouse_ids.append(channel_id)
+        return channel_id
+
+    def add_thread(self, owner_id: int, name: str, content: str = "") -> int:
+        """在论坛频道中创建帖子（首楼消息 ID 与帖子 ID 相同），需在 Bot 连接前调用"""
+        thread_id = self.snowflake()
+        self.channels[thread_id] = {
+            "id": str(thread_id),
+            "type": PUBLIC_THREAD,
+            "guild_id": str(self.guild_id),
+            "parent_id": str(self.forum_id),
+            "owner_id": str(owner_id),
+            "name": name,
+            "last_message_id": str(thread_id),
+            "message_count": 0,
+            "member_count": 1,
+            "rate_limit_per_user": 0,
+            "flags": 0,
+            "applied_tags": [],
+            "thread_metadata": {
+                "archived": False,
+                "auto_archive_duration": 10080,
+                "archive_timestamp": self._timestamp(thread_id),
+                "locked": False,
+            },
+        }
+        self._store_message(thread_id, owner_id, content=content or name, message_id=thread_id)
+        return thread_id
+
+    def _member(self, user_id: int) -> dict:
+        return {
+            "user": self.users[user_id],
+            "roles": [],
+            "joined_at": self._timestamp(user_id),
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+            "permissions": str((1 << 41) - 1),
+        }
+
+    def _guild_payload(self) -> dict:
+        channels = [c for c in self.channels.values() if c["type"] != PUBLIC_THREAD]
+        threads = [c for c in self.channels.values() if c["type"] == PUBLIC_THREAD]
+        members = [self._member(user_id) for user_id in self.users]
+        return {
+            "id": str(self.guild_id),
+            "name": "离线测试服务器",
+            "icon": None,
+            "owner_id": str(self.bot_id),
+            "roles": [
+                {
+                    "id": str(self.guild_id),
+                    "name": "@everyone",
+                    "permissions": str((1 << 41) - 1),
+                    "position": 0,
+                    "color": 0,
+                    "hoist": False,
+                    "managed": False,
+                    "mentionable": False,
+                    "flags": 0,
+                }
+            ],
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "member_count": len(members),
+            "members": members,
+            "channels": channels,
+            "threads": threads,
+            "presences": [],
+            "voice_states": [],
+            "stage_instances": [],
+            "guild_scheduled_events": [],
+            "large": False,
+            "unavailable": False,
+            "premium_tier": 0,
+            "verification_level": 0,
+            "default_message_notifications": 0,
+            "explicit_content_filter": 0,
+            "mfa_level": 0,
+            "nsfw_level": 0,
+            "afk_timeout": 300,
+            "system_channel_flags": 0,
+            "preferred_locale": "zh-CN",
+            "joined_at": self._timestamp(self.bot_id),
+        }
+
+    # ========== 消息与附件 ==========
+
+    def _attachment(self, channel_id: int, filename: str, data: bytes) -> dict:
+        attachment_id = self.snowflake()
+        self.blobs[attachment_id] = data
+        return {
+            "id": str(attachment_id),
+            "filename": filename,
+            "size": len(data),
+            "url": self._cdn_url(channel_id, attachment_id, filename),
+            "proxy_url": self._cdn_url(channel_id, attachment_id, filename),
+            "content_type": "application/octet-stream",
+        }
+
+    def _cdn_url(self, channel_id: int, attachment_id: int, filename: str) -> str:
+        now = int(time.time())
+        return (
+            f"{self.base_url}/attachments/{channel_id}/{attachment_id}/{quote(filename)}"
+            f"?ex={now + CDN_TTL:x}&is={now:x}&hm={secrets.token_hex(8)}"
+        )
+
+    def upload_attachment(self, filename: str, data: bytes) -> dict:
+        """托管一个用户上传的附件（斜杠命令的附件参数使用）"""
+        return self._attachment(self.forum_id, filename, data)
+
+    def _store_message(
+        self,
+        channel_id: int,
+        author_id: int,
+        *,
+        content: str = "",
+        embeds: list | None = None,
+        components: list | None = None,
+        attachments: list | None = None,
+        flags: int = 0,
+        message_id: int | None = None,
+        interaction: FakeInteraction | None = None,
+    ) -> dict:
+        message_id = message_id or self.snowflake()
+        message = {
+            "id": str(message_id),
+            "channel_id": str(channel_id),
+            "guild_id": str(self.guild_id),
+            "author": self.users[author_id],
+            "content": content,
+            "timestamp": self._timestamp(message_id),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": attachments or [],
+            "embeds": embeds or [],
+            "components": components or [],
+            "pinned": False,
+            "type": 0,
+            "flags": flags,
+        }
+        if interaction is not None:
+            message["interaction_metadata"] = {
+                "id": str(interaction.id),
+                "type": interaction.type,
+                "user": self.users[interaction.user_id],
+                "authorizing_integration_owners": {"0": str(self.guild_id)},
+            }
+        self.messages[message_id] = message
+        if not flags & EPHEMERAL:
+            self.channel_messages[channel_id].append(message_id)
+        return message
+
+    def _message_view(self, message: dict) -> dict:
+        """附带回应统计的消息载荷"""
+        reactions = self.reactions.get(int(message["id"]))
+        if not reactions:
+            return message
+        return {
+            **message,
+            "reactions": [
+                {
+                    "emoji": {"id": None, "name": emoji},
+                    "count": len(users),
+                    "count_details": {"burst": 0, "normal": len(users)},
+                    "me": self.bot_id in users,
+                    "me_burst": False,
+                    "burst_colors": [],
+                }
+                for emoji, users in reactions.items()
+                if users
+            ],
+        }
+
+    def _apply_edit(self, message: dict, payload: dict, files: dict[int, tuple[str, bytes]]) -> None:
+        """按编辑载荷修改消息（attachments 中带真实 ID 的保留，带序号的为新上传文件）"""
+        for key in ("content", "embeds", "components", "flags"):
+            if key in payload and payload[key] is not None:
+                message[key] = payload[key]
+        if "attachments" in payload or files:
+            existing = {a["id"]: a for a in message["attachments"]}
+            attachments = []
+            for item in payload.get("attachments") or []:
+                item_id = str(item.get("id"))
+                if item_id in existing:
+                    attachments.append(existing[item_id])
+                elif int(item_id) in files:
+                    filename, data = files[int(item_id)]
+                    attachments.append(self._attachment(int(message["channel_id"]), filename, data))
+            if "attachments" not in payload:
+                attachments = list(message["attachments"]) + [
+                    self._attachment(int(message["channel_id"]), name, data)
+                    for name, data in files.values()
+                ]
+            message["attachments"] = attachments
+        message["flags"] = message.get("flags", 0) & ~LOADING
+        message["edited_timestamp"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    def _new_attachments(self, channel_id: int, files: dict[int, tuple[str, bytes]]) -> list[dict]:
+        return [self._attachment(channel_id, name, data) for _, (name, data) in sorted(files.items())]
+
+    # ========== 请求处理 ==========
+
+    @staticmethod
+    def _error(status: int, message: str, code: int = 0) -> web.Response:
+        return _json({"message": message, "code": code}, status=status)
+
+    def _check_upload(self, files: dict[int, tuple[str, bytes]]) -> web.Response | None:
+        if any(len(data) > self.upload_limit for _, data in files.values()):
+            return self._error(413, "Request entity too large", 40005)
+        return None
+
+    @staticmethod
+    def _check_content(payload: dict) -> web.Response | None:
+        if len(payload.get("content") or "") > 2000:
+            return FakeDiscord._error(400, "Invalid Form Body: content must be 2000 or fewer in length", 50035)
+        return None
+
+    @staticmethod
+    async def _read_payload(request: web.Request) -> tuple[dict, dict[int, tuple[str, bytes]]]:
+        """读取 JSON 或 multipart 载荷（files[n] 字段为上传文件）"""
+        if request.content_type.startswith("multipart/"):
+            payload: dict = {}
+            files: dict[int, tuple[str, bytes]] = {}
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "payload_json":
+                    payload = json.loads(await part.text())
+                elif part.name and part.name.startswith("files["):
+                    files[int(part.name[6:-1])] = (part.filename or "file", bytes(await part.read()))
+            return payload, files
+        if request.can_read_body:
+            body = await request.read()
+            return (json.loads(body) if body else {}), {}
+        return {}, {}
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        if not request.path.startswith(API_PREFIX):
+            return await handler(request)
+
+        resource = request.match_info.route.resource
+        template = resource.canonical[len(API_PREFIX):] if resource is not None else request.path
+        route = f"{request.method} {template}"
+        self.requests[route] += 1
+
+        faults = self.faults
+        if faults.applies_to(route):
+            delay = faults.latency + (self._random.uniform(0, faults.jitter) if faults.jitter else 0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if faults.rate_limit_ratio and self._random.random() < faults.rate_limit_ratio:
+                self.rate_limited[route] += 1
+                return _json(
+                    {
+                        "message": "You are being rate limited.",
+                        "retry_after": faults.retry_after,
+                        "global": faults.global_rate_limit,
+                    },
+                    status=429,
+                    headers={"Via": "1.1 google", "Retry-After": str(faults.retry_after)},
+                )
+
+        try:
+            response = await handler(request)
+        finally:
+            await self._notify()
+        return response
+
+    def _build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware], client_max_size=64 * 1024 * 1024)
+        api = API_PREFIX
+        r = app.router
+        r.add_get("/gateway", self._gateway)
+        r.add_get("/attachments/{channel_id}/{attachment_id}/{filename}", self._cdn)
+        r.add_get(f"{api}/gateway", self._get_gateway)
+        r.add_get(f"{api}/gateway/bot", self._get_gateway)
+        r.add_get(f"{api}/users/@me", self._get_me)
+        r.add_get(f"{api}/oauth2/applications/@me", self._get_application)
+        r.add_get(f"{api}/applications/{{application_id}}/commands", self._get_commands)
+        r.add_put(f"{api}/applications/{{application_id}}/commands", self._put_commands)
+        r.add_get(f"{api}/applications/{{application_id}}/guilds/{{guild_id}}/commands", self._get_commands)
+        r.add_put(f"{api}/applications/{{application_id}}/guilds/{{guild_id}}/commands", self._put_commands)
+        r.add_post(f"{api}/attachments/refresh-urls", self._refresh_urls)
+        r.add_get(f"{api}/channels/{{channel_id}}", self._get_channel)
+        r.add_get(f"{api}/channels/{{channel_id}}/messages", self._history)
+        r.add_post(f"{api}/channels/{{channel_id}}/messages", self._send_message)
+        r.add_post(f"{api}/channels/{{channel_id}}/messages/bulk-delete", self._bulk_delete)
+        r.add_put(f"{api}/channels/{{channel_id}}/messages/pins/{{message_id}}", self._pin)
+        r.add_delete(f"{api}/channels/{{channel_id}}/messages/pins/{{message_id}}", self._pin)
+        r.add_get(f"{api}/channels/{{channel_id}}/messages/{{message_id}}", self._get_message)
+        r.add_patch(f"{api}/channels/{{channel_id}}/messages/{{message_id}}", self._edit_message)
+        r.add_delete(f"{api}/channels/{{channel_id}}/messages/{{message_id}}", self._delete_message)
+        r.add_get(
+            f"{api}/channels/{{channel_id}}/messages/{{message_id}}/reactions/{{emoji}}",
+            self._reaction_users,
+        )
+        r.add_put(
+            f"{api}/channels/{{channel_id}}/messages/{{message_id}}/reactions/{{emoji}}/@me",
+            self._add_own_reaction,
+        )
+        r.add_post(f"{api}/interactions/{{webhook_id}}/{{webhook_token}}/callback", self._callback)
+        r.add_post(f"{api}/webhooks/{{webhook_id}}/{{webhook_token}}", self._followup)
+        r.add_get(
+            f"{api}/webhooks/{{webhook_id}}/{{webhook_token}}/messages/{{message_id}}",
+            self._webhook_message,
+        )
+        r.add_patch(
+            f"{api}/webhooks/{{webhook_id}}/{{webhook_token}}/messages/{{message_id}}",
+            self._webhook_message,
+        )
+        r.add_delete(
+            f"{api}/webhooks/{{webhook_id}}/{{webhook_token}}/messages/{{message_id}}",
+            self._webhook_message,
+        )
+        return app
+
+    # ----- 登录与命令 -----
+
+    async def _get_gateway(self, request: web.Request) -> web.Response:
+        return _json(
+            {
+                "url": self.base_url.replace("http", "ws", 1) + "/gateway",
+                "shards": 1,
+                "session_start_limit": {
+                    "total": 1000,
+                    "remaining": 1000,
+                    "reset_after": 0,
+                    "max_concurrency": 1,
+                },
+            }
+        )
+
+    async def _get_me(self, request: web.Request) -> web.Response:
+        return _json(self.users[self.bot_id])
+
+    async def _get_application(self, request: web.Request) -> web.Response:
+        return _json(
+            {
+                "id": str(self.bot_id),
+                "name": "jiuwo-bot",
+                "description": "",
+                "icon": None,
+                "bot_public": False,
+                "bot_require_code_grant": False,
+                "owner": self.users[self.bot_id],
+                "verify_key": "00" * 32,
+                "flags": 0,
+            }
+        )
+
+    async def _get_commands(self, request: web.Request) -> web.Response:
+        return _json(list(self.commands.values()))
+
+    async def _put_commands(self, request: web.Request) -> web.Response:
+        payload, _ = await self._read_payload(request)
+        self.commands = {}
+        for command in payload:
+            self.commands[command["name"]] = {
+                **command,
+                "id": str(self.snowflake()),
+                "application_id": str(self.bot_id),
+                "version": str(self.snowflake()),
+            }
+        return _json(list(self.commands.values()))
+
+    # ----- 频道与消息 -----
+
+    def _channel_or_404(self, request: web.Request) -> int:
+        channel_id = int(request.match_info["channel_id"])
+        if channel_id not in self.channels:
+            raise _not_found({"message": "Unknown Channel", "code": 10003})
+        return channel_id
+
+    def _message_or_404(self, request: web.Request) -> dict:
+        channel_id = self._channel_or_404(request)
+        message = self.messages.get(int(request.match_info["message_id"]))
+        if message is None or int(message["channel_id"]) != channel_id:
+            raise _not_found({"message": "Unknown Message", "code": 10008})
+        return message
+
+    async def _get_channel(self, request: web.Request) -> web.Response:
+        return _json(self.channels[self._channel_or_404(request)])
+
+    async def _history(self, request: web.Request) -> web.Response:
+        channel_id = self._channel_or_404(request)
+        limit = min(int(request.query.get("limit", 50)), 100)
+        ids = [i for i in self.channel_messages[channel_id] if i in self.messages]
+        if "before" in request.query:
+            before = int(request.query["before"])
+            ids = [i for i in ids if i < before][-limit:]
+        elif "after" in request.query:
+            after = int(request.query["after"])
+            ids = [i for i in ids if i > after][:limit]
+        elif "around" in request.query:
+            around = int(request.query["around"])
+            older = [i for i in ids if i <= around][-(limit // 2 + 1):]
+            newer = [i for i in ids if i > around][: limit - len(older)]
+            ids = older + newer
+        else:
+            ids = ids[-limit:]
+        return _json([self._message_view(self.messages[i]) for i in reversed(ids)])
+
+    async def _get_message(self, request: web.Request) -> web.Response:
+        return _json(self._message_view(self._message_or_404(request)))
+
+    async def _send_message(self, request: web.Request) -> web.Response:
+        channel_id = self._channel_or_404(request)
+        payload, files = await self._read_payload(request)
+        error = self._check_upload(files) or self._check_content(payload)
+        if error is not None:
+            return error
+        message = self._store_message(
+            channel_id,
+            self.bot_id,
+            content=payload.get("content") or "",
+            embeds=payload.get("embeds"),
+            components=payload.get("components"),
+            attachments=self._new_attachments(channel_id, files),
+        )
+        await self.dispatch("MESSAGE_CREATE", message)
+        return _json(message)
+
+    async def _edit_message(self, request: web.Request) -> web.Response:
+        message = self._message_or_404(request)
+        payload, files = await self._read_payload(request)
+        error = self._check_upload(files) or self._check_content(payload)
+        if error is not None:
+            return error
+        self._apply_edit(message, payload, files)
+        await self.dispatch("MESSAGE_UPDATE", message)
+        return _json(message)
+
+    async def _delete_message(self, request: web.Request) -> web.Response:
+        message = self._message_or_404(request)
+        self._delete(message)
+        await self.dispatch(
+            "MESSAGE_DELETE",
+            {"id": message["id"], "channel_id": message["channel_id"], "guild_id": str(self.guild_id)},
+        )
+        return web.Response(status=204)
+
+    def _delete(self, message: dict) -> None:
+        message_id = int(message["id"])
+        self.messages.pop(message_id, None)
+        self.reactions.pop(message_id, None)
+        for attachment in message["attachments"]:
+            self.blobs.pop(int(attachment["id"]), None)
+
+    async def _bulk_delete(self, request: web.Request) -> web.Response:
+        channel_id = self._channel_or_404(request)
+        payload, _ = await self._read_payload(request)
+        ids = [int(i) for i in payload.get("messages", [])]
+        for message_id in ids:
+            message = self.messages.get(message_id)
+            if message is not None and int(message["channel_id"]) == channel_id:
+                self._delete(message)
+        await self.dispatch(
+            "MESSAGE_DELETE_BULK",
+            {"ids": [str(i) for i in ids], "channel_id": str(channel_id), "guild_id": str(self.guild_id)},
+        )
+        return web.Response(status=204)
+
+    async def _pin(self, request: web.Request) -> web.Response:
+        message = self._message_or_404(request)
+        message["pinned"] = request.method == "PUT"
+        return web.Response(status=204)
+
+    async def _reaction_users(self, request: web.Request) -> web.Response:
+        message = self._message_or_404(request)
+        emoji = unquote(request.match_info["emoji"])
+        limit = min(int(request.query.get("limit", 25)), 100)
+        after = int(request.query.get("after", 0))
+        users = sorted(self.reactions[int(message["id"])].get(emoji, []))
+        users = [u for u in users if u > after][:limit]
+        return _json([self.users[u] for u in users])
+
+    async def _add_own_reaction(self, request: web.Request) -> web.Response:
+        message = self._message_or_404(request)
+        emoji = unquote(request.match_info["emoji"])
+        users = self.reactions[int(message["id"])].setdefault(emoji, [])
+        if self.bot_id not in users:
+            users.append(self.bot_id)
+        return web.Response(status=204)
+
+    async def _refresh_urls(self, request: web.Request) -> web.Response:
+        payload, _ = await self._read_payload(request)
+        refreshed = []
+        for url in payload.get("attachment_urls", []):
+            path = url.split("?", 1)[0]
+            parts = path.rsplit("/", 3)
+            try:
+                channel_id, attachment_id, filename = int(parts[1]), int(parts[2]), unquote(parts[3])
+            except (IndexError, ValueError):
+                continue
+            if attachment_id in self.blobs:
+                refreshed.append(
+                    {"original": url, "refreshed": self._cdn_url(channel_id, attachment_id, filename)}
+                )
+        return _json({"refreshed_urls": refreshed})
+
+    async def _cdn(self, request: web.Request) -> web.Response:
+        data = self.blobs.get(int(request.match_info["attachment_id"]))
+        if data is None:
+            return web.Response(status=404)
+        return web.Response(body=data, content_type="application/octet-stream")
+
+    # ----- 交互回调与后续消息 -----
+
+    def _interaction_or_404(self, request: web.Request) -> FakeInteraction:
+        interaction = self._tokens.get(request.match_info["webhook_token"])
+        if interaction is None:
+            raise _not_found({"message": "Unknown Webhook", "code": 10015})
+        return interaction
+
+    async def _callback(self, request: web.Request) -> web.Response:
+        interaction = self._interaction_or_404(request)
+        if interaction.callbacks:
+            return self._error(400, "Interaction has already been acknowledged.", 40060)
+        if time.perf_counter() - interaction.created > INTERACTION_DEADLINE:
+            self.expired += 1
+            return self._error(404, "Unknown interaction", 10062)
+        payload, files = await self._read_payload(request)
+        response_type = payload["type"]
+        data = payload.get("data") or {}
+        error = self._check_upload(files) or self._check_content(data)
+        if error is not None:
+            return error
+
+        interaction.callbacks.append(payload)
+        interaction.acknowledged = time.perf_counter()
+        message = None
+        if response_type in (CHANNEL_MESSAGE, DEFERRED_CHANNEL_MESSAGE):
+            flags = (data.get("flags") or 0) | (LOADING if response_type == DEFERRED_CHANNEL_MESSAGE else 0)
+            message = self._store_message(
+                interaction.channel_id,
+                self.bot_id,
+                content=data.get("content") or "",
+                embeds=data.get("embeds"),
+                components=data.get("components"),
+                attachments=self._new_attachments(interaction.channel_id, files),
+                flags=flags,
+                interaction=interaction,
+            )
+            interaction.original_id = int(message["id"])
+        elif response_type in (DEFERRED_UPDATE_MESSAGE, UPDATE_MESSAGE) and interaction.message_id:
+            interaction.original_id = interaction.message_id
+            if response_type == UPDATE_MESSAGE:
+                message = self.messages.get(interaction.message_id)
+                if message is not None:
+                    self._apply_edit(message, data, files)
+        elif response_type == MODAL:
+            interaction.modal = data
+
+        resource: dict = {"type": response_type}
+        if message is not None:
+            resource["message"] = message
+        return _json(
+            {
+                "interaction": {
+                    "id": str(interaction.id),
+                    "type": interaction.type,
+                    "response_message_id": str(message["id"]) if message else None,
+                    "response_message_loading": response_type == DEFERRED_CHANNEL_MESSAGE,
+                    "response_message_ephemeral": bool(message and message["flags"] & EPHEMERAL),
+                },
+                "resource": resource,
+            }
+        )
+
+    async def _followup(self, request: web.Request) -> web.Response:
+        interaction = self._interaction_or_404(request)
+        payload, files = await self._read_payload(request)
+        error = self._check_upload(files) or self._check_content(payload)
+        if error is not None:
+            return error
+        message = self._store_message(
+            interaction.channel_id,
+            self.bot_id,
+            content=payload.get("content") or "",
+            embeds=payload.get("embeds"),
+            components=payload.get("components"),
+            attachments=self._new_attachments(interaction.channel_id, files),
+            flags=payload.get("flags") or 0,
+            interaction=interaction,
+        )
+        interaction.followups.append(int(message["id"]))
+        return _json(message)
+
+    async def _webhook_message(self, request: web.Request) -> web.Response:
+        interaction = self._interaction_or_404(request)
+        raw_id = request.match_info["message_id"]
+        message_id = interaction.original_id if raw_id == "@original" else int(raw_id)
+        message = self.messages.get(message_id) if message_id else None
+        if message is None:
+            return self._error(404, "Unknown Message", 10008)
+        if request.method == "GET":
+            return _json(self._message_view(message))
+        if request.method == "DELETE":
+            self._delete(message)
+            return web.Response(status=204)
+        payload, files = await self._read_payload(request)
+        error = self._check_upload(files) or self._check_content(payload)
+        if error is not None:
+            return error
+        self._apply_edit(message, payload, files)
+        return _json(message)
+
+    # ========== 网关 ==========
+
+    async def _gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"op": 10, "d": {"heartbeat_interval": 41250}, "s": None, "t": None})
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                op = data.get("op")
+                if op == 1:
+                    await ws.send_json({"op": 11, "d": None, "s": None, "t": None})
+                elif op == 2:
+                    await self._identify(ws)
+                elif op == 8:
+                    await self._send_dispatch(
+                        ws,
+                        "GUILD_MEMBERS_CHUNK",
+                        {
+                            "guild_id": str(self.guild_id),
+                            "members": [self._member(u) for u in self.users],
+                            "chunk_index": 0,
+                            "chunk_count": 1,
+                            "nonce": (data.get("d") or {}).get("nonce"),
+                        },
+                    )
+        finally:
+            if ws in self._sockets:
+                self._sockets.remove(ws)
+        return ws
+
+    async def _identify(self, ws: web.WebSocketResponse) -> None:
+        await self._send_dispatch(
+            ws,
+            "READY",
+            {
+                "v": 10,
+                "user": self.users[self.bot_id],
+                "guilds": [{"id": str(self.guild_id), "unavailable": True}],
+                "session_id": secrets.token_hex(16),
+                "resume_gateway_url": self.base_url.replace("http", "ws", 1) + "/gateway",
+                "application": {"id": str(self.bot_id), "flags": 0},
+            },
+        )
+        await self._send_dispatch(ws, "GUILD_CREATE", self._guild_payload())
+        self._sockets.append(ws)
+        self.ready.set()
+
+    async def _send_dispatch(self, ws: web.WebSocketResponse, event: str, data: dict) -> None:
+        self._gateway_seq += 1
+        await ws.send_str(json.dumps({"op": 0, "t": event, "s": self._gateway_seq, "d": data}))
+
+    async def dispatch(self, event: str, data: dict) -> None:
+        """向所有已连接的网关会话发送事件"""
+        for ws in list(self._sockets):
+            if not ws.closed:
+                await self._send_dispatch(ws, event, data)
+
+    # ========== 历史数据 ==========
+
+    def seed_messages(self, channel_id: int, user_ids: list[int], count: int) -> list[int]:
+        """直接写入 count 条成员消息（轮流使用 user_ids），不发送网关事件，模拟 Bot 离线期间的历史"""
+        return [
+            int(self._store_message(channel_id, user_ids[i % len(user_ids)], content=f"消息 {i}")["id"])
+            for i in range(count)
+        ]
+
+    def seed_reactions(self, message_id: int, user_ids: list[int], emoji: str = "👍") -> None:
+        """直接写入回应，不发送网关事件"""
+        users = self.reactions[message_id].setdefault(emoji, [])
+        users.extend(u for u in user_ids if u not in users)
+
+    # ========== 脚本化事件 ==========
+
+    async def post_message(self, channel_id: int, user_id: int, content: str) -> int:
+        """用户在频道中发言"""
+        message = self._store_message(channel_id, user_id, content=content)
+        await self.dispatch("MESSAGE_CREATE", {**message, "member": self._member(user_id)})
+        return int(message["id"])
+
+    async def react(self, channel_id: int, message_id: int, user_id: int, emoji: str = "👍") -> None:
+        """用户对消息添加回应"""
+        users = self.reactions[message_id].setdefault(emoji, [])
+        if user_id not in users:
+            users.append(user_id)
+        await self.dispatch(
+            "MESSAGE_REACTION_ADD",
+            {
+                "user_id": str(user_id),
+                "channel_id": str(channel_id),
+                "message_id": str(message_id),
+                "guild_id": str(self.guild_id),
+                "emoji": {"id": None, "name": emoji},
+                "member": self._member(user_id),
+                "burst": False,
+                "type": 0,
+            },
+        )
+
+    def _interaction_payload(self, interaction: FakeInteraction, data: dict) -> dict:
+        payload = {
+            "id": str(interaction.id),
+            "application_id": str(self.bot_id),
+            "type": interaction.type,
+            "token": interaction.token,
+            "version": 1,
+            "guild_id": str(self.guild_id),
+            "channel_id": str(interaction.channel_id),
+            "channel": self.channels[interaction.channel_id],
+            "member": self._member(interaction.user_id),
+            "app_permissions": str((1 << 41) - 1),
+            "locale": "zh-CN",
+            "guild_locale": "zh-CN",
+            "entitlements": [],
+            "attachment_size_limit": self.upload_limit,
+            "authorizing_integration_owners": {"0": str(self.guild_id)},
+            "context": 0,
+            "data": data,
+        }
+        if interaction.message_id is not None and interaction.message_id in self.messages:
+            payload["message"] = self._message_view(self.messages[interaction.message_id])
+        return payload
+
+    async def _start_interaction(
+        self, interaction_type: int, channel_id: int, user_id: int, data: dict, message_id: int | None = None
+    ) -> FakeInteraction:
+        interaction = FakeInteraction(
+            id=self.snowflake(),
+            token=secrets.token_urlsafe(24),
+            type=interaction_type,
+            channel_id=channel_id,
+            user_id=user_id,
+            message_id=message_id,
+        )
+        self.interactions[interaction.id] = interaction
+        self._tokens[interaction.token] = interaction
+        await self.dispatch("INTERACTION_CREATE", self._interaction_payload(interaction, data))
+        return interaction
+
+    async def command(
+        self,
+        name: str,
+        channel_id: int,
+        user_id: int,
+        options: dict[str, Any] | None = None,
+        files: dict[str, tuple[str, bytes]] | None = None,
+    ) -> FakeInteraction:
+        """
+        调用斜杠命令
+
+        Args:
+            options: 普通参数（名称 → 值）
+            files: 附件参数（名称 → (文件名, 内容)）
+        """
+        option_list = [
+            {"name": key, "type": 3, "value": value} for key, value in (options or {}).items()
+        ]
+        attachments = {}
+        for key, (filename, content) in (files or {}).items():
+            attachment = self.upload_attachment(filename, content)
+            attachments[attachment["id"]] = attachment
+            option_list.append({"name": key, "type": 11, "value": attachment["id"]})
+        command = self.commands.get(name, {})
+        data = {
+            "id": command.get("id", str(self.snowflake())),
+            "name": name,
+            "type": 1,
+            "options": option_list,
+            "resolved": {"attachments": attachments} if attachments else {},
+        }
+        return await self._start_interaction(APPLICATION_COMMAND, channel_id, user_id, data)
+
+    def find_button(self, message_id: int, label: str) -> str:
+        """按标签（或 custom_id）查找消息上的按钮，返回 custom_id"""
+        message = self.messages[message_id]
+        for row in message.get("components", []):
+            for component in row.get("components", []):
+                if component.get("type") == 2 and label in (component.get("label"), component.get("custom_id")):
+                    return component["custom_id"]
+        raise KeyError(f"消息 {message_id} 上没有按钮: {label}")
+
+    async def click(self, message_id: int, label: str, user_id: int) -> FakeInteraction:
+        """点击消息上的按钮"""
+        custom_id = self.find_button(message_id, label)
+        channel_id = int(self.messages[message_id]["channel_id"])
+        data = {"custom_id": custom_id, "component_type": 2}
+        return await self._start_interaction(MESSAGE_COMPONENT, channel_id, user_id, data, message_id)
+
+    async def submit_modal(
+        self, source: FakeInteraction, values: dict[str, str], user_id: int | None = None
+    ) -> FakeInteraction:
+        """
+        提交 Bot 弹出的弹窗
+
+        Args:
+            source: 弹出弹窗的交互
+            values: 输入框标签（或 custom_id）→ 填写的值，未填写的输入框提交空字符串
+        """
+        if source.modal is None:
+            raise ValueError("该交互没有弹出弹窗")
+
+        def _fill(component: dict) -> dict:
+            return {
+                "type": component["type"],
+                "custom_id": component["custom_id"],
+                "value": values.get(component.get("label"), values.get(component["custom_id"], "")),
+            }
+
+        rows = []
+        for row in source.modal.get("components", []):
+            if row.get("type") == 18:
+                # Label 组件：标签在外层
+                inner = {**row["component"], "label": row.get("label")}
+                rows.append({"type": 18, "component": _fill(inner)})
+            else:
+                rows.append({"type": 1, "components": [_fill(c) for c in row.get("components", [])]})
+        data = {"custom_id": source.modal["custom_id"], "components": rows}
+        return await self._start_interaction(
+            MODAL_SUBMIT, source.channel_id, user_id or source.user_id, data, source.message_id
+        )
+
+    async def acknowledged(self, interaction: FakeInteraction, timeout: float = 10.0) -> FakeInteraction:
+        """等待 Bot 应答交互"""
+        await self.wait_for(lambda: interaction.callbacks, timeout)
+        return interaction
+
+    # ========== 启停 ==========
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    async def start(self) -> None:
+        """启动模拟后端（port 为 0 时自动选择端口）"""
+        self._runner = web.AppRunner(self._build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0:
+            self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """关闭所有网关连接并停止服务"""
+        for ws in list(self._sockets):
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def stats(self) -> dict[str, Any]:
+        """请求统计与注入的故障次数"""
+        return {
+            "requests": sum(self.requests.values()),
+            "rate_limited": sum(self.rate_limited.values()),
+            "expired": self.expired,
+            "routes": dict(self.requests),
+            "faults": dataclasses.asdict(self.faults),
+        }
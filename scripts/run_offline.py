@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+离线运行工具
+启动本地 Discord 模拟后端（scripts/fake_discord.py），在同一进程中以网关模式运行 ResourceBot，
+并按脚本驱动交互，无需真实 Bot Token 和服务器
+
+默认场景：上传者在帖子中发布作品（/发布作品 → 填写标题 → 下一步 → 确认发布），
+另一名成员通过 /获取作品 和「下载作品」按钮获取链接，最后输出各接口的调用次数
+
+使用方法：
+  默认场景:     python scripts/run_offline.py
+  注入延迟:     python scripts/run_offline.py --latency-ms 80 --jitter-ms 40
+  注入限速:     python scripts/run_offline.py --rate-limit 0.05 --retry-after 0.2
+  自定义事件流: python scripts/run_offline.py --feed scripts/fixtures/offline_feed.jsonl
+
+事件流文件每行一个 JSON 对象（$ 开头的变量引用前面步骤 as 保存的交互或消息，
+"public" 表示帖子中带「下载作品」按钮的公开消息）：
+  {"op": "message", "user": "member", "content": "感谢分享"}
+  {"op": "react", "user": "member"}
+  {"op": "command", "name": "获取作品", "user": "member"}
+  {"op": "command", "name": "发布作品", "user": "uploader", "files": {"file1": ["a.zip", 1048576]}, "as": "start"}
+  {"op": "click", "message": "$start", "label": "开始设置", "user": "uploader", "as": "setup"}
+  {"op": "modal", "source": "$setup", "values": {"作品标题": "示例"}}
+  {"op": "wait_public", "as": "public"}
+  {"op": "click", "message": "public", "label": "下载作品", "user": "member"}
+  {"op": "sleep", "seconds": 0.5}
+
+注意：只模拟网关接入方式，HTTP 交互接入（INGRESS_MODE=http）不在模拟范围内
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import TYPE_CHECKING, AsyncIterator
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.fake_discord import LOADING, FakeDiscord, FakeInteraction, Faults, point_discord_at
+
+if TYPE_CHECKING:
+    # 只用于类型标注：bot 模块导入时会读取配置，需在 prepare_environment 设置好环境变量后才能导入
+    from bot import ResourceBot
+
+# 单步操作的等待上限（秒）
+STEP_TIMEOUT = 30.0
+
+
+def public_message(fake: FakeDiscord, thread_id: int) -> int | None:
+    """帖子中带有「下载作品」按钮的公开消息"""
+    for message_id in reversed(fake.channel_messages[thread_id]):
+        if message_id not in fake.messages:
+            continue
+        try:
+            fake.find_button(message_id, "下载作品")
+            return message_id
+        except KeyError:
+            continue
+    return None
+
+
+def reply_summary(fake: FakeDiscord, interaction: FakeInteraction) -> str:
+    """Bot 最后一条回复的摘要（首个 Embed 标题或消息内容）"""
+    if interaction.modal is not None:
+        return f"弹窗「{interaction.modal.get('title', '')}」"
+    message_id = interaction.followups[-1] if interaction.followups else interaction.original_id
+    message = fake.messages.get(message_id)
+    if message is None:
+        return ""
+    if message["embeds"]:
+        return message["embeds"][0].get("title", "")
+    return message["content"][:40]
+
+
+async def settle(fake: FakeDiscord, interaction: FakeInteraction, timeout: float = STEP_TIMEOUT) -> None:
+    """等待交互应答，延迟应答的还要等到原始回复不再是加载中，或已发送后续消息"""
+
+    def _done():
+        if not interaction.callbacks:
+            return False
+        if interaction.followups or interaction.callbacks[0]["type"] != 5:
+            return True
+        original = fake.messages.get(interaction.original_id)
+        return original is not None and not original["flags"] & LOADING
+
+    await fake.wait_for(_done, timeout)
+
+
+async def publish_work(
+    fake: FakeDiscord,
+    thread_id: int,
+    uploader: int,
+    title: str,
+    files: dict[str, tuple[str, bytes]],
+    dl_req: str = "自由下载",
+    passcode: str | None = None,
+    timeout: float = STEP_TIMEOUT,
+) -> tuple[FakeInteraction, int | None]:
+    """
+    走完发布流程（/发布作品 → 标题 → 下一步 → 下载门槛 → 确认发布）
+
+    Returns:
+        (「确认发布」交互, 公开消息 ID)，发布失败时公开消息 ID 为 None
+    """
+    start = await fake.command("发布作品", thread_id, uploader, files=files)
+    await settle(fake, start, timeout)
+    setup = await fake.click(start.original_id, "开始设置", uploader)
+    await settle(fake, setup, timeout)
+    await settle(fake, await fake.submit_modal(setup, {"作品标题": title}), timeout)
+    await settle(fake, await fake.click(start.original_id, "下一步", uploader), timeout)
+    if dl_req == "互动":
+        await settle(fake, await fake.click(start.original_id, "互动(回应/回复)", uploader), timeout)
+    elif dl_req == "提取码":
+        modal = await fake.click(start.original_id, "提取码", uploader)
+        await settle(fake, modal, timeout)
+        await settle(fake, await fake.submit_modal(modal, {"提取码": passcode}), timeout)
+
+    # 发布完成时原始回复会被改为成功或失败提示
+    confirm = await fake.click(start.original_id, "确认发布", uploader)
+    await fake.wait_for(
+        lambda: confirm.callbacks and reply_summary(fake, confirm)[:1] in ("✅", "❌"), timeout
+    )
+    if not reply_summary(fake, confirm).startswith("✅"):
+        return confirm, None
+    return confirm, public_message(fake, thread_id)
+
+
+class Scenario:
+    """离线场景：模拟后端、两名用户和一个论坛帖子"""
+
+    def __init__(self, fake: FakeDiscord):
+        self.fake = fake
+        self.users = {
+            "uploader": fake.add_user("uploader"),
+            "member": fake.add_user("member"),
+        }
+        self.thread_id = fake.add_thread(self.users["uploader"], "离线测试帖")
+        # 步骤结果（as 保存的交互 / 消息）
+        self.saved: dict[str, FakeInteraction | int] = {}
+        self.timings: list[tuple[str, float, str]] = []
+
+    def user(self, name: str) -> int:
+        return self.users[name]
+
+    def resolve(self, value):
+        """解析 $ 变量（前面步骤 as 保存的交互或消息 ID）"""
+        if isinstance(value, str) and value.startswith("$"):
+            return self.saved[value[1:]]
+        return value
+
+    def message_of(self, value) -> int:
+        """解析消息引用：交互取其原始回复消息"""
+        target = self.resolve(value)
+        if isinstance(target, FakeInteraction):
+            return target.original_id
+        return int(target)
+
+    def public_message(self) -> int | None:
+        """帖子中带有「下载作品」按钮的公开消息"""
+        return public_message(self.fake, self.thread_id)
+
+    async def _step(self, label: str, interaction: FakeInteraction) -> FakeInteraction:
+        """等待 Bot 应答和后续处理完成，记录首次应答耗时和回复摘要"""
+        await settle(self.fake, interaction)
+        self.timings.append((label, interaction.ack_latency * 1000, reply_summary(self.fake, interaction)))
+        return interaction
+
+    async def run_op(self, op: dict) -> None:
+        """执行一步事件流操作"""
+        kind = op["op"]
+        fake = self.fake
+        result: FakeInteraction | int | None = None
+
+        if kind == "message":
+            channel = self.message_of(op["channel"]) if "channel" in op else self.thread_id
+            result = await fake.post_message(channel, self.user(op["user"]), op["content"])
+        elif kind == "react":
+            message = self.message_of(op["message"]) if "message" in op else self.thread_id
+            channel = int(fake.messages[message]["channel_id"])
+            await fake.react(channel, message, self.user(op["user"]), op.get("emoji", "👍"))
+            result = message
+        elif kind == "command":
+            files = {
+                key: (filename, os.urandom(size))
+                for key, (filename, size) in op.get("files", {}).items()
+            }
+            interaction = await fake.command(
+                op["name"], self.thread_id, self.user(op["user"]), op.get("options"), files
+            )
+            result = await self._step(f"/{op['name']}", interaction)
+        elif kind == "click":
+            message = self.public_message() if op.get("message") == "public" else self.message_of(op["message"])
+            interaction = await fake.click(message, op["label"], self.user(op["user"]))
+            result = await self._step(op["label"], interaction)
+        elif kind == "modal":
+            source = self.resolve(op["source"])
+            interaction = await fake.submit_modal(source, op["values"])
+            result = await self._step(f"弹窗:{source.modal.get('title', '')}", interaction)
+        elif kind == "wait_public":
+            result = await fake.wait_for(self.public_message, STEP_TIMEOUT)
+        elif kind == "sleep":
+            await asyncio.sleep(op["seconds"])
+        else:
+            raise ValueError(f"未知操作: {kind}")
+
+        if "as" in op and result is not None:
+            self.saved[op["as"]] = result
+
+
+def default_feed(file_size: int) -> list[dict]:
+    """默认场景：发布一个作品，再由另一名成员获取"""
+    return [
+        {"op": "command", "name": "发布作品", "user": "uploader",
+         "files": {"file1": ["offline.bin", file_size]}, "as": "start"},
+        {"op": "click", "message": "$start", "label": "开始设置", "user": "uploader", "as": "setup"},
+        {"op": "modal", "source": "$setup", "values": {"作品标题": "离线测试作品"}},
+        {"op": "click", "message": "$start", "label": "下一步", "user": "uploader"},
+        {"op": "click", "message": "$start", "label": "确认发布", "user": "uploader"},
+        {"op": "wait_public", "as": "public"},
+        {"op": "command", "name": "获取作品", "user": "member"},
+        {"op": "click", "message": "public", "label": "下载作品", "user": "member"},
+    ]
+
+
+def load_feed(path: str) -> list[dict]:
+    """读取事件流文件（跳过空行和 # 注释）"""
+    ops = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                ops.append(json.loads(line))
+    return ops
+
+
+def prepare_environment(fake: FakeDiscord, state_dir: str) -> None:
+    """在导入配置前写入离线运行所需的环境变量（Token、仓库频道指向模拟后端，命令同步状态写入临时目录）"""
+    os.environ["BOT_TOKEN"] = "offline-token"
+    os.environ["WAREHOUSE_CHANNEL_IDS"] = ",".join(str(i) for i in fake.warehouse_ids)
+    os.environ["WAREHOUSE_CHANNEL_ID"] = str(fake.warehouse_ids[0])
+    os.environ["COMMAND_SYNC_STATE"] = os.path.join(state_dir, "command_sync.json")
+
+
+@contextlib.asynccontextmanager
+async def offline_bot(fake: FakeDiscord) -> AsyncIterator["ResourceBot"]:
+    """
+    启动连接到模拟后端的 Bot，就绪后交给调用方，退出时关闭
+
+    模拟后端未运行时一并启动并在退出时停止；已在运行时保持不变，
+    可以在同一份模拟数据上依次启动多个 Bot（如模拟重启后缓存为空的情况）
+    """
+    owns_backend = not fake.running
+    if owns_backend:
+        await fake.start()
+    point_discord_at(fake.base_url)
+
+    with tempfile.TemporaryDirectory(prefix="jiuwo-offline-") as state_dir:
+        prepare_environment(fake, state_dir)
+        from bot import ResourceBot
+        from config import Config
+
+        bot = ResourceBot(warehouse_channel_ids=Config.WAREHOUSE_CHANNEL_IDS)
+        bot_task = asyncio.create_task(bot.start(Config.BOT_TOKEN))
+        try:
+            ready = asyncio.create_task(bot.wait_until_ready())
+            await asyncio.wait({ready, bot_task}, timeout=STEP_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+            if not ready.done():
+                ready.cancel()
+                if bot_task.done():
+                    raise RuntimeError("Bot 启动失败") from bot_task.exception()
+                raise RuntimeError("等待 Bot 就绪超时")
+            print(f"✅ 模拟后端已就绪: {fake.base_url}")
+            fake.reset_counts()
+            yield bot
+        finally:
+            await bot.close()
+            await asyncio.gather(bot_task, return_exceptions=True)
+            if owns_backend:
+                await fake.stop()
+
+
+async def run(args: argparse.Namespace) -> int:
+    faults = Faults(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        rate_limit_ratio=args.rate_limit,
+        retry_after=args.retry_after,
+    )
+    fake = FakeDiscord(faults=faults, seed=args.seed)
+    for _ in range(args.shards - 1):
+        fake.add_warehouse_channel()
+    scenario = Scenario(fake)
+    ops = load_feed(args.feed) if args.feed else default_feed(args.file_size)
+
+    failed = False
+    async with offline_bot(fake):
+        started = time.perf_counter()
+        for index, op in enumerate(ops, 1):
+            try:
+                await scenario.run_op(op)
+            except Exception as e:
+                print(f"❌ 第 {index} 步失败 ({op['op']}): {type(e).__name__}: {e}")
+                failed = True
+                break
+        elapsed = time.perf_counter() - started
+
+    print(f"\n场景耗时 {elapsed:.2f} 秒，共 {len(scenario.timings)} 次交互")
+    for label, ms, summary in scenario.timings:
+        print(f"  {label:<20} 首次应答 {ms:>8.1f} ms  → {summary}")
+
+    stats = fake.stats()
+    print(f"\nREST 请求 {stats['requests']} 次（注入 429 {stats['rate_limited']} 次）")
+    for route, count in sorted(stats["routes"].items(), key=lambda item: -item[1]):
+        print(f"  {count:>5}  {route}")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在本地模拟后端上离线运行 Bot")
+    parser.add_argument("--feed", help="事件流文件（JSONL），默认运行内置的发布 / 获取场景")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每个 REST 请求的固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="额外随机延迟上限（毫秒）")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="REST 请求返回 429 的概率")
+    parser.add_argument("--retry-after", type=float, default=0.05, help="429 响应中的 retry_after（秒）")
+    parser.add_argument("--file-size", type=int, default=1024 * 1024, help="默认场景上传的文件大小（字节）")
+    parser.add_argument("--shards", type=int, default=1, help="仓库频道分片数")
+    parser.add_argument("--seed", type=int, help="随机种子（延迟抖动和 429 注入）")
+    args = parser.parse_args()
+
+    try:
+        sys.exit(asyncio.run(run(args)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
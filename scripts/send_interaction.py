@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+HTTP 交互入口本地测试工具
+用测试密钥对交互载荷签名并发送到本地 HTTP 交互入口
+
+使用方法：
+  生成测试密钥: python scripts/send_interaction.py --gen-key
+    （将输出的公钥填入 DISCORD_PUBLIC_KEY，以 INGRESS_MODE=http 启动 Bot）
+  发送载荷: python scripts/send_interaction.py --key <私钥> scripts/fixtures/ping.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import aiohttp
+
+try:
+    from nacl.signing import SigningKey
+except ImportError:
+    print("❌ 错误: 需要安装 PyNaCl: pip install PyNaCl")
+    sys.exit(1)
+
+# Discord 纪元（2015-01-01）毫秒时间戳
+DISCORD_EPOCH = 1420070400000
+
+
+def make_snowflake() -> str:
+    """按当前时间生成雪花 ID，避免重复发送时 ID 冲突"""
+    return str((int(time.time() * 1000) - DISCORD_EPOCH) << 22)
+
+
+def sign(key: SigningKey, body: bytes) -> dict[str, str]:
+    """生成签名请求头（签名内容为 时间戳 + 请求体）"""
+    timestamp = str(int(time.time()))
+    signature = key.sign(timestamp.encode() + body).signature.hex()
+    return {
+        "X-Signature-Ed25519": signature,
+        "X-Signature-Timestamp": timestamp,
+        "Content-Type": "application/json",
+    }
+
+
+async def send(url: str, key: SigningKey, path: str, bad_signature: bool) -> None:
+    """签名并发送一个载荷文件"""
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    payload["id"] = make_snowflake()
+    body = json.dumps(payload).encode()
+
+    headers = sign(key, body)
+    if bad_signature:
+        headers["X-Signature-Ed25519"] = "00" * 64
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, data=body, headers=headers) as resp:
+            text = await resp.text()
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{path}: HTTP {resp.status} ({elapsed:.1f} ms) {text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="签名并发送测试交互载荷")
+    parser.add_argument("fixtures", nargs="*", help="交互载荷 JSON 文件")
+    parser.add_argument("--gen-key", action="store_true", help="生成一对测试密钥")
+    parser.add_argument("--key", help="测试私钥（十六进制）")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/interactions", help="交互入口地址")
+    parser.add_argument("--bad-signature", action="store_true", help="发送错误签名，验证入口会拒绝")
+    args = parser.parse_args()
+
+    if args.gen_key:
+        key = SigningKey.generate()
+        print(f"私钥: {key.encode().hex()}")
+        print(f"公钥 (DISCORD_PUBLIC_KEY): {key.verify_key.encode().hex()}")
+        return
+
+    if not args.key or not args.fixtures:
+        parser.error("需要 --key 和至少一个载荷文件")
+
+    key = SigningKey(bytes.fromhex(args.key))
+    for path in args.fixtures:
+        asyncio.run(send(args.url, key, path, args.bad_signature))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+交互追踪汇总工具
+读取 Bot 写入的追踪 JSONL（含滚动的旧文件），按跨度名称统计 p50 / p99 耗时
+
+使用方法：
+  python scripts/trace_summary.py data/traces.jsonl
+  只看某个交互: python scripts/trace_summary.py data/traces.jsonl --name 获取作品
+  只看慢交互:   python scripts/trace_summary.py data/traces.jsonl --min-ms 1000
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+from collections import defaultdict
+
+
+def trace_files(path: str) -> list[str]:
+    """当前文件及 RotatingFileHandler 滚动出的 .1 / .2 ... 文件（旧文件在前）"""
+    rotated = [p for p in glob.glob(f"{glob.escape(path)}.*") if p.rsplit(".", 1)[-1].isdigit()]
+    rotated.sort(key=lambda p: int(p.rsplit(".", 1)[-1]), reverse=True)
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def load_traces(path: str) -> list[dict]:
+    """读取所有追踪记录（跳过损坏的行）"""
+    traces = []
+    for file in trace_files(path):
+        with open(file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    traces.append(json.loads(line))
+                except ValueError:
+                    continue
+    return traces
+
+
+def percentile(values: list[float], q: float) -> float:
+    """最近秩百分位数（values 需已排序）"""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+
+def print_table(title: str, groups: dict[str, list[float]]) -> None:
+    """输出一张统计表，按 p99 降序"""
+    print(f"\n{title}")
+    print(f"  {'名称':<32} {'次数':>7} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    rows = []
+    for name, values in groups.items():
+        values.sort()
+        rows.append((name, len(values), percentile(values, 50), percentile(values, 99), values[-1]))
+    for name, count, p50, p99, peak in sorted(rows, key=lambda row: row[3], reverse=True):
+        print(f"  {name:<32} {count:>7} {p50:>10.1f} {p99:>10.1f} {peak:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按跨度名称汇总交互追踪耗时")
+    parser.add_argument("path", help="追踪文件路径（TRACE_PATH）")
+    parser.add_argument("--name", help="只统计指定名称的交互（命令名或按钮动作）")
+    parser.add_argument("--min-ms", type=float, default=0.0, help="只统计总耗时不低于该值的交互")
+    args = parser.parse_args()
+
+    traces = [
+        t
+        for t in load_traces(args.path)
+        if (args.name is None or t.get("name") == args.name)
+        and t.get("duration_ms", 0.0) >= args.min_ms
+    ]
+    if not traces:
+        print("没有符合条件的追踪记录")
+        return
+
+    roots: dict[str, list[float]] = defaultdict(list)
+    spans: dict[str, list[float]] = defaultdict(list)
+    errors = 0
+    for trace in traces:
+        roots[f"{trace['kind']}:{trace['name']}"].append(trace["duration_ms"])
+        if trace.get("status") != "ok":
+            errors += 1
+        for item in trace.get("spans", []):
+            spans[item["name"]].append(item["duration_ms"])
+
+    sampled = sum(1 for t in traces if t.get("sampled"))
+    print(f"追踪 {len(traces)} 条（采样 {sampled}，慢交互 {len(traces) - sampled}，失败 {errors}）")
+    print_table("交互总耗时", roots)
+    if spans:
+        print_table("跨度耗时", spans)
+
+
+if __name__ == "__main__":
+    main()
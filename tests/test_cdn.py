@@ -0,0 +1,57 @@
+"""CDN 链接批量刷新器的测试"""
+
+import asyncio
+import unittest
+
+from utils.cdn import CdnUrlRefresher
+
+
+class _SlowHttp:
+    """模拟 refresh-urls 接口：每次请求耗时 delay 秒，返回加上 ?new 的链接"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.batches: list[list[str]] = []
+
+    async def request(self, route, json):
+        self.batches.append(list(json["attachment_urls"]))
+        await asyncio.sleep(self.delay)
+        return {
+            "refreshed_urls": [
+                {"original": url, "refreshed": f"{url}?new"} for url in json["attachment_urls"]
+            ]
+        }
+
+
+class CdnUrlRefresherTest(unittest.IsolatedAsyncioTestCase):
+    async def test_refresh_during_inflight_flush_is_sent(self):
+        """发送期间到达的刷新请求不会被挂起，由同一个刷新任务随后发送"""
+        http = _SlowHttp(delay=0.3)
+        refresher = CdnUrlRefresher(http, batch_delay=0.01)
+
+        first = asyncio.create_task(refresher.refresh(["https://cdn/a"]))
+        await asyncio.sleep(0.1)  # 第一批正在发送
+        second = asyncio.create_task(refresher.refresh(["https://cdn/b"]))
+
+        results = await asyncio.wait_for(asyncio.gather(first, second), timeout=3)
+
+        self.assertEqual(results[0], {"https://cdn/a": "https://cdn/a?new"})
+        self.assertEqual(results[1], {"https://cdn/b": "https://cdn/b?new"})
+        self.assertEqual(http.batches, [["https://cdn/a"], ["https://cdn/b"]])
+        self.assertEqual(refresher.stats()["pending"], 0)
+
+    async def test_concurrent_refreshes_are_merged(self):
+        """批量等待期间的多次刷新合并为一次请求"""
+        http = _SlowHttp(delay=0.01)
+        refresher = CdnUrlRefresher(http, batch_delay=0.05)
+
+        await asyncio.gather(
+            refresher.refresh(["https://cdn/a"]),
+            refresher.refresh(["https://cdn/a", "https://cdn/b"]),
+        )
+
+        self.assertEqual(http.batches, [["https://cdn/a", "https://cdn/b"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""交互限流与提取码校验的测试"""
+
+import unittest
+
+from utils.throttle import InteractionThrottle
+
+
+def _throttle(**kwargs) -> InteractionThrottle:
+    return InteractionThrottle(user=(0, 60), work=(0, 60), global_=(0, 60), **kwargs)
+
+
+class CheckPasscodeTest(unittest.TestCase):
+    def test_correct_passcode_passes(self):
+        throttle = _throttle()
+        self.assertTrue(throttle.check_passcode(1, 2, "abc", "abc"))
+
+    def test_missing_passcode_never_passes(self):
+        """作品改为不需要提取码后 code 为 None 或空字符串，不抛异常也不通过、不计错误"""
+        throttle = _throttle()
+        for expected in (None, ""):
+            self.assertFalse(throttle.check_passcode(1, 2, "", expected))
+            self.assertFalse(throttle.check_passcode(1, 2, "abc", expected))
+        self.assertEqual(throttle.passcode_failures, 0)
+
+    def test_lockout_after_max_failures(self):
+        throttle = _throttle(max_failures=2, lockout=30)
+        self.assertFalse(throttle.check_passcode(1, 2, "x", "abc"))
+        self.assertEqual(throttle.locked_for(1, 2), 0.0)
+        self.assertFalse(throttle.check_passcode(1, 2, "y", "abc"))
+        self.assertGreater(throttle.locked_for(1, 2), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
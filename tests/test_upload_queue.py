@@ -0,0 +1,31 @@
+"""仓库写入队列的测试"""
+
+import contextvars
+import unittest
+
+from utils.upload_queue import WarehouseWriteQueue
+
+_caller = contextvars.ContextVar("caller", default=None)
+
+
+class WarehouseWriteQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def test_job_runs_in_submitter_context(self):
+        """工作协程在启动时创建，任务仍应看到提交者的上下文变量（交互的 REST 调用计数依赖于此）"""
+        queue = WarehouseWriteQueue(workers=1, rate=100, period=1.0)
+        queue.start()
+        try:
+            seen = []
+
+            async def job():
+                seen.append(_caller.get())
+                return "ok"
+
+            _caller.set("interaction-1")
+            self.assertEqual(await queue.run(("send", 1), job), "ok")
+            self.assertEqual(seen, ["interaction-1"])
+        finally:
+            await queue.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
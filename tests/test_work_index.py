@@ -0,0 +1,51 @@
+"""帖子索引回填的测试"""
+
+import os
+import tempfile
+import unittest
+
+from utils.snapshot import WarehouseSnapshot
+from utils.work_index import WorkEntry, WorkIndex
+
+
+class _Channel:
+    """只记录 history 调用参数的帖子（不含任何消息）"""
+
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.history_calls: list[dict] = []
+
+    def history(self, **kwargs):
+        self.history_calls.append(kwargs)
+
+        async def _empty():
+            return
+            yield
+
+        return _empty()
+
+
+class WorkIndexResolveTest(unittest.IsolatedAsyncioTestCase):
+    async def test_scan_is_bounded_and_starts_from_oldest(self):
+        index = WorkIndex(scan_limit=100)
+        channel = _Channel(1)
+        self.assertIsNone(await index.resolve(channel, bot_user_id=42))
+        self.assertEqual(channel.history_calls, [{"limit": 100, "oldest_first": True}])
+
+    async def test_snapshot_is_checked_before_scanning(self):
+        """其他进程写入快照的帖子不需要回溯历史"""
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = WarehouseSnapshot(os.path.join(directory, "snapshot.db"))
+            entry = WorkEntry(public_message_id=2, warehouse_id=3, uploader=4, shard=0)
+            snapshot.save_thread(1, entry)
+            try:
+                index = WorkIndex(snapshot=snapshot)
+                channel = _Channel(1)
+                self.assertEqual(await index.resolve(channel, bot_user_id=42), entry)
+                self.assertEqual(channel.history_calls, [])
+            finally:
+                snapshot.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
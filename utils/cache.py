@@ -0,0 +1,143 @@
+"""
+缓存工具
+提供带 TTL 过期和 LRU 淘汰的有界内存缓存，以及并发请求合并
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    TTL + LRU 有界缓存
+
+    - 条目写入后 ttl 秒过期
+    - 超过 max_entries 时淘汰最久未使用的条目
+    - 记录命中 / 未命中 / 淘汰次数
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.peek(key) is not None
+
+    def get(self, key: K) -> V | None:
+        """读取条目并计入命中统计，过期或不存在返回 None"""
+        value = self.peek(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: K) -> V | None:
+        """读取条目但不影响统计和 LRU 顺序"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        """写入条目，必要时淘汰最久未使用的条目"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def values(self) -> list[V]:
+        """获取所有未过期的条目（不影响统计和 LRU 顺序）"""
+        now = time.monotonic()
+        return [value for expires_at, value in self._data.values() if expires_at > now]
+
+    def invalidate(self, key: K) -> None:
+        """移除条目"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        """获取缓存统计信息"""
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    并发请求合并
+
+    同一 key 同时只执行一次请求，其余并发调用者等待同一个结果
+    某个等待者被取消不会影响正在进行的请求
+    """
+
+    def __init__(self):
+        self._inflight: dict[K, asyncio.Task[V]] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: K, factory: Callable[[], Awaitable[V]]) -> V:
+        """
+        执行请求，若同一 key 已有请求在进行中则直接等待其结果
+
+        Args:
+            key: 请求标识
+            factory: 实际发起请求的协程工厂
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._on_done(k, t))
+
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: K, task: asyncio.Task) -> None:
+        """请求完成后移出进行中列表"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都已取消时，避免出现未读取异常的警告
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        """获取请求合并统计"""
+        return {
+            "inflight": len(self._inflight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
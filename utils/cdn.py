@@ -0,0 +1,121 @@
+"""
+Discord CDN 附件链接工具
+解析链接的过期时间，并批量刷新即将过期的链接
+"""
+
+import asyncio
+from urllib.parse import parse_qs, urlparse
+
+import discord
+from discord.http import Route
+
+# 单次刷新请求最多包含的链接数量（Discord API 限制）
+REFRESH_BATCH_SIZE = 50
+
+
+def parse_expiry(url: str) -> float | None:
+    """
+    解析 CDN 链接的过期时间
+
+    Discord CDN 链接带有签名参数 ex（十六进制 Unix 时间戳）、is、hm
+
+    Returns:
+        过期时间的 Unix 时间戳，链接不带过期参数时返回 None
+    """
+    values = parse_qs(urlparse(url).query).get("ex")
+    if not values:
+        return None
+    try:
+        return float(int(values[0], 16))
+    except ValueError:
+        return None
+
+
+class CdnUrlRefresher:
+    """
+    CDN 链接批量刷新器
+
+    短时间内提交的刷新请求会合并为一次 POST /attachments/refresh-urls 调用
+    同一链接的并发刷新只会请求一次
+    """
+
+    def __init__(self, http: discord.http.HTTPClient, batch_delay: float = 0.05):
+        self.http = http
+        self.batch_delay = batch_delay
+        self._pending: dict[str, asyncio.Future[str]] = {}
+        self._flush_task: asyncio.Task | None = None
+
+        self.requests = 0
+        self.refreshed = 0
+
+    async def refresh(self, urls: list[str]) -> dict[str, str]:
+        """
+        刷新一批链接
+
+        Returns:
+            原链接 → 新链接 的映射（刷新失败的链接保持原样）
+        """
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for url in urls:
+            future = self._pending.get(url)
+            if future is None:
+                future = loop.create_future()
+                self._pending[url] = future
+            futures[url] = future
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+        results = await asyncio.gather(*futures.values(), return_exceptions=True)
+        return {
+            url: result if isinstance(result, str) else url
+            for url, result in zip(futures.keys(), results)
+        }
+
+    async def _flush(self) -> None:
+        """
+        等待一小段时间收集请求后批量发送
+
+        发送期间到达的请求会进入新的 _pending，此时刷新任务仍在运行，refresh 不会再启动新任务，
+        所以发送完后继续处理，直到没有待刷新的链接
+        """
+        while self._pending:
+            await asyncio.sleep(self.batch_delay)
+            pending, self._pending = self._pending, {}
+            await self._send(pending)
+
+    async def _send(self, pending: dict[str, asyncio.Future[str]]) -> None:
+        """按批发送刷新请求并回填结果"""
+        urls = list(pending.keys())
+
+        for start in range(0, len(urls), REFRESH_BATCH_SIZE):
+            batch = urls[start:start + REFRESH_BATCH_SIZE]
+            try:
+                self.requests += 1
+                data = await self.http.request(
+                    Route("POST", "/attachments/refresh-urls"),
+                    json={"attachment_urls": batch},
+                )
+            except Exception as e:
+                for url in batch:
+                    if not pending[url].done():
+                        pending[url].set_exception(e)
+                continue
+
+            refreshed = {
+                item["original"]: item["refreshed"]
+                for item in data.get("refreshed_urls", [])
+            }
+            self.refreshed += len(refreshed)
+            for url in batch:
+                if not pending[url].done():
+                    pending[url].set_result(refreshed.get(url, url))
+
+    def stats(self) -> dict[str, int]:
+        """获取刷新统计"""
+        return {
+            "pending": len(self._pending),
+            "requests": self.requests,
+            "refreshed": self.refreshed,
+        }
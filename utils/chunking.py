@@ -0,0 +1,203 @@
+"""
+分卷存储
+超过上传上限的文件拆分为多个分卷，分别上传到独立的仓库消息
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+
+import discord
+
+from utils.relay import RelayedFile
+
+# 单条仓库消息内容的长度上限
+MAX_CONTENT_LENGTH = 2000
+
+# 未配置分卷大小且无法读取服务器上传上限时使用的默认值（Discord 默认 10 MiB）
+DEFAULT_PART_SIZE = 10 * 1024 * 1024
+
+
+def part_filename(filename: str, index: int) -> str:
+    """分卷文件名（7-Zip 风格：name.001、name.002 ...）"""
+    return f"{filename}.{index + 1:03d}"
+
+
+def get_part_size(channel: discord.TextChannel, configured: int) -> int:
+    """
+    获取分卷大小
+
+    Args:
+        channel: 仓库频道
+        configured: 配置的分卷大小，0 表示使用服务器上传上限
+    """
+    if configured > 0:
+        return configured
+    guild = getattr(channel, "guild", None)
+    return guild.filesize_limit if guild is not None else DEFAULT_PART_SIZE
+
+
+def plan_upload(
+    relayed: list[RelayedFile], limit: int, reserved: int = 0
+) -> tuple[list[RelayedFile], list[RelayedFile]]:
+    """
+    决定哪些文件直接作为附件上传、哪些需要分卷
+
+    单个文件超过上限的分卷；其余文件总大小仍超过上限时，从最大的文件开始分卷
+
+    Args:
+        relayed: 待上传的文件
+        limit: 单条消息的上传上限
+        reserved: 仓库消息中已保留的附件总大小
+
+    Returns:
+        (直接上传的文件, 需要分卷的文件)，各自保持原有顺序
+    """
+    chunked = {id(f) for f in relayed if f.size > limit}
+    inline_total = reserved + sum(f.size for f in relayed if id(f) not in chunked)
+    for f in sorted(relayed, key=lambda f: f.size, reverse=True):
+        if inline_total <= limit:
+            break
+        if id(f) not in chunked:
+            chunked.add(id(f))
+            inline_total -= f.size
+
+    return (
+        [f for f in relayed if id(f) not in chunked],
+        [f for f in relayed if id(f) in chunked],
+    )
+
+
+def _copy_range(fd: int, offset: int, length: int):
+    """将文件的一段复制到新的临时文件（在线程池中执行，使用 pread 不影响原文件指针）"""
+    part = tempfile.TemporaryFile()
+    remaining = length
+    while remaining > 0:
+        data = os.pread(fd, min(remaining, 1024 * 1024), offset + length - remaining)
+        if not data:
+            break
+        part.write(data)
+        remaining -= len(data)
+    part.seek(0)
+    return part
+
+
+async def upload_parts(
+    bot: discord.Client,
+    channel: discord.TextChannel,
+    relayed: RelayedFile,
+    part_size: int,
+) -> list[discord.Message]:
+    """
+    将文件拆分为分卷并发上传，每个分卷一条仓库消息
+
+    任一分卷失败时删除已上传的分卷并抛出异常
+
+    Returns:
+        按顺序排列的分卷消息
+    """
+    # 内存中的文件先落盘，才能按区间并发读取；落盘后归还占用的内存预算
+    if hasattr(relayed.fp, "rollover"):
+        relayed.fp.rollover()
+        bot.attachment_relay.budget.release(relayed.reserved)
+        relayed.reserved = 0
+    fd = relayed.fp.fileno()
+    total = max(1, -(-relayed.size // part_size))
+
+    async def _send_part(index: int) -> discord.Message:
+        offset = index * part_size
+        length = min(part_size, relayed.size - offset)
+        content = json.dumps(
+            {"part": {"sha256": relayed.sha256, "index": index, "total": total}},
+            separators=(",", ":"),
+        )
+
+        async def _send() -> discord.Message:
+            # 轮到写入队列执行时才复制分卷，同一时间落盘的分卷数不超过队列的工作协程数
+            part_fp = await asyncio.to_thread(_copy_range, fd, offset, length)
+            try:
+                return await channel.send(
+                    content=content,
+                    file=discord.File(part_fp, filename=part_filename(relayed.filename, index)),
+                )
+            finally:
+                part_fp.close()
+
+        return await bot.write_queue.run(("send", channel.id), _send)
+
+    results = await asyncio.gather(
+        *[_send_part(index) for index in range(total)], return_exceptions=True
+    )
+    messages = [r for r in results if isinstance(r, discord.Message)]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        await delete_parts(channel, [m.id for m in messages])
+        raise errors[0]
+    return messages
+
+
+async def upload_chunked(
+    bot: discord.Client,
+    channel: discord.TextChannel,
+    files: list[RelayedFile],
+    part_size: int,
+) -> list[list[discord.Message]]:
+    """
+    并发上传多个需要分卷的文件
+
+    任一文件失败时删除所有已上传的分卷并抛出异常
+
+    Returns:
+        与 files 顺序一致的分卷消息列表
+    """
+    results = await asyncio.gather(
+        *[upload_parts(bot, channel, f, part_size) for f in files], return_exceptions=True
+    )
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        uploaded = [m.id for r in results if isinstance(r, list) for m in r]
+        await delete_parts(channel, uploaded)
+        raise errors[0]
+    return results
+
+
+def build_manifest(
+    relayed: list[RelayedFile],
+    chunked: list[RelayedFile],
+    parts: list[list[discord.Message]],
+) -> list[dict]:
+    """
+    生成文件清单，分卷文件的条目附带按顺序排列的分卷消息 ID
+
+    Args:
+        relayed: 所有文件（清单顺序）
+        chunked: 其中需要分卷的文件
+        parts: 与 chunked 顺序一致的分卷消息列表
+    """
+    part_ids = {id(f): [m.id for m in messages] for f, messages in zip(chunked, parts)}
+    manifest = []
+    for f in relayed:
+        entry = f.manifest_entry()
+        if id(f) in part_ids:
+            entry["parts"] = part_ids[id(f)]
+        manifest.append(entry)
+    return manifest
+
+
+async def delete_parts(channel: discord.TextChannel, part_ids: list[int]) -> None:
+    """删除分卷消息（已不存在的忽略）"""
+
+    async def _delete(part_id: int):
+        try:
+            await channel.get_partial_message(part_id).delete()
+        except discord.NotFound:
+            pass
+
+    await asyncio.gather(*[_delete(part_id) for part_id in part_ids], return_exceptions=True)
+
+
+def check_content_length(content: str) -> None:
+    """检查仓库消息内容长度，分卷过多导致元数据超长时抛出异常"""
+    if len(content) > MAX_CONTENT_LENGTH:
+        raise ValueError("文件分卷数量过多，元数据超出消息长度限制，请减小文件体积")
@@ -0,0 +1,102 @@
+"""
+斜杠命令同步
+对命令树的序列化结果计算哈希，与上次同步的状态比较，只有变化时才调用同步接口
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import discord
+from discord import app_commands
+
+
+def scope_key(guild: discord.abc.Snowflake | None) -> str:
+    """同步范围的状态键（全局或指定服务器）"""
+    return "global" if guild is None else f"guild:{guild.id}"
+
+
+def tree_payload(
+    tree: app_commands.CommandTree, guild: discord.abc.Snowflake | None = None
+) -> list[dict]:
+    """序列化命令树中指定范围的命令（与同步接口提交的内容一致）"""
+    payload = []
+    for command in tree.get_commands(guild=guild):
+        try:
+            payload.append(command.to_dict(tree))
+        except TypeError:
+            # 旧版本 discord.py 的 to_dict 不接收 tree 参数
+            payload.append(command.to_dict())
+    return sorted(payload, key=lambda item: (item.get("type", 1), item["name"]))
+
+
+def payload_hash(payload: list[dict]) -> str:
+    """计算命令序列化结果的稳定哈希"""
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def load_state(path: str) -> dict[str, str]:
+    """读取上次同步的状态（范围 → 哈希），文件不存在或损坏时返回空"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def save_state(path: str, state: dict[str, str]) -> None:
+    """保存同步状态（先写同目录的临时文件再替换，读取方不会读到写了一半的文件）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=".command_sync.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+async def sync_if_changed(
+    tree: app_commands.CommandTree,
+    state_path: str,
+    guild: discord.abc.Snowflake | None = None,
+    force: bool = False,
+) -> bool:
+    """
+    命令树有变化时才同步
+
+    Args:
+        tree: 命令树
+        state_path: 同步状态文件路径
+        guild: 同步到指定服务器（测试用），None 表示全局同步
+        force: 忽略状态强制同步
+
+    Returns:
+        是否调用了同步接口
+    """
+    key = scope_key(guild)
+    digest = payload_hash(tree_payload(tree, guild))
+    state = load_state(state_path)
+    if not force and state.get(key) == digest:
+        return False
+
+    await tree.sync(guild=guild)
+    state[key] = digest
+    save_state(state_path, state)
+    return True
+
+
+def mark_cleared(state_path: str, guild: discord.abc.Snowflake | None = None) -> None:
+    """记录某个范围的命令已被清空，下次启动时 Bot 会重新同步"""
+    state = load_state(state_path)
+    state[scope_key(guild)] = payload_hash([])
+    save_state(state_path, state)
@@ -0,0 +1,45 @@
+"""
+按钮 custom_id 编解码
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ButtonId:
+    """
+    作品按钮的 custom_id
+
+    格式:
+        v1: prefix:action:warehouse_id:uploader_id（旧按钮，没有分片）
+        v2: prefix:action:warehouse_id:uploader_id:shard
+    """
+
+    prefix: str
+    action: str
+    warehouse_id: int
+    uploader_id: int
+    shard: int = 0
+    version: int = 2
+
+    def encode(self) -> str:
+        """编码为 custom_id（总是使用最新格式）"""
+        return f"{self.prefix}:{self.action}:{self.warehouse_id}:{self.uploader_id}:{self.shard}"
+
+    @classmethod
+    def decode(cls, custom_id: str) -> "ButtonId | None":
+        """解析 custom_id，格式不正确时返回 None"""
+        parts = custom_id.split(":")
+        if len(parts) not in (4, 5):
+            return None
+        try:
+            return cls(
+                prefix=parts[0],
+                action=parts[1],
+                warehouse_id=int(parts[2]),
+                uploader_id=int(parts[3]),
+                shard=int(parts[4]) if len(parts) == 5 else 0,
+                version=len(parts) - 3,
+            )
+        except ValueError:
+            return None
@@ -0,0 +1,204 @@
+"""
+交互应答期限
+Discord 要求在交互创建后 3 秒内首次应答，否则用户看到「交互失败」
+
+- 按交互创建时间（雪花 ID 中的时间戳）计时，而不是从处理函数开始计时
+- 处理函数来得及时直接内联回复；临近期限仍未应答时由看门狗自动延迟应答（defer），之后的回复改走后续消息
+- 提前量随回调往返耗时自适应：接口变慢（如被限速）时更早延迟应答
+- 延迟应答后无法再弹出弹窗，调用方需准备退路
+"""
+
+import asyncio
+import time
+
+import discord
+
+# Discord 的首次应答期限（秒）
+INTERACTION_DEADLINE = 3.0
+# 往返耗时的平滑系数
+_EWMA_ALPHA = 0.2
+
+
+class ResponseDeadline:
+    """
+    单次交互的应答期限（由 DeadlineManager.watch 创建）
+
+    处理函数通过 send / send_modal / defer 应答，与看门狗的自动延迟应答互斥
+    """
+
+    def __init__(self, manager: "DeadlineManager", interaction: discord.Interaction, ephemeral: bool):
+        self._manager = manager
+        self.interaction = interaction
+        self.ephemeral = ephemeral
+        self.auto_deferred = False
+        self.replied = False  # 处理函数是否已发出回复（不含看门狗的延迟应答）
+        self._lock = asyncio.Lock()
+        self._started = time.monotonic()
+        # 收到交互时已经过去的时间（本机时钟偏差可能为负，按 0 计）
+        created_at = interaction.created_at
+        self._age = max(0.0, (discord.utils.utcnow() - created_at).total_seconds())
+        self._watchdog: asyncio.Task | None = None
+        self._expired: discord.NotFound | None = None  # 已超时时的错误，之后不再尝试应答
+
+    def elapsed(self) -> float:
+        """交互创建至今的秒数"""
+        return self._age + time.monotonic() - self._started
+
+    def remaining(self) -> float:
+        """距离应答期限的秒数"""
+        return INTERACTION_DEADLINE - self.elapsed()
+
+    @property
+    def responded(self) -> bool:
+        """是否已首次应答"""
+        return self.interaction.response.is_done()
+
+    @property
+    def pending(self) -> bool:
+        """用户是否仍在等待回复（尚未应答，或自动延迟应答后还没有回复；已超时的不算）"""
+        if self._expired is not None:
+            return False
+        return not self.responded or (self.auto_deferred and not self.replied)
+
+    async def _first_response(self, call, inline: bool) -> None:
+        """发出首次应答并记录耗时"""
+        if self._expired is not None:
+            raise self._expired
+        sent = time.monotonic()
+        try:
+            await call()
+        except discord.NotFound as e:
+            if e.code == 10062:  # Unknown interaction：已超过期限
+                self._expired = e
+                self._manager.missed += 1
+            raise
+        finally:
+            self._manager.observe(time.monotonic() - sent)
+        self._manager.record(self.elapsed(), inline)
+
+    async def send(self, **kwargs) -> None:
+        """回复消息：尚未应答时内联回复，已延迟应答时发送后续消息"""
+        kwargs.setdefault("ephemeral", self.ephemeral)
+        async with self._lock:
+            self.replied = True
+            if self.responded:
+                await self.interaction.followup.send(**kwargs)
+            else:
+                await self._first_response(
+                    lambda: self.interaction.response.send_message(**kwargs), inline=True
+                )
+
+    async def send_modal(self, modal: discord.ui.Modal) -> bool:
+        """
+        弹出弹窗
+
+        Returns:
+            是否已弹出（已延迟应答时返回 False，由调用方改用退路）
+        """
+        async with self._lock:
+            if self.responded:
+                self._manager.modal_fallbacks += 1
+                return False
+            self.replied = True
+            await self._first_response(lambda: self.interaction.response.send_modal(modal), inline=True)
+            return True
+
+    async def defer(self, thinking: bool = False) -> None:
+        """主动延迟应答（已应答时忽略）"""
+        async with self._lock:
+            if self.responded:
+                return
+            self.replied = True
+            await self._first_response(
+                lambda: self.interaction.response.defer(ephemeral=self.ephemeral, thinking=thinking),
+                inline=False,
+            )
+
+    async def _watch(self) -> None:
+        """临近期限仍未应答时自动延迟应答（显示「正在思考」，随后的回复会替换它）"""
+        await asyncio.sleep(max(0.0, self.remaining() - self._manager.margin()))
+        async with self._lock:
+            if self.responded:
+                return
+            self.auto_deferred = True
+            self._manager.auto_deferred += 1
+            try:
+                await self._first_response(
+                    lambda: self.interaction.response.defer(ephemeral=self.ephemeral, thinking=True),
+                    inline=False,
+                )
+            except discord.HTTPException as e:
+                print(f"⚠️ 自动延迟应答失败: {e}")
+
+    async def __aenter__(self) -> "ResponseDeadline":
+        self._manager.watched += 1
+        self._watchdog = asyncio.create_task(self._watch())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._watchdog is None:
+            return
+        if self.auto_deferred:
+            # 延迟应答已发出，等它完成，避免取消到一半
+            await asyncio.gather(self._watchdog, return_exceptions=True)
+        else:
+            self._watchdog.cancel()
+
+
+class DeadlineManager:
+    """
+    交互应答期限管理
+
+    - 看门狗在 期限 - 提前量 时自动延迟应答，提前量取 min_margin 与两倍回调往返耗时（平滑后）中的较大者
+    - 首次应答晚于 near_miss 秒记为险些超时，回调返回 Unknown interaction 记为超时
+    """
+
+    def __init__(self, min_margin: float = 1.0, near_miss: float = 2.5):
+        self.min_margin = min_margin
+        self.near_miss = near_miss
+        self.ack_latency = 0.0  # 首次应答回调往返耗时（平滑后，秒）
+        self.watched = 0
+        self.inline = 0
+        self.deferred = 0
+        self.auto_deferred = 0
+        self.near_misses = 0
+        self.missed = 0
+        self.modal_fallbacks = 0
+
+    def watch(self, interaction: discord.Interaction, ephemeral: bool = True) -> ResponseDeadline:
+        """为交互创建应答期限（以 async with 使用）"""
+        return ResponseDeadline(self, interaction, ephemeral)
+
+    def margin(self) -> float:
+        """当前的自动延迟应答提前量（秒）"""
+        return min(INTERACTION_DEADLINE, max(self.min_margin, 2 * self.ack_latency))
+
+    def observe(self, latency: float) -> None:
+        """记录一次首次应答回调的往返耗时（失败的回调同样计入）"""
+        if self.ack_latency == 0.0:
+            self.ack_latency = latency
+        else:
+            self.ack_latency += _EWMA_ALPHA * (latency - self.ack_latency)
+
+    def record(self, elapsed: float, inline: bool) -> None:
+        """记录一次成功的首次应答"""
+        if inline:
+            self.inline += 1
+        else:
+            self.deferred += 1
+        if elapsed >= self.near_miss:
+            self.near_misses += 1
+
+    def stats(self) -> dict[str, float]:
+        """获取统计（供指标端点使用）"""
+        return {
+            "watched": self.watched,
+            "inline": self.inline,
+            "deferred": self.deferred,
+            "auto_deferred": self.auto_deferred,
+            "near_miss": self.near_misses,
+            "missed": self.missed,
+            "modal_fallback": self.modal_fallbacks,
+            "ack_latency_ms": round(self.ack_latency * 1000, 1),
+            "margin_ms": round(self.margin() * 1000, 1),
+        }
@@ -5,6 +5,7 @@ Embed 构建器
 
 import discord
 from utils.metadata import ResourceMetadata
+from utils.warehouse import AttachmentInfo
 
 
 # 主题颜色
@@ -39,6 +40,7 @@ def get_dl_req_style(dl_req_type: str) -> dict:
 def build_publish_embed(
     metadata: ResourceMetadata,
     warehouse_message_id: int,
+    file_count: int = 1,
 ) -> discord.Embed:
     """
     构建发布作品的 Embed（参考截图风格）
@@ -72,15 +74,27 @@ def build_publish_embed(
         color=Colors.PRIMARY,
     )
 
+    # 添加文件数量信息
+    if file_count > 1:
+        embed.add_field(name="📎 文件数量", value=f"{file_count} 个", inline=True)
+
     # 设置 Footer（使用引用样式）
     embed.set_footer(text=f"作品ID: {warehouse_message_id}")
 
     return embed
 
 
+def _format_expiry(expires_at: float | None) -> str:
+    """格式化链接有效期提示"""
+    if expires_at is None:
+        return "⏰ 链接有效期约 24 小时"
+    return f"⏰ 链接将于 <t:{int(expires_at)}:R> 失效"
+
+
 def build_download_embed(
     title: str,
     attachment_url: str,
+    expires_at: float | None = None,
 ) -> discord.Embed:
     """
     构建下载链接的 Embed
@@ -90,7 +104,7 @@ def build_download_embed(
         description=(
             f"**{title}**\n\n"
             f"🔗 [点击下载]({attachment_url})\n\n"
-            f"⏰ 链接有效期约 24 小时"
+            f"{_format_expiry(expires_at)}"
         ),
         color=Colors.DOWNLOAD,
     )
@@ -98,6 +112,58 @@ def build_download_embed(
     return embed
 
 
+# Embed 描述的长度上限（Discord 限制为 4096，预留标题和提示的空间）
+DESCRIPTION_LIMIT = 3800
+
+
+def build_files_download_embeds(
+    title: str,
+    attachments: list[AttachmentInfo],
+) -> list[discord.Embed]:
+    """
+    构建多文件下载链接的 Embed 列表
+
+    单文件时与 build_download_embed 相同；分卷较多时按描述长度拆分为多页
+    """
+    expiries = [att.expires_at for att in attachments if att.expires_at is not None]
+    expires_at = min(expiries) if expiries else None
+
+    if len(attachments) == 1:
+        return [build_download_embed(title, attachments[0].url, expires_at)]
+
+    tail = _format_expiry(expires_at)
+    if any(att.part_of for att in attachments):
+        tail = (
+            "🧩 分卷文件请全部下载后按顺序合并：\n"
+            "> 用 7-Zip 打开 `.001` 文件，或执行 `cat 文件名.0* > 文件名`\n\n"
+            + tail
+        )
+
+    # 按长度上限分页，分卷链接保持原有顺序
+    pages: list[list[str]] = [[]]
+    length = 0
+    for att in attachments:
+        line = f"📎 [{att.filename}]({att.url})"
+        if pages[-1] and length + len(line) + 1 > DESCRIPTION_LIMIT - len(title) - len(tail):
+            pages.append([])
+            length = 0
+        pages[-1].append(line)
+        length += len(line) + 1
+
+    embeds = []
+    for index, lines in enumerate(pages):
+        heading = f"**{title}**" if len(pages) == 1 else f"**{title}**（{index + 1}/{len(pages)}）"
+        links = "\n".join(lines)
+        embed = discord.Embed(
+            title="📥 下载就绪",
+            description=f"{heading}\n\n{links}\n\n{tail}",
+            color=Colors.DOWNLOAD,
+        )
+        embed.set_footer(text="请遵守版权规则")
+        embeds.append(embed)
+    return embeds
+
+
 def build_error_embed(message: str) -> discord.Embed:
     """
     构建错误提示 Embed
@@ -118,3 +184,14 @@ def build_success_embed(message: str) -> discord.Embed:
         description=message,
         color=Colors.SUCCESS,
     )
+
+
+def build_progress_embed(message: str) -> discord.Embed:
+    """
+    构建进度提示 Embed
+    """
+    return discord.Embed(
+        title="⏳ 处理中",
+        description=message,
+        color=Colors.INFO,
+    )
@@ -0,0 +1,161 @@
+"""
+HTTP 交互入口
+以 Interactions Endpoint URL 方式接收 Discord 交互，校验 Ed25519 签名后交给与网关模式相同的处理流程
+多个工作进程可以在负载均衡后面同时提供服务
+"""
+
+import asyncio
+import json
+import time
+
+import discord
+from aiohttp import web
+
+try:
+    from nacl.exceptions import BadSignatureError
+    from nacl.signing import VerifyKey
+except ImportError:  # PyNaCl 为可选依赖，仅 HTTP 模式需要
+    VerifyKey = None
+    BadSignatureError = Exception
+
+# 交互类型
+PING = 1
+
+# 签名时间戳允许的最大偏差（秒），超出视为重放
+MAX_CLOCK_SKEW = 300
+
+
+class SignatureVerifier:
+    """Discord 交互请求签名校验"""
+
+    def __init__(self, public_key: str):
+        if VerifyKey is None:
+            raise RuntimeError("HTTP 交互模式需要安装 PyNaCl: pip install PyNaCl")
+        self._key = VerifyKey(bytes.fromhex(public_key))
+
+    def verify(self, signature: str, timestamp: str, body: bytes) -> bool:
+        """校验签名（签名内容为 时间戳 + 请求体）"""
+        try:
+            if abs(time.time() - int(timestamp)) > MAX_CLOCK_SKEW:
+                return False
+            self._key.verify(timestamp.encode() + body, bytes.fromhex(signature))
+        except (BadSignatureError, ValueError):
+            return False
+        return True
+
+
+def dispatch_interaction(bot: discord.Client, payload: dict) -> None:
+    """
+    将交互载荷交给 discord.py 的分发流程
+
+    与网关收到 INTERACTION_CREATE 时相同：斜杠命令交给命令树、组件和弹窗交给视图，
+    最后触发 on_interaction 事件
+    """
+    bot._connection.parse_interaction_create(payload)
+
+
+class InteractionServer:
+    """
+    HTTP 交互服务器
+
+    - 校验签名，拒绝无效请求
+    - PING 直接回复 PONG
+    - 其余交互分发给 Bot，等待处理流程通过回调接口应答后返回 202
+    """
+
+    def __init__(
+        self,
+        bot: discord.Client,
+        public_key: str,
+        host: str,
+        port: int,
+        path: str = "/interactions",
+        ack_timeout: float = 2.5,
+    ):
+        self.bot = bot
+        self.verifier = SignatureVerifier(public_key)
+        self.host = host
+        self.port = port
+        self.path = path
+        self.ack_timeout = ack_timeout
+        self._runner: web.AppRunner | None = None
+        self._pending: dict[int, asyncio.Future[discord.Interaction]] = {}
+
+        self.received = 0
+        self.rejected = 0
+        self.unacknowledged = 0
+
+    async def start(self) -> None:
+        """启动 HTTP 服务（reuse_port 允许多个工作进程监听同一端口）"""
+        self.bot.add_listener(self._on_interaction, "on_interaction")
+
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port, reuse_port=True)
+        await site.start()
+        print(f"✅ HTTP 交互入口已启动: http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self) -> None:
+        """停止 HTTP 服务"""
+        self.bot.remove_listener(self._on_interaction, "on_interaction")
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _on_interaction(self, interaction: discord.Interaction) -> None:
+        """取回分发流程创建的 Interaction 对象"""
+        future = self._pending.get(interaction.id)
+        if future is not None and not future.done():
+            future.set_result(interaction)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """处理一次交互请求"""
+        body = await request.read()
+        signature = request.headers.get("X-Signature-Ed25519", "")
+        timestamp = request.headers.get("X-Signature-Timestamp", "")
+        if not self.verifier.verify(signature, timestamp, body):
+            self.rejected += 1
+            return web.Response(status=401, text="invalid request signature")
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return web.Response(status=400, text="invalid payload")
+        if payload.get("type") == PING:
+            return web.json_response({"type": PING})
+
+        self.received += 1
+        interaction_id = int(payload["id"])
+        future = asyncio.get_running_loop().create_future()
+        self._pending[interaction_id] = future
+        try:
+            dispatch_interaction(self.bot, payload)
+            await self._wait_acknowledged(future)
+        finally:
+            self._pending.pop(interaction_id, None)
+        return web.Response(status=202)
+
+    async def _wait_acknowledged(self, future: asyncio.Future) -> None:
+        """等待处理流程应答交互（超时后直接返回，由处理流程自行负责）"""
+        deadline = time.monotonic() + self.ack_timeout
+        try:
+            interaction = await asyncio.wait_for(future, timeout=self.ack_timeout)
+        except asyncio.TimeoutError:
+            self.unacknowledged += 1
+            return
+
+        while not interaction.response.is_done():
+            if time.monotonic() >= deadline:
+                self.unacknowledged += 1
+                return
+            await asyncio.sleep(0.02)
+
+    def stats(self) -> dict[str, int]:
+        """获取交互入口统计"""
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "unacknowledged": self.unacknowledged,
+            "pending": len(self._pending),
+        }
@@ -5,7 +5,7 @@
 
 import json
 from typing import Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field, fields
 
 
 @dataclass
@@ -16,16 +16,19 @@ class ResourceMetadata:
     title: str  # 作品标题
     rules: dict[str, bool]  # 规则：{"repost": bool, "modify": bool}
     req: dict[str, Any]  # 下载要求：{"type": str, "code": str | None}
+    # 文件清单（与仓库消息附件顺序一致）：[{"name": str, "size": int, "sha256": str}]
+    files: list[dict[str, Any]] = field(default_factory=list)
 
     def to_json(self) -> str:
         """序列化为 JSON 字符串"""
-        return json.dumps(asdict(self), ensure_ascii=False)
+        return json.dumps(asdict(self), ensure_ascii=False, separators=(",", ":"))
 
     @classmethod
     def from_json(cls, json_str: str) -> "ResourceMetadata":
-        """从 JSON 字符串反序列化"""
+        """从 JSON 字符串反序列化（忽略未知字段）"""
         data = json.loads(json_str)
-        return cls(**data)
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
 
 
 def create_metadata(
@@ -35,6 +38,7 @@ def create_metadata(
     rule_modify: bool,
     dl_req_type: str,
     passcode: str | None = None,
+    files: list[dict[str, Any]] | None = None,
 ) -> ResourceMetadata:
     """
     创建资源元数据
@@ -46,6 +50,7 @@ def create_metadata(
         rule_modify: 是否允许二改
         dl_req_type: 下载要求类型 ("自由下载" | "互动" | "提取码")
         passcode: 提取码（仅当 dl_req_type 为 "提取码" 时需要）
+        files: 文件清单（文件名、大小、SHA-256）
 
     Returns:
         ResourceMetadata 实例
@@ -55,6 +60,7 @@ def create_metadata(
         title=title,
         rules={"repost": rule_repost, "modify": rule_modify},
         req={"type": dl_req_type, "code": passcode},
+        files=files or [],
     )
 
 
@@ -70,7 +76,7 @@ def parse_metadata(json_str: str) -> ResourceMetadata | None:
     """
     try:
         return ResourceMetadata.from_json(json_str)
-    except (json.JSONDecodeError, TypeError, KeyError):
+    except (json.JSONDecodeError, TypeError, KeyError, AttributeError):
         return None
 
 
@@ -0,0 +1,271 @@
+"""
+运行指标
+以 Prometheus 文本格式在本地 HTTP 端点输出命令 / 按钮耗时、REST 调用、缓存和队列统计
+不依赖 prometheus_client，只实现本项目用到的计数器、直方图和采集函数
+"""
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import logging
+import math
+import time
+from typing import AsyncIterator, Callable
+
+import discord
+from aiohttp import web
+from discord import app_commands
+from discord.webhook.async_ import async_context
+
+# 交互耗时直方图的桶（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 单次交互 REST 调用次数直方图的桶
+REST_CALL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+# 帖子 / 频道历史分页读取的路由
+HISTORY_ROUTE = "GET /channels/{channel_id}/messages"
+
+
+def _escape(value: str) -> str:
+    """转义标签值中的反斜杠、双引号和换行"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+class Counter:
+    """带标签的计数器"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(dict(key))} {value}")
+        return lines
+
+
+class Histogram:
+    """带标签的直方图（固定桶）"""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...]):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # 标签 → (各桶计数, 总和, 总数)
+        self._values: dict[tuple, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self._values[key] = (counts, total + value, count + 1)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in self._values.items():
+            labels = dict(key)
+            for bound, bucket_count in zip(self.buckets, counts):
+                bucket_labels = _format_labels({**labels, "le": str(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class _RateLimitLogHandler(logging.Handler):
+    """统计 discord.py 记录的 429 限速日志"""
+
+    def __init__(self, counter: Counter):
+        super().__init__(level=logging.WARNING)
+        self.counter = counter
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if "429" in message or "rate limited" in message:
+            scope = "global" if "global" in message.lower() else "route"
+            self.counter.inc(scope=scope)
+
+
+class BotMetrics:
+    """
+    Bot 运行指标
+
+    - 交互耗时：斜杠命令、按钮和发布流程，按名称和结果分类
+    - REST 调用：按路由计数，并统计每次交互发起的调用次数
+    - 429 限速、帖子历史分页读取次数
+    - 网关延迟、事件循环延迟，以及各组件 stats() 的当前值
+    """
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.interaction_seconds = Histogram(
+            "jiuwo_interaction_seconds", "交互处理耗时（秒）", LATENCY_BUCKETS
+        )
+        self.interaction_rest_calls = Histogram(
+            "jiuwo_interaction_rest_calls", "单次交互发起的 REST 调用次数", REST_CALL_BUCKETS
+        )
+        self.rest_requests = Counter("jiuwo_rest_requests_total", "REST 调用次数（按路由）")
+        self.rest_rate_limited = Counter("jiuwo_rest_rate_limited_total", "收到 429 限速的次数")
+        self.history_pages = Counter("jiuwo_history_pages_total", "频道 / 帖子历史分页读取次数")
+        self.loop_lag_seconds = Histogram(
+            "jiuwo_event_loop_lag_seconds", "事件循环调度延迟（秒）", LATENCY_BUCKETS
+        )
+        self._collectors: list[tuple[str, str, Callable[[], dict[str, float]]]] = []
+        self._current_calls: contextvars.ContextVar[collections.Counter[str] | None] = (
+            contextvars.ContextVar("jiuwo_rest_calls", default=None)
+        )
+        self._lag_task: asyncio.Task | None = None
+        self._runner: web.AppRunner | None = None
+        self.last_loop_lag = 0.0
+
+    def add_collector(self, name: str, help_text: str, fn: Callable[[], dict[str, float]]) -> None:
+        """注册采集函数，输出时调用一次，结果以 stat 标签输出为 gauge"""
+        self._collectors.append((name, help_text, fn))
+
+    def _count(self, route) -> None:
+        """记录一次 REST 调用（按路由，并计入当前交互）"""
+        key = f"{route.method} {route.path}"
+        self.rest_requests.inc(route=key)
+        if key == HISTORY_ROUTE:
+            self.history_pages.inc()
+        calls = self._current_calls.get()
+        if calls is not None:
+            calls[key] += 1
+
+    def install(self) -> None:
+        """
+        挂接 REST 请求计数和 429 日志统计（只需调用一次）
+
+        交互回调和后续消息走 Webhook 适配器，不经过 bot.http，需要单独挂接
+        """
+        http = self.bot.http
+        original_request = http.request
+
+        async def request(route, **kwargs):
+            self._count(route)
+            return await original_request(route, **kwargs)
+
+        http.request = request
+
+        adapter = async_context.get()
+        original_webhook_request = adapter.request
+
+        async def webhook_request(route, session, **kwargs):
+            self._count(route)
+            return await original_webhook_request(route, session, **kwargs)
+
+        adapter.request = webhook_request
+        logging.getLogger("discord.http").addHandler(_RateLimitLogHandler(self.rest_rate_limited))
+
+    @contextlib.asynccontextmanager
+    async def track(self, kind: str, name: str) -> AsyncIterator[collections.Counter[str]]:
+        """
+        记录一次交互处理的耗时和 REST 调用次数
+
+        用法:
+            async with bot.metrics.track("button", "download") as calls:
+                ...
+            # calls: 本次交互按路由统计的 REST 调用次数
+        """
+        calls: collections.Counter[str] = collections.Counter()
+        token = self._current_calls.set(calls)
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield calls
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self._current_calls.reset(token)
+            self.interaction_seconds.observe(
+                time.perf_counter() - started, kind=kind, name=name, status=status
+            )
+            self.interaction_rest_calls.observe(sum(calls.values()), kind=kind, name=name)
+
+    async def _measure_loop_lag(self, interval: float = 0.5) -> None:
+        """定时休眠，实际唤醒时间与预期的差值即事件循环延迟"""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.last_loop_lag = max(0.0, time.perf_counter() - started - interval)
+            self.loop_lag_seconds.observe(self.last_loop_lag)
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        lines: list[str] = []
+        for metric in (
+            self.interaction_seconds,
+            self.interaction_rest_calls,
+            self.rest_requests,
+            self.rest_rate_limited,
+            self.history_pages,
+            self.loop_lag_seconds,
+        ):
+            lines.extend(metric.render())
+
+        lines.append("# HELP jiuwo_gateway_latency_seconds 网关心跳延迟（秒）")
+        lines.append("# TYPE jiuwo_gateway_latency_seconds gauge")
+        latency = self.bot.latency
+        lines.append(f"jiuwo_gateway_latency_seconds {0.0 if math.isnan(latency) else latency}")
+
+        for name, help_text, fn in self._collectors:
+            try:
+                values = fn()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for stat, value in values.items():
+                lines.append(f"{name}{_format_labels({'stat': stat})} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self, host: str, port: int) -> None:
+        """启动事件循环延迟测量；端口大于 0 时启动 /metrics 端点"""
+        self._lag_task = asyncio.create_task(self._measure_loop_lag())
+        if port <= 0:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        print(f"✅ 指标端点已启动: http://{host}:{port}/metrics")
+
+    async def stop(self) -> None:
+        """停止指标端点和延迟测量"""
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """记录每个斜杠命令耗时和追踪的命令树（使用 Bot 的 instrument 钩子）"""
+
+    async def _call(self, interaction: discord.Interaction) -> None:
+        instrument = getattr(self.client, "instrument", None)
+        if instrument is None:
+            return await super()._call(interaction)
+        name = (interaction.data or {}).get("name", "unknown")
+        async with instrument("command", name, interaction):
+            await super()._call(interaction)
@@ -0,0 +1,149 @@
+"""
+帖子参与者索引
+由消息 / 回应事件实时维护，用于「互动」下载门槛的判断
+"""
+
+from collections import OrderedDict
+
+import discord
+
+from utils.cache import SingleFlight
+from utils.tracing import span
+
+
+class _ThreadParticipants:
+    """单个帖子的参与者记录"""
+
+    __slots__ = ("repliers", "reactions", "ready", "last_message_id")
+
+    def __init__(self):
+        self.repliers: set[int] = set()  # 在帖内回复过的用户
+        self.reactions: dict[int, int] = {}  # 用户 → 对首楼的回应数量
+        self.ready = False  # 是否已完成历史回填
+        self.last_message_id = 0  # 已回溯到的最新消息 ID
+
+
+class ParticipantIndex:
+    """
+    帖子 ID → 参与者集合 的内存索引
+
+    - 首次检查某个帖子时回溯一次首楼回应和帖子历史（回填）
+    - 之后由 on_message / on_raw_reaction_add / on_raw_reaction_remove 增量维护
+    - 只跟踪被检查过的帖子，超过 max_threads 时淘汰最久未使用的帖子
+    - refresh_on_miss 为 True 时（收不到网关事件的 HTTP 模式），未命中的用户会触发一次增量回溯：
+      重新读取首楼回应，并只读取上次回溯之后的新消息
+    """
+
+    def __init__(self, max_threads: int, refresh_on_miss: bool = False):
+        self.max_threads = max_threads
+        self.refresh_on_miss = refresh_on_miss
+        self._threads: OrderedDict[int, _ThreadParticipants] = OrderedDict()
+        self._backfills: SingleFlight[int, None] = SingleFlight()
+        self._refreshes: SingleFlight[int, None] = SingleFlight()
+
+    def __len__(self) -> int:
+        return len(self._threads)
+
+    def record_message(self, thread_id: int, user_id: int) -> None:
+        """记录帖内回复"""
+        state = self._threads.get(thread_id)
+        if state is not None:
+            state.repliers.add(user_id)
+
+    def record_reaction_add(self, thread_id: int, user_id: int) -> None:
+        """记录对首楼的回应"""
+        state = self._threads.get(thread_id)
+        if state is not None:
+            state.reactions[user_id] = state.reactions.get(user_id, 0) + 1
+
+    def record_reaction_remove(self, thread_id: int, user_id: int) -> None:
+        """记录取消对首楼的回应"""
+        state = self._threads.get(thread_id)
+        if state is None:
+            return
+        count = state.reactions.get(user_id, 0) - 1
+        if count > 0:
+            state.reactions[user_id] = count
+        else:
+            state.reactions.pop(user_id, None)
+
+    def forget(self, thread_id: int) -> None:
+        """移除帖子的参与者记录"""
+        self._threads.pop(thread_id, None)
+
+    async def has_participated(self, thread: discord.Thread, user_id: int) -> bool:
+        """
+        检查用户是否对帖子有互动（回应首楼或在帖内回复）
+
+        Args:
+            thread: 帖子 Thread
+            user_id: 用户 ID
+
+        Returns:
+            是否有互动
+        """
+        state = self._threads.get(thread.id)
+        if state is None or not state.ready:
+            await self._backfills.do(thread.id, lambda: self._backfill(thread))
+            state = self._threads.get(thread.id)
+            if state is None:
+                return False
+        elif self.refresh_on_miss and not self._contains(state, user_id):
+            await self._refreshes.do(thread.id, lambda: self._refresh(thread, state))
+
+        self._threads.move_to_end(thread.id)
+        return self._contains(state, user_id)
+
+    @staticmethod
+    def _contains(state: _ThreadParticipants, user_id: int) -> bool:
+        return user_id in state.repliers or user_id in state.reactions
+
+    async def _read_reactions(self, thread: discord.Thread, cached: bool) -> dict[int, int] | None:
+        """读取首楼回应（论坛帖子的首楼消息 ID 与帖子 ID 相同），读取失败时返回 None"""
+        reactions: dict[int, int] = {}
+        try:
+            with span("participants.reactions"):
+                starter_message = (cached and thread.starter_message) or await thread.fetch_message(thread.id)
+                for reaction in starter_message.reactions:
+                    async for reactor in reaction.users():
+                        reactions[reactor.id] = reactions.get(reactor.id, 0) + 1
+        except discord.HTTPException:
+            return None
+        return reactions
+
+    async def _read_history(self, thread: discord.Thread, state: _ThreadParticipants) -> set[int]:
+        """读取 state.last_message_id 之后的帖内消息，返回回复者并推进 last_message_id"""
+        after = discord.Object(state.last_message_id) if state.last_message_id else None
+        repliers: set[int] = set()
+        last_message_id = state.last_message_id
+        with span("participants.history"):
+            async for message in thread.history(limit=None, after=after):
+                repliers.add(message.author.id)
+                last_message_id = max(last_message_id, message.id)
+        state.last_message_id = last_message_id
+        return repliers
+
+    async def _refresh(self, thread: discord.Thread, state: _ThreadParticipants) -> None:
+        """增量回溯：首楼回应整体替换（回应可能被取消），帖内回复只读新消息"""
+        reactions = await self._read_reactions(thread, cached=False)
+        if reactions is not None:
+            state.reactions = reactions
+        state.repliers |= await self._read_history(thread, state)
+
+    async def _backfill(self, thread: discord.Thread) -> None:
+        """回溯首楼回应和帖子历史，建立参与者记录"""
+        # 先登记帖子，回填期间到达的事件也会被记录
+        state = self._threads.get(thread.id)
+        if state is None:
+            state = _ThreadParticipants()
+            self._threads[thread.id] = state
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+
+        reactions = await self._read_reactions(thread, cached=True) or {}
+        repliers = await self._read_history(thread, state)
+
+        state.repliers |= repliers
+        for reactor_id, count in reactions.items():
+            state.reactions[reactor_id] = max(state.reactions.get(reactor_id, 0), count)
+        state.ready = True
@@ -0,0 +1,218 @@
+"""
+附件中转
+将附件流式下载到临时文件后再上传到仓库频道，避免整个文件驻留内存
+下载完成后计算 SHA-256，用于元数据文件清单和重复内容识别
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import io
+import resource
+import tempfile
+from typing import AsyncIterator, Protocol
+
+import aiohttp
+import discord
+
+from utils.tracing import span
+
+# 流式下载的分块大小
+CHUNK_SIZE = 64 * 1024
+
+
+def _sha256_file(fp: io.IOBase) -> str:
+    """计算文件内容的 SHA-256（在线程池中执行）"""
+    hasher = hashlib.sha256()
+    fp.seek(0)
+    while chunk := fp.read(1024 * 1024):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class RelaySource(Protocol):
+    """可中转的附件（discord.Attachment 或 AttachmentInfo）"""
+
+    filename: str
+    url: str
+    size: int
+
+
+class MemoryBudget:
+    """
+    全局内存预算
+
+    所有正在中转的文件共享同一预算，超出预算的文件直接写入磁盘
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+
+    def try_reserve(self, size: int) -> bool:
+        """尝试预留内存，预算不足返回 False"""
+        if self.used + size > self.limit:
+            return False
+        self.used += size
+        self.peak = max(self.peak, self.used)
+        return True
+
+    def release(self, size: int) -> None:
+        """归还预留的内存"""
+        self.used = max(0, self.used - size)
+
+
+class RelayedFile:
+    """已下载到临时文件的附件"""
+
+    def __init__(self, filename: str, fp: io.IOBase, size: int, reserved: int, sha256: str):
+        self.filename = filename
+        self.fp = fp
+        self.size = size
+        self.reserved = reserved  # 占用的内存预算，0 表示文件在磁盘上
+        self.sha256 = sha256
+        # discord.File 会把 fp.close 替换为空操作，先保存原来的 close，保证 release 时一定能关闭
+        self._close = fp.close
+
+    def manifest_entry(self) -> dict:
+        """生成元数据文件清单条目"""
+        return {"name": self.filename, "size": self.size, "sha256": self.sha256}
+
+    def to_file(self) -> discord.File:
+        """构建用于上传的 discord.File（不转移文件所有权）"""
+        self.fp.seek(0)
+        return discord.File(self.fp, filename=self.filename)
+
+    def close(self) -> None:
+        """关闭临时文件（不受 to_file 调用次数和 discord.File 是否关闭的影响）"""
+        self._close()
+
+
+class AttachmentRelay:
+    """
+    附件中转管线
+
+    - 单个文件不超过 spool_max_size 且全局预算充足时在内存中缓冲
+    - 否则直接流式写入磁盘临时文件
+    - 同一批附件并行下载，所有批次共享并发上限；任一文件失败时取消其余下载
+    - 记录中转文件数、落盘次数、预算峰值和进程 RSS 峰值
+    """
+
+    def __init__(
+        self,
+        spool_max_size: int,
+        memory_budget: int,
+        max_concurrency: int = 4,
+        file_timeout: float = 120,
+    ):
+        self.spool_max_size = spool_max_size
+        self.budget = MemoryBudget(memory_budget)
+        self.file_timeout = file_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: aiohttp.ClientSession | None = None
+
+        self.files_relayed = 0
+        self.bytes_relayed = 0
+        self.spilled_to_disk = 0
+
+    async def close(self) -> None:
+        """关闭 HTTP 会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def fetch(self, source: RelaySource) -> RelayedFile:
+        """流式下载单个附件到临时文件"""
+        reserved = 0
+        if source.size <= self.spool_max_size and self.budget.try_reserve(source.size):
+            reserved = source.size
+            fp = tempfile.SpooledTemporaryFile(max_size=self.spool_max_size)
+        else:
+            fp = tempfile.TemporaryFile()
+            self.spilled_to_disk += 1
+
+        try:
+            async with self._get_session().get(source.url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    if reserved:
+                        fp.write(chunk)
+                    else:
+                        # 磁盘写入放到线程池，避免阻塞事件循环
+                        await asyncio.to_thread(fp.write, chunk)
+            size = fp.tell()
+            # 哈希计算放到线程池，避免阻塞事件循环
+            sha256 = await asyncio.to_thread(_sha256_file, fp)
+        except BaseException:
+            fp.close()
+            self.budget.release(reserved)
+            raise
+
+        self.files_relayed += 1
+        self.bytes_relayed += size
+        return RelayedFile(source.filename, fp, size, reserved, sha256)
+
+    async def _fetch_bounded(self, source: RelaySource) -> RelayedFile:
+        """在全局并发上限和单文件超时内下载附件"""
+        async with self._semaphore:
+            try:
+                return await asyncio.wait_for(self.fetch(source), timeout=self.file_timeout)
+            except asyncio.TimeoutError:
+                raise RuntimeError(f"下载附件超时: {source.filename}") from None
+
+    async def fetch_all(self, sources: list[RelaySource]) -> list[RelayedFile]:
+        """
+        并行下载一组附件，保持原有顺序
+
+        任一文件失败时取消其余下载、清理已完成的临时文件并抛出该异常
+        """
+        tasks = [asyncio.create_task(self._fetch_bounded(source)) for source in sources]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, RelayedFile):
+                    self.release(result)
+            raise
+
+    def release(self, relayed: RelayedFile) -> None:
+        """关闭临时文件并归还内存预算"""
+        relayed.close()
+        self.budget.release(relayed.reserved)
+        relayed.reserved = 0
+
+    @contextlib.asynccontextmanager
+    async def open(self, sources: list[RelaySource]) -> AsyncIterator[list[RelayedFile]]:
+        """
+        中转一组附件，退出时自动清理临时文件
+
+        用法:
+            async with relay.open(attachments) as relayed:
+                await channel.send(files=[f.to_file() for f in relayed])
+        """
+        with span("relay.fetch"):
+            relayed = await self.fetch_all(sources)
+        try:
+            yield relayed
+        finally:
+            for item in relayed:
+                self.release(item)
+
+    def stats(self) -> dict[str, int]:
+        """获取中转统计（peak_rss_kb 为进程 RSS 峰值，单位 KB）"""
+        return {
+            "files_relayed": self.files_relayed,
+            "bytes_relayed": self.bytes_relayed,
+            "spilled_to_disk": self.spilled_to_disk,
+            "budget_used": self.budget.used,
+            "budget_peak": self.budget.peak,
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
@@ -0,0 +1,116 @@
+"""
+组件交互路由
+(前缀, 动作) → 处理函数 的路由表，各模块在加载时注册自己的路由，bot.py 只负责转发
+"""
+
+import contextlib
+import time
+from dataclasses import dataclass
+from typing import AsyncContextManager, Awaitable, Callable
+
+import discord
+
+from utils.custom_id import ButtonId
+from utils.deadline import DeadlineManager, ResponseDeadline
+from utils.embed_builder import build_error_embed
+
+# 处理函数通过 ResponseDeadline 应答，临近 3 秒期限时会被自动延迟应答
+RouteHandler = Callable[[discord.Interaction, ButtonId, ResponseDeadline], Awaitable[None]]
+# 指标 / 追踪钩子：(类别, 名称, 交互) → 异步上下文管理器
+TrackHook = Callable[[str, str, discord.Interaction], AsyncContextManager[None]]
+
+
+@dataclass
+class _Route:
+    """已注册的路由及其统计"""
+
+    handler: RouteHandler
+    owner_only: bool
+    calls: int = 0
+    errors: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+
+class InteractionRouter:
+    """
+    组件交互路由表
+
+    - 启动时由各模块注册 (前缀, 动作) → 处理函数
+    - owner_only 的路由只允许 custom_id 中记录的上传者使用
+    - 记录每个路由的调用次数、失败次数和耗时
+    - 每次分发都看护 3 秒应答期限（见 utils/deadline.py）
+    """
+
+    def __init__(self, track: TrackHook | None = None, deadlines: DeadlineManager | None = None):
+        self._routes: dict[tuple[str, str], _Route] = {}
+        self._track = track
+        self.deadlines = deadlines or DeadlineManager()
+
+    def register(
+        self,
+        prefix: str,
+        action: str,
+        handler: RouteHandler,
+        owner_only: bool = False,
+    ) -> None:
+        """注册路由（同一路由重复注册时覆盖，便于重新加载模块）"""
+        self._routes[(prefix, action)] = _Route(handler, owner_only)
+
+    async def dispatch(self, interaction: discord.Interaction) -> bool:
+        """
+        分发组件交互
+
+        Returns:
+            是否匹配到路由（未匹配的交互交给 discord.py 的视图处理）
+        """
+        button_id = ButtonId.decode(interaction.data.get("custom_id", ""))
+        if button_id is None:
+            return False
+        route = self._routes.get((button_id.prefix, button_id.action))
+        if route is None:
+            return False
+
+        # 管理按钮：仅发布者可用
+        if route.owner_only and interaction.user.id != button_id.uploader_id:
+            await interaction.response.send_message(
+                embed=build_error_embed("只有发布者才能执行此操作"),
+                ephemeral=True,
+            )
+            return True
+
+        route.calls += 1
+        started = time.perf_counter()
+        deadline = self.deadlines.watch(interaction)
+        try:
+            tracker = (
+                self._track("button", button_id.action, interaction)
+                if self._track is not None
+                else contextlib.nullcontext()
+            )
+            async with tracker, deadline:
+                await route.handler(interaction, button_id, deadline)
+        except Exception as e:
+            route.errors += 1
+            print(f"❌ 处理按钮失败 {button_id.prefix}:{button_id.action}: {e}")
+            try:
+                if deadline.pending:
+                    await deadline.send(content=f"操作失败: {str(e)}")
+            except Exception:
+                pass
+        finally:
+            elapsed = time.perf_counter() - started
+            route.total_latency += elapsed
+            route.max_latency = max(route.max_latency, elapsed)
+        return True
+
+    def stats(self) -> dict[str, float]:
+        """获取每个路由的统计（供指标端点使用，键为 前缀:动作_统计项，耗时单位为秒）"""
+        stats: dict[str, float] = {}
+        for (prefix, action), route in self._routes.items():
+            key = f"{prefix}:{action}"
+            stats[f"{key}_calls"] = route.calls
+            stats[f"{key}_errors"] = route.errors
+            stats[f"{key}_avg_latency"] = route.total_latency / route.calls if route.calls else 0.0
+            stats[f"{key}_max_latency"] = route.max_latency
+        return stats
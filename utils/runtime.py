@@ -0,0 +1,58 @@
+"""
+运行配置档
+根据配置档生成 Intents 和客户端缓存参数，并提供进程内存读数
+
+- default: 与旧版本相同，开启成员 / 消息内容 Intents 和默认缓存
+- lean: 只保留功能需要的 Intents，关闭成员分块和成员缓存，消息缓存按配置缩小或关闭
+"""
+
+import resource
+
+import discord
+
+PROFILES = ("default", "lean")
+
+
+def build_intents(profile: str) -> discord.Intents:
+    """生成 Intents"""
+    if profile == "lean":
+        # guilds: 频道 / 帖子缓存；guild_messages: 帖内回复与仓库消息删除事件；
+        # guild_reactions: 首楼回应。Bot 读取自己发送的消息内容不需要 message_content
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.guild_messages = True
+        intents.guild_reactions = True
+        return intents
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.reactions = True
+    intents.members = True
+    return intents
+
+
+def client_options(profile: str, max_messages: int | None) -> dict:
+    """
+    生成客户端缓存参数
+
+    Args:
+        profile: 配置档
+        max_messages: 消息缓存上限，None 表示使用配置档默认值，0 表示关闭
+    """
+    if profile == "lean":
+        return {
+            "chunk_guilds_at_startup": False,
+            "member_cache_flags": discord.MemberCacheFlags.none(),
+            "max_messages": max_messages or None,
+        }
+    return {"max_messages": 1000 if max_messages is None else (max_messages or None)}
+
+
+def current_rss_kb() -> int:
+    """当前进程常驻内存（KB），无法读取 /proc 时退回 RSS 峰值"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() // 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
@@ -0,0 +1,212 @@
+"""
+本地快照
+将仓库消息和帖子 → 作品索引持久化到 SQLite（WAL 模式），重启后无需重新扫描
+快照只是缓存，Discord 仍是唯一的数据来源
+"""
+
+import json
+import os
+import sqlite3
+
+import discord
+
+from utils.work_index import WorkEntry
+
+# 流式扫描时每写入多少条消息提交一次
+COMMIT_EVERY = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    message_id  INTEGER PRIMARY KEY,
+    content     TEXT NOT NULL,
+    attachments TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id         INTEGER PRIMARY KEY,
+    public_message_id INTEGER NOT NULL,
+    warehouse_id      INTEGER NOT NULL,
+    uploader          INTEGER,
+    shard             INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    shard           INTEGER PRIMARY KEY,
+    last_message_id INTEGER NOT NULL
+);
+"""
+
+
+class WarehouseSnapshot:
+    """
+    仓库快照
+
+    - messages: 仓库消息 ID → 消息内容（元数据 / 分卷标记）、附件信息
+    - threads: 帖子 ID → 作品定位信息
+    - cursors: 每个分片已扫描到的最后一条消息 ID，用于增量扫描
+    - 快照只是缓存：单条写入失败（磁盘满、数据库被锁等）只记录日志，不影响发布等调用方
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        self.scanned = 0
+        self.write_errors = 0
+
+    def _write(self, sql: str, params, many: bool = False, commit: bool = True) -> None:
+        """执行一条写入语句，sqlite3 出错时记录日志并放弃本次写入"""
+        try:
+            if many:
+                self._conn.executemany(sql, params)
+            else:
+                self._conn.execute(sql, params)
+            if commit:
+                self._conn.commit()
+        except sqlite3.Error as e:
+            self.write_errors += 1
+            print(f"⚠️ 写入快照失败: {e}")
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self._conn.close()
+
+    # ========== 仓库消息 ==========
+
+    def save_message(self, message: discord.Message, commit: bool = True) -> None:
+        """写入（或覆盖）一条仓库消息"""
+        attachments = [
+            {"filename": att.filename, "url": att.url, "size": att.size}
+            for att in message.attachments
+        ]
+        self._write(
+            "INSERT OR REPLACE INTO messages VALUES (?, ?, ?)",
+            (message.id, message.content, json.dumps(attachments, separators=(",", ":"))),
+            commit=commit,
+        )
+
+    def get_messages(self, message_ids: list[int]) -> dict[int, tuple[str, list[dict]]]:
+        """
+        读取多条仓库消息
+
+        Returns:
+            消息 ID → (消息内容, 附件信息列表)，快照中没有的消息不包含在内
+        """
+        if not message_ids:
+            return {}
+        placeholders = ",".join("?" * len(message_ids))
+        rows = self._conn.execute(
+            "SELECT message_id, content, attachments FROM messages"
+            f" WHERE message_id IN ({placeholders})",
+            message_ids,
+        ).fetchall()
+        return {row[0]: (row[1], json.loads(row[2])) for row in rows}
+
+    def delete_messages(self, message_ids: list[int]) -> None:
+        """删除仓库消息"""
+        self._write(
+            "DELETE FROM messages WHERE message_id = ?",
+            [(message_id,) for message_id in message_ids],
+            many=True,
+        )
+
+    # ========== 帖子索引 ==========
+
+    def save_thread(self, thread_id: int, entry: WorkEntry) -> None:
+        """写入帖子对应的作品"""
+        self._write(
+            "INSERT OR REPLACE INTO threads VALUES (?, ?, ?, ?, ?)",
+            (thread_id, entry.public_message_id, entry.warehouse_id, entry.uploader, entry.shard),
+        )
+
+    def delete_thread(self, thread_id: int) -> None:
+        """删除帖子对应的作品"""
+        self._write("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+
+    def get_thread(self, thread_id: int) -> WorkEntry | None:
+        """读取单个帖子对应的作品"""
+        row = self._conn.execute(
+            "SELECT public_message_id, warehouse_id, uploader, shard FROM threads WHERE thread_id = ?",
+            (thread_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        public_message_id, warehouse_id, uploader, shard = row
+        return WorkEntry(
+            public_message_id=public_message_id, warehouse_id=warehouse_id, uploader=uploader, shard=shard
+        )
+
+    def load_threads(self) -> list[tuple[int, WorkEntry]]:
+        """读取全部帖子索引"""
+        rows = self._conn.execute("SELECT * FROM threads").fetchall()
+        return [
+            (
+                thread_id,
+                WorkEntry(
+                    public_message_id=public_message_id,
+                    warehouse_id=warehouse_id,
+                    uploader=uploader,
+                    shard=shard,
+                ),
+            )
+            for thread_id, public_message_id, warehouse_id, uploader, shard in rows
+        ]
+
+    # ========== 增量扫描 ==========
+
+    def get_cursor(self, shard: int) -> int | None:
+        """获取分片已扫描到的最后一条消息 ID"""
+        row = self._conn.execute(
+            "SELECT last_message_id FROM cursors WHERE shard = ?", (shard,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_cursor(self, shard: int, message_id: int) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO cursors VALUES (?, ?)", (shard, message_id))
+
+    async def catch_up(self, channel: discord.TextChannel, shard: int, bot_user_id: int) -> int:
+        """
+        从上次扫描位置开始按时间顺序流式扫描仓库频道，写入 Bot 发送的消息
+
+        首次运行时会完整扫描一遍频道历史
+
+        Returns:
+            本次写入的消息数量
+        """
+        cursor = self.get_cursor(shard)
+        after = discord.Object(id=cursor) if cursor else None
+
+        count = 0
+        last_id = cursor
+        async for message in channel.history(limit=None, after=after, oldest_first=True):
+            last_id = message.id
+            if message.author.id != bot_user_id:
+                continue
+            self.save_message(message, commit=False)
+            count += 1
+            if count % COMMIT_EVERY == 0:
+                self._set_cursor(shard, last_id)
+                self._conn.commit()
+
+        if last_id is not None:
+            self._set_cursor(shard, last_id)
+        self._conn.commit()
+        self.scanned += count
+        return count
+
+    def stats(self) -> dict[str, int]:
+        """获取快照统计"""
+        messages = self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        threads = self._conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+        return {
+            "messages": messages,
+            "threads": threads,
+            "scanned": self.scanned,
+            "write_errors": self.write_errors,
+        }
+
@@ -0,0 +1,183 @@
+"""
+交互限流
+下载按钮、/获取作品 和提取码提交按用户、按作品（帖子）和全局三层令牌桶限流，
+并对提取码错误做逐级加长的锁定；被拒绝的请求在读取仓库、回溯帖子之前就直接回复
+"""
+
+import hmac
+import time
+
+# 提取码锁定时长上限（秒）
+MAX_LOCKOUT = 3600.0
+
+
+def _share(limit: int, shares: int) -> int:
+    """把限额平分给 shares 个进程（向上取整，至少 1；0 仍表示不限流）"""
+    if limit <= 0 or shares <= 1:
+        return limit
+    return max(1, -(-limit // shares))
+
+
+class TokenBuckets:
+    """
+    按 key 区分的一组令牌桶
+
+    - 容量 limit，每 period 秒补满（GCRA 实现：每个 key 只保存一个「桶补满的时间点」）
+    - 桶已补满的 key 没有保存的必要，由 sweep 清理
+    - limit 为 0 时不限流
+    """
+
+    def __init__(self, limit: int, period: float):
+        self.limit = limit
+        self.interval = period / limit if limit > 0 else 0.0  # 补充一个令牌的秒数
+        self._full_at: dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+    def wait(self, key: int, now: float) -> float:
+        """取一个令牌需要等待的秒数（0 表示可以立即取）"""
+        if self.limit <= 0:
+            return 0.0
+        full_at = max(self._full_at.get(key, now), now)
+        # 桶内剩余令牌 = limit - (full_at - now) / interval，至少剩 1 个才能取
+        return max(0.0, full_at + self.interval - now - self.limit * self.interval)
+
+    def take(self, key: int, now: float) -> None:
+        """取一个令牌（调用前应先用 wait 确认）"""
+        if self.limit <= 0:
+            return
+        self._full_at[key] = max(self._full_at.get(key, now), now) + self.interval
+
+    def sweep(self, now: float) -> int:
+        """清理已补满的桶，返回清理数量"""
+        full = [key for key, full_at in self._full_at.items() if full_at <= now]
+        for key in full:
+            del self._full_at[key]
+        return len(full)
+
+
+class InteractionThrottle:
+    """
+    交互限流与提取码锁定
+
+    - acquire 依次检查用户、作品、全局三个令牌桶，全部有令牌时才一起扣除，
+      被拒绝的请求不消耗其他桶的令牌
+    - 提取码以常量时间比较；同一用户对同一作品连续错误 max_failures 次后锁定，
+      锁定时长从 lockout 秒起每次翻倍（上限 1 小时），输对后清零
+    - 每 sweep_interval 秒顺带清理一次已补满的桶和过期的错误记录，不需要后台任务
+    - 多个 HTTP 工作进程各自计数，shares 为进程数时每个进程只分到 1/shares 的限额和错误次数，
+      合计约等于配置值（请求在进程间分布不均时会提前拒绝，但不会放宽）
+    """
+
+    def __init__(
+        self,
+        user: tuple[int, float],
+        work: tuple[int, float],
+        global_: tuple[int, float],
+        max_failures: int = 5,
+        lockout: float = 60.0,
+        sweep_interval: float = 60.0,
+        shares: int = 1,
+    ):
+        self.user = TokenBuckets(_share(user[0], shares), user[1])
+        self.work = TokenBuckets(_share(work[0], shares), work[1])
+        self.global_ = TokenBuckets(_share(global_[0], shares), global_[1])
+        self.max_failures = _share(max_failures, shares)
+        self.lockout = lockout
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.monotonic()
+        # (用户 ID, 帖子 ID) → [连续错误次数, 已锁定次数, 锁定结束时间, 最近一次错误时间]
+        self._failures: dict[tuple[int, int], list[float]] = {}
+
+        self.allowed = 0
+        self.shed: dict[str, int] = {"user": 0, "work": 0, "global": 0, "locked": 0}
+        self.passcode_failures = 0
+        self.lockouts = 0
+
+    def acquire(self, user_id: int, work_key: int) -> float:
+        """
+        为一次请求取令牌
+
+        Args:
+            user_id: 用户 ID
+            work_key: 作品所在帖子的 ID（下载按钮、命令和弹窗都能在不发请求的情况下拿到）
+
+        Returns:
+            需要等待的秒数，0 表示放行
+        """
+        now = time.monotonic()
+        self._maybe_sweep(now)
+        for name, buckets, key in (
+            ("user", self.user, user_id),
+            ("work", self.work, work_key),
+            ("global", self.global_, 0),
+        ):
+            wait = buckets.wait(key, now)
+            if wait > 0:
+                self.shed[name] += 1
+                return wait
+
+        self.user.take(user_id, now)
+        self.work.take(work_key, now)
+        self.global_.take(0, now)
+        self.allowed += 1
+        return 0.0
+
+    def locked_for(self, user_id: int, work_key: int, count: bool = True) -> float:
+        """提取码剩余锁定秒数（0 表示未锁定；count 为 True 时锁定中的请求计入拒绝统计）"""
+        record = self._failures.get((user_id, work_key))
+        if record is None:
+            return 0.0
+        remaining = record[2] - time.monotonic()
+        if remaining <= 0:
+            return 0.0
+        if count:
+            self.shed["locked"] += 1
+        return remaining
+
+    def check_passcode(self, user_id: int, work_key: int, given: str, expected: str | None) -> bool:
+        """常量时间比较提取码，并记录错误次数（达到上限时锁定）；作品没有提取码时一律不通过"""
+        if not expected:
+            return False
+        if hmac.compare_digest(given.encode(), expected.encode()):
+            self._failures.pop((user_id, work_key), None)
+            return True
+
+        self.passcode_failures += 1
+        now = time.monotonic()
+        record = self._failures.setdefault((user_id, work_key), [0, 0, 0.0, now])
+        record[0] += 1
+        record[3] = now
+        if record[0] >= self.max_failures:
+            record[0] = 0
+            record[2] = now + min(self.lockout * 2 ** record[1], MAX_LOCKOUT)
+            record[1] += 1
+            self.lockouts += 1
+        return False
+
+    def _maybe_sweep(self, now: float) -> None:
+        """清理已补满的桶和一小时内没有再出错的错误记录"""
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        self.user.sweep(now)
+        self.work.sweep(now)
+        self.global_.sweep(now)
+        expired = [
+            key for key, record in self._failures.items() if max(record[2], record[3]) + MAX_LOCKOUT <= now
+        ]
+        for key in expired:
+            del self._failures[key]
+
+    def stats(self) -> dict[str, float]:
+        """获取统计（供指标端点使用）"""
+        return {
+            "allowed": self.allowed,
+            **{f"shed_{name}": count for name, count in self.shed.items()},
+            "passcode_failures": self.passcode_failures,
+            "lockouts": self.lockouts,
+            "tracked_users": len(self.user),
+            "tracked_works": len(self.work),
+            "tracked_failures": len(self._failures),
+        }
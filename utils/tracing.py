@@ -0,0 +1,180 @@
+"""
+交互追踪
+以交互 ID 关联一次交互中各个 Discord 调用的耗时（跨度），按采样率写入本地滚动 JSONL 文件
+汇总工具见 scripts/trace_summary.py
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import random
+import time
+from typing import Iterator, Mapping
+
+# 当前任务所属的追踪（未采样或未启用时为 None，跨度直接跳过）
+_current: contextvars.ContextVar["_Trace | None"] = contextvars.ContextVar(
+    "jiuwo_trace", default=None
+)
+
+
+class _Trace:
+    """一次交互的追踪记录"""
+
+    __slots__ = ("trace_id", "kind", "name", "started", "spans", "rest")
+
+    def __init__(self, trace_id: int, kind: str, name: str, rest: Mapping[str, int] | None):
+        self.trace_id = trace_id
+        self.kind = kind
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans: list[dict] = []
+        self.rest = rest
+
+
+class _Span:
+    """跨度：记录一段代码相对交互开始的起止时间"""
+
+    __slots__ = ("name", "_trace", "_started")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._trace: _Trace | None = None
+        self._started = 0.0
+
+    def __enter__(self) -> "_Span":
+        self._trace = _current.get()
+        if self._trace is not None:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        trace = self._trace
+        if trace is not None:
+            ended = time.perf_counter()
+            trace.spans.append(
+                {
+                    "name": self.name,
+                    "start_ms": round((self._started - trace.started) * 1000, 3),
+                    "duration_ms": round((ended - self._started) * 1000, 3),
+                    "status": "ok" if exc_type is None else "error",
+                }
+            )
+        return False
+
+
+def span(name: str) -> _Span:
+    """
+    记录一个跨度，不在追踪中时开销只有一次 contextvar 读取
+
+    用法:
+        with span("fetch_message"):
+            message = await channel.fetch_message(message_id)
+    """
+    return _Span(name)
+
+
+class Tracer:
+    """
+    交互追踪器
+
+    - 每次交互开始时按采样率决定是否追踪
+    - slow_ms 大于 0 时未被采样的交互也会记录跨度，总耗时超过阈值时同样写入
+    - 每条追踪一行 JSON，由 RotatingFileHandler 按大小滚动
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: float,
+        slow_ms: float = 0.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 3,
+    ):
+        self.enabled = bool(path)
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+        self.written = 0
+        self.written_slow = 0
+
+        self._logger = logging.getLogger("jiuwo.trace")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._handler: logging.Handler | None = None
+        if self.enabled:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+            )
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(self._handler)
+
+    @contextlib.contextmanager
+    def trace(
+        self, trace_id: int, kind: str, name: str, rest: Mapping[str, int] | None = None
+    ) -> Iterator[None]:
+        """
+        追踪一次交互（已在追踪中时不嵌套）
+
+        Args:
+            trace_id: 交互 ID
+            kind: 类别（command / button / action）
+            name: 名称（命令名、按钮动作等）
+            rest: 本次交互按路由统计的 REST 调用次数（结束时写入记录）
+        """
+        if not self.enabled or _current.get() is not None:
+            yield
+            return
+        sampled = random.random() < self.sample_rate
+        if not sampled and self.slow_ms <= 0:
+            yield
+            return
+
+        trace = _Trace(trace_id, kind, name, rest)
+        token = _current.set(trace)
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            _current.reset(token)
+            duration_ms = (time.perf_counter() - trace.started) * 1000
+            slow = self.slow_ms > 0 and duration_ms >= self.slow_ms
+            if sampled or slow:
+                self._write(trace, duration_ms, status, sampled)
+
+    def _write(self, trace: _Trace, duration_ms: float, status: str, sampled: bool) -> None:
+        record = {
+            "ts": round(time.time(), 3),
+            "trace_id": str(trace.trace_id),
+            "kind": trace.kind,
+            "name": trace.name,
+            "duration_ms": round(duration_ms, 3),
+            "status": status,
+            "sampled": sampled,
+            "spans": trace.spans,
+        }
+        if trace.rest:
+            record["rest"] = dict(trace.rest)
+        self._logger.info(json.dumps(record, ensure_ascii=False))
+        self.written += 1
+        if not sampled:
+            self.written_slow += 1
+
+    def close(self) -> None:
+        """关闭追踪文件"""
+        if self._handler is not None:
+            self._logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+    def stats(self) -> dict[str, int]:
+        """获取追踪统计"""
+        return {"written": self.written, "written_slow": self.written_slow}
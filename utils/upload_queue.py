@@ -0,0 +1,190 @@
+"""
+仓库写入队列
+将仓库频道的发送 / 编辑操作排队交给后台工作协程执行，并按路由限速以避免 429
+"""
+
+import asyncio
+import contextvars
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class RouteLimiter:
+    """
+    单个路由的滑动窗口限速器
+
+    period 秒内最多放行 rate 次请求（Discord 对单频道发消息约为 5 次 / 5 秒）
+    """
+
+    def __init__(self, rate: int, period: float):
+        self.rate = rate
+        self.period = period
+        self._sent: deque[float] = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """
+        等待直到可以发送请求
+
+        Returns:
+            因限速等待的秒数
+        """
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= self.period:
+                    self._sent.popleft()
+                if len(self._sent) < self.rate:
+                    self._sent.append(now)
+                    return waited
+                delay = self.period - (now - self._sent[0])
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+@dataclass
+class _WriteJob:
+    """排队中的写入任务"""
+
+    route: Hashable
+    factory: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    on_start: Callable[[], Awaitable[None]] | None = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # 提交者的上下文：任务在其中执行，REST 调用计数和追踪仍归属于发起写入的交互
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+class WarehouseWriteQueue:
+    """
+    仓库写入队列
+
+    - FIFO 顺序执行，工作协程数量固定
+    - 每个路由（如 ("send", 频道 ID)）单独限速
+    - 记录队列深度、排队等待时间和限速等待时间
+    - 任务在提交者的上下文（contextvars）中执行，而不是工作协程自己的上下文
+    """
+
+    def __init__(self, workers: int, rate: int, period: float):
+        self.worker_count = workers
+        self.rate = rate
+        self.period = period
+        self._queue: asyncio.Queue[_WriteJob] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._limiters: dict[Hashable, RouteLimiter] = {}
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_wait = 0.0
+        self.throttled_seconds = 0.0
+        self._recent_waits: deque[float] = deque(maxlen=200)
+
+    @property
+    def depth(self) -> int:
+        """当前排队中的任务数量"""
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """启动工作协程"""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"warehouse-writer-{i}")
+            for i in range(self.worker_count)
+        ]
+
+    async def stop(self) -> None:
+        """停止工作协程，未执行的任务以取消结束"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            if not job.future.done():
+                job.future.cancel()
+
+    async def run(
+        self,
+        route: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        on_start: Callable[[], Awaitable[None]] | None = None,
+    ) -> Any:
+        """
+        提交写入任务并等待其完成
+
+        Args:
+            route: 限速路由，如 ("send", 频道 ID)
+            factory: 执行写入的协程工厂
+            on_start: 任务开始执行时的回调（用于更新进度提示）
+
+        Returns:
+            factory 的返回值
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.submitted += 1
+        await self._queue.put(_WriteJob(route, factory, future, on_start))
+        return await future
+
+    def _get_limiter(self, route: Hashable) -> RouteLimiter:
+        limiter = self._limiters.get(route)
+        if limiter is None:
+            limiter = RouteLimiter(self.rate, self.period)
+            self._limiters[route] = limiter
+        return limiter
+
+    async def _worker(self) -> None:
+        """工作协程：依次取出任务、等待限速、执行写入"""
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.future.cancelled():
+                    continue
+
+                wait = time.monotonic() - job.enqueued_at
+                self._recent_waits.append(wait)
+                self.max_wait = max(self.max_wait, wait)
+
+                if job.on_start is not None:
+                    try:
+                        await asyncio.create_task(job.on_start(), context=job.context)
+                    except Exception:
+                        pass
+
+                throttled = await self._get_limiter(job.route).acquire()
+                self.throttled_seconds += throttled
+
+                try:
+                    result = await asyncio.create_task(job.factory(), context=job.context)
+                except asyncio.CancelledError:
+                    if not job.future.done():
+                        job.future.cancel()
+                    raise
+                except Exception as e:
+                    self.failed += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    self.completed += 1
+                    if not job.future.done():
+                        job.future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict[str, float]:
+        """获取队列统计"""
+        recent = list(self._recent_waits)
+        return {
+            "depth": self.depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait": sum(recent) / len(recent) if recent else 0.0,
+            "max_wait": self.max_wait,
+            "throttled_seconds": self.throttled_seconds,
+        }
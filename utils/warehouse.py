@@ -0,0 +1,345 @@
+"""
+仓库访问层
+读取仓库消息并缓存解析后的元数据和附件信息
+"""
+
+import asyncio
+import dataclasses
+import time
+from dataclasses import dataclass
+
+import discord
+
+from utils.cache import SingleFlight, TTLCache
+from utils.cdn import CdnUrlRefresher, parse_expiry
+from utils.metadata import ResourceMetadata, parse_metadata
+from utils.snapshot import WarehouseSnapshot
+from utils.tracing import span
+
+
+@dataclass
+class AttachmentInfo:
+    """仓库消息附件信息"""
+
+    filename: str
+    url: str
+    size: int
+    part_of: str | None = None  # 分卷所属的原文件名，非分卷为 None
+
+    @property
+    def expires_at(self) -> float | None:
+        """CDN 链接过期时间（Unix 时间戳）"""
+        return parse_expiry(self.url)
+
+
+@dataclass
+class WarehouseRecord:
+    """一条仓库消息解析后的内容"""
+
+    warehouse_id: int
+    metadata: ResourceMetadata | None
+    attachments: list[AttachmentInfo]
+
+    @property
+    def expires_at(self) -> float | None:
+        """所有附件中最早的链接过期时间"""
+        expiries = [att.expires_at for att in self.attachments if att.expires_at is not None]
+        return min(expiries) if expiries else None
+
+    def expires_within(self, seconds: float) -> bool:
+        """附件链接是否会在指定秒数内过期"""
+        expires_at = self.expires_at
+        return expires_at is not None and expires_at - time.time() < seconds
+
+    @property
+    def part_ids(self) -> list[int]:
+        """元数据文件清单中所有分卷消息的 ID"""
+        return metadata_part_ids(self.metadata)
+
+    @classmethod
+    def build(
+        cls,
+        warehouse_id: int,
+        content: str,
+        attachments: list[AttachmentInfo],
+        part_attachments: dict[int, AttachmentInfo] | None = None,
+    ) -> "WarehouseRecord":
+        """
+        从仓库消息内容和附件构建记录
+
+        文件清单中的分卷文件按顺序展开为各分卷附件，缺失的分卷会被跳过
+
+        Args:
+            warehouse_id: 仓库消息 ID
+            content: 仓库消息内容（元数据 JSON）
+            attachments: 仓库消息的附件
+            part_attachments: 分卷消息 ID → 分卷附件
+        """
+        metadata = parse_metadata(content)
+        if metadata is None or not metadata.files:
+            return cls(warehouse_id=warehouse_id, metadata=metadata, attachments=attachments)
+
+        part_attachments = part_attachments or {}
+        expanded = []
+        remaining = iter(attachments)
+        for entry in metadata.files:
+            if not entry.get("parts"):
+                attachment = next(remaining, None)
+                if attachment is not None:
+                    expanded.append(attachment)
+                continue
+            for part_id in entry["parts"]:
+                part = part_attachments.get(int(part_id))
+                if part is not None:
+                    expanded.append(dataclasses.replace(part, part_of=entry.get("name")))
+        expanded.extend(remaining)
+        return cls(warehouse_id=warehouse_id, metadata=metadata, attachments=expanded)
+
+    @classmethod
+    def from_message(
+        cls,
+        message: discord.Message,
+        part_messages: dict[int, discord.Message] | None = None,
+    ) -> "WarehouseRecord":
+        """
+        从仓库消息构建记录
+
+        Args:
+            message: 仓库消息
+            part_messages: 分卷消息 ID → 分卷消息
+        """
+        part_attachments = {
+            part_id: _attachment_info(part.attachments[0])
+            for part_id, part in (part_messages or {}).items()
+            if part.attachments
+        }
+        return cls.build(
+            message.id,
+            message.content,
+            [_attachment_info(att) for att in message.attachments],
+            part_attachments,
+        )
+
+
+def _attachment_info(attachment: discord.Attachment) -> AttachmentInfo:
+    return AttachmentInfo(filename=attachment.filename, url=attachment.url, size=attachment.size)
+
+def metadata_part_ids(metadata: ResourceMetadata | None) -> list[int]:
+    """元数据文件清单中所有分卷消息的 ID"""
+    if metadata is None:
+        return []
+    return [int(part_id) for entry in metadata.files for part_id in entry.get("parts", [])]
+
+
+class WarehouseStore:
+    """
+    仓库消息读取与缓存
+
+    按仓库消息 ID 缓存 WarehouseRecord，避免每次点击都请求仓库频道
+    同一仓库消息的并发读取会合并为一次请求
+    附件链接临近过期时通过批量接口刷新，而不是重新读取仓库消息
+    分卷存储的作品会并发读取各分卷消息，合并为一条记录
+    配置了本地快照时，缓存未命中先查快照，读取到的仓库消息同步写入快照
+    更新作品时需调用 invalidate 主动失效，删除作品时调用 discard
+    """
+
+    def __init__(
+        self,
+        bot: discord.Client,
+        max_entries: int,
+        ttl: float,
+        refresh_margin: float = 600,
+        snapshot: WarehouseSnapshot | None = None,
+    ):
+        self.bot = bot
+        self.refresh_margin = refresh_margin
+        self.snapshot = snapshot
+        self._cache: TTLCache[int, WarehouseRecord] = TTLCache(max_entries, ttl)
+        self._flight: SingleFlight[int, discord.Message] = SingleFlight()
+        self._refresher = CdnUrlRefresher(bot.http)
+
+        self.snapshot_hits = 0
+        self.snapshot_misses = 0
+
+    async def get(self, warehouse_id: int, shard: int = 0) -> WarehouseRecord:
+        """
+        获取仓库记录，优先读取缓存
+
+        Args:
+            warehouse_id: 仓库消息 ID
+            shard: 仓库消息所在的分片
+
+        Raises:
+            discord.NotFound: 仓库消息不存在
+            RuntimeError: 仓库频道未配置
+        """
+        record = self._cache.get(warehouse_id) or self._load_snapshot(warehouse_id)
+        if record is not None:
+            if record.expires_within(self.refresh_margin):
+                await self.refresh_urls([record])
+            # 刷新失败且链接已过期时，退回重新读取仓库消息
+            if not record.expires_within(0):
+                return record
+            self._cache.invalidate(warehouse_id)
+
+        try:
+            message = await self.fetch_message(warehouse_id, shard)
+        except discord.NotFound:
+            # 仓库消息已被删除，从快照中一并移除，避免之后一直命中失效的记录
+            self.discard(warehouse_id, record.part_ids if record is not None else None)
+            raise
+        # 合并请求的等待者可能已由首个调用者写入缓存
+        record = self._cache.peek(warehouse_id)
+        if record is not None:
+            return record
+
+        part_ids = metadata_part_ids(parse_metadata(message.content))
+        if not part_ids:
+            return self.put(message)
+        return self.put(message, await self.fetch_parts(part_ids, shard))
+
+    async def fetch_message(self, warehouse_id: int, shard: int = 0) -> discord.Message:
+        """
+        读取完整的仓库消息（不走缓存，但合并并发请求）
+        读取结果会顺带写入缓存
+
+        Raises:
+            discord.NotFound: 仓库消息不存在
+            RuntimeError: 仓库频道未配置
+        """
+        warehouse_channel = self.bot.get_warehouse_channel(shard)
+        if warehouse_channel is None:
+            raise RuntimeError("仓库频道配置错误")
+
+        async def _fetch() -> discord.Message:
+            message = await warehouse_channel.fetch_message(warehouse_id)
+            self.put(message)
+            return message
+
+        with span("warehouse.fetch_message"):
+            return await self._flight.do(warehouse_id, _fetch)
+
+    async def fetch_parts(self, part_ids: list[int], shard: int = 0) -> dict[int, discord.Message]:
+        """
+        并发读取分卷消息
+
+        Returns:
+            分卷消息 ID → 分卷消息（已被删除的分卷不包含在内）
+        """
+        warehouse_channel = self.bot.get_warehouse_channel(shard)
+        if warehouse_channel is None:
+            raise RuntimeError("仓库频道配置错误")
+
+        async def _fetch(part_id: int) -> discord.Message:
+            return await self._flight.do(part_id, lambda: warehouse_channel.fetch_message(part_id))
+
+        with span("warehouse.fetch_parts"):
+            results = await asyncio.gather(
+                *[_fetch(part_id) for part_id in part_ids], return_exceptions=True
+            )
+        parts = {}
+        for part_id, result in zip(part_ids, results):
+            if isinstance(result, discord.NotFound):
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            parts[part_id] = result
+        return parts
+
+    def _load_snapshot(self, warehouse_id: int) -> WarehouseRecord | None:
+        """从本地快照读取记录并写入缓存（快照链接通常已过期，由调用方刷新）"""
+        if self.snapshot is None:
+            return None
+
+        rows = self.snapshot.get_messages([warehouse_id])
+        record = None
+        if warehouse_id in rows:
+            content, attachments = rows[warehouse_id]
+            part_ids = metadata_part_ids(parse_metadata(content))
+            parts = self.snapshot.get_messages(part_ids)
+            if all(part_id in parts for part_id in part_ids):
+                record = WarehouseRecord.build(
+                    warehouse_id,
+                    content,
+                    [AttachmentInfo(**att) for att in attachments],
+                    {
+                        part_id: AttachmentInfo(**part_attachments[0])
+                        for part_id, (_, part_attachments) in parts.items()
+                        if part_attachments
+                    },
+                )
+
+        if record is None or record.metadata is None:
+            self.snapshot_misses += 1
+            return None
+        self.snapshot_hits += 1
+        self._cache.set(warehouse_id, record)
+        return record
+
+    def put(
+        self,
+        message: discord.Message,
+        part_messages: dict[int, discord.Message] | None = None,
+    ) -> WarehouseRecord:
+        """
+        用已获取的仓库消息写入缓存（元数据解析失败或缺少分卷消息时不缓存）
+
+        Args:
+            message: 仓库消息
+            part_messages: 分卷消息 ID → 分卷消息（分卷存储的作品需提供）
+        """
+        record = WarehouseRecord.from_message(message, part_messages)
+        if record.metadata is not None and all(
+            part_id in (part_messages or {}) for part_id in record.part_ids
+        ):
+            self._cache.set(record.warehouse_id, record)
+
+        if self.snapshot is not None:
+            for item in [message, *(part_messages or {}).values()]:
+                self.snapshot.save_message(item)
+        return record
+
+    async def refresh_urls(self, records: list[WarehouseRecord]) -> None:
+        """批量刷新多条记录的附件链接"""
+        urls = [att.url for record in records for att in record.attachments]
+        if not urls:
+            return
+
+        with span("cdn.refresh"):
+            refreshed = await self._refresher.refresh(urls)
+        for record in records:
+            record.attachments = [
+                dataclasses.replace(att, url=refreshed.get(att.url, att.url))
+                for att in record.attachments
+            ]
+
+    async def refresh_expiring(self, within: float) -> int:
+        """
+        主动刷新缓存中即将过期的记录（缓存中的都是近期被访问的热门作品）
+
+        Returns:
+            刷新的记录数量
+        """
+        records = [record for record in self._cache.values() if record.expires_within(within)]
+        if records:
+            await self.refresh_urls(records)
+        return len(records)
+
+    def invalidate(self, warehouse_id: int) -> None:
+        """使某条仓库记录失效"""
+        self._cache.invalidate(warehouse_id)
+
+    def discard(self, warehouse_id: int, part_ids: list[int] | None = None) -> None:
+        """仓库消息被删除时，从缓存和本地快照中移除"""
+        self._cache.invalidate(warehouse_id)
+        if self.snapshot is not None:
+            self.snapshot.delete_messages([warehouse_id, *(part_ids or [])])
+
+    def stats(self) -> dict[str, int]:
+        """获取缓存命中、请求合并与链接刷新统计"""
+        stats = self._cache.stats()
+        stats.update({f"fetch_{key}": value for key, value in self._flight.stats().items()})
+        stats.update({f"cdn_{key}": value for key, value in self._refresher.stats().items()})
+        if self.snapshot is not None:
+            stats.update({"snapshot_hits": self.snapshot_hits, "snapshot_misses": self.snapshot_misses})
+        return stats
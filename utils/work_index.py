@@ -0,0 +1,191 @@
+"""
+帖子 → 作品索引
+在内存中记录每个帖子当前发布的作品，避免每次命令都扫描频道历史
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import discord
+
+from utils.custom_id import ButtonId
+from utils.tracing import span
+
+if TYPE_CHECKING:
+    from utils.snapshot import WarehouseSnapshot
+
+
+@dataclass
+class WorkEntry:
+    """帖子中已发布作品的定位信息"""
+
+    public_message_id: int  # 公开 Embed 消息 ID
+    warehouse_id: int  # 仓库消息 ID
+    uploader: int | None  # 上传者用户 ID（旧消息无法解析时为 None）
+    shard: int = 0  # 仓库分片
+
+
+def parse_footer_warehouse_id(footer_text: str) -> int | None:
+    """
+    从 Embed footer 中解析仓库消息 ID
+
+    支持 "WarehouseID: xxx"、"作品ID: xxx"、"ID: xxx" 多种格式
+
+    Returns:
+        仓库消息 ID，无法解析返回 None
+    """
+    if footer_text.startswith("WarehouseID:"):
+        value = footer_text.replace("WarehouseID:", "")
+    elif footer_text.startswith("作品ID:") or footer_text.startswith("ID:"):
+        value = footer_text.split(":")[-1]
+    else:
+        return None
+
+    try:
+        return int(value.strip())
+    except ValueError:
+        return None
+
+
+def parse_manage_components(message: discord.Message) -> tuple[int | None, int]:
+    """
+    从公开消息的管理按钮 custom_id 中解析上传者 ID 和仓库分片
+
+    custom_id 格式见 ButtonId
+
+    Returns:
+        (上传者 ID, 分片)，无法解析上传者时为 (None, 0)
+    """
+    for row in message.components:
+        for child in getattr(row, "children", []):
+            button_id = ButtonId.decode(getattr(child, "custom_id", None) or "")
+            if button_id is not None and button_id.prefix == "manage":
+                return button_id.uploader_id, button_id.shard
+    return None, 0
+
+
+class WorkIndex:
+    """
+    帖子 ID → 作品信息 的内存索引
+
+    - 发布 / 更新 / 删除时由对应模块直接维护
+    - 未命中时先查本地快照（其他进程可能已写入），再从帖子开头读取 scan_limit 条消息并写回索引（惰性回填）；
+      公开消息在发布时发送，通常位于帖子开头，不必翻完整个帖子
+    - 配置了本地快照时，索引变更同步写入快照，启动时通过 load 恢复
+    - negative_cache 为 False 时不记住「帖子中没有作品」（多个 HTTP 工作进程时作品可能由其他进程发布）
+    """
+
+    def __init__(
+        self,
+        snapshot: "WarehouseSnapshot | None" = None,
+        negative_cache: bool = True,
+        scan_limit: int = 100,
+    ):
+        self.snapshot = snapshot
+        self.negative_cache = negative_cache
+        self.scan_limit = scan_limit
+        self._entries: dict[int, WorkEntry] = {}
+        # 已完整扫描但未找到作品的帖子，避免重复扫描
+        self._scanned_empty: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self) -> int:
+        """
+        从本地快照恢复索引
+
+        Returns:
+            恢复的帖子数量
+        """
+        if self.snapshot is None:
+            return 0
+        entries = self.snapshot.load_threads()
+        self._entries.update(entries)
+        return len(entries)
+
+    def get(self, thread_id: int) -> WorkEntry | None:
+        """获取帖子对应的作品（仅查内存，不发起请求）"""
+        return self._entries.get(thread_id)
+
+    def set(self, thread_id: int, entry: WorkEntry) -> None:
+        """记录帖子对应的作品"""
+        self._entries[thread_id] = entry
+        self._scanned_empty.discard(thread_id)
+        if self.snapshot is not None:
+            self.snapshot.save_thread(thread_id, entry)
+
+    def remove(self, thread_id: int, public_message_id: int | None = None) -> None:
+        """
+        移除帖子对应的作品
+
+        Args:
+            thread_id: 帖子 ID
+            public_message_id: 仅当索引中记录的公开消息与之相同时才移除
+        """
+        entry = self._entries.get(thread_id)
+        if entry is None:
+            return
+        if public_message_id is not None and entry.public_message_id != public_message_id:
+            return
+        del self._entries[thread_id]
+        if self.snapshot is not None:
+            self.snapshot.delete_thread(thread_id)
+
+    async def resolve(
+        self,
+        channel: discord.TextChannel | discord.Thread,
+        bot_user_id: int,
+    ) -> WorkEntry | None:
+        """
+        查找帖子中的作品，未命中时查快照、再从帖子开头读取有限条消息进行回填
+
+        Args:
+            channel: 当前帖子
+            bot_user_id: Bot 自身的用户 ID（只识别 Bot 发送的 Embed）
+
+        Returns:
+            作品信息，帖子中没有作品返回 None
+        """
+        entry = self._entries.get(channel.id)
+        if entry is not None:
+            return entry
+
+        if channel.id in self._scanned_empty:
+            return None
+
+        if self.snapshot is not None:
+            entry = self.snapshot.get_thread(channel.id)
+            if entry is not None:
+                self._entries[channel.id] = entry
+                return entry
+
+        # 按时间顺序读取，同一窗口内有多条公开消息时以最新的为准
+        with span("work_index.history"):
+            async for message in channel.history(limit=self.scan_limit, oldest_first=True):
+                if message.author.id != bot_user_id or not message.embeds:
+                    continue
+
+                for embed in message.embeds:
+                    if not embed.footer or not embed.footer.text:
+                        continue
+                    warehouse_id = parse_footer_warehouse_id(embed.footer.text)
+                    if warehouse_id is None:
+                        continue
+
+                    uploader, shard = parse_manage_components(message)
+                    entry = WorkEntry(
+                        public_message_id=message.id,
+                        warehouse_id=warehouse_id,
+                        uploader=uploader,
+                        shard=shard,
+                    )
+                    break
+
+        if entry is not None:
+            self.set(channel.id, entry)
+            return entry
+
+        if self.negative_cache:
+            self._scanned_empty.add(channel.id)
+        return None